@@ -1,26 +1,103 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
+import json
+import base64
+import binascii
+import hashlib
+import shutil
+import tarfile
+import time
+import uuid
+import zipfile
+import zlib
+from concurrent.futures import CancelledError
 from datetime import datetime, timedelta
 from functools import wraps
 import jwt
-from models import init_db, get_db
+from models import init_db, get_db, close_db, get_change_version
+from services.llm_service import LLMServiceManager
+from processing import get_parser, is_supported, submit_document, cancel_document, get_scheduler
+from parsers.registry import SUPPORTED_EXTENSIONS, detect_format
+from services.scheduler import PRIORITIES
+from services.search_service import get_search_index
+from services import metrics, warmup
+from services.bulk_upload import (BulkUploadLimitError, is_archive, iter_archive_members,
+                                  copy_limited, unique_path)
+from services.resumable_upload import (UploadRangeError, parse_content_range, missing_ranges,
+                                       merge_ranges, allocate, write_range, file_sha256)
 
 app = Flask(__name__)
 CORS(app)
 init_db()  # Initialize database
+app.teardown_appcontext(close_db)
 
 # Configuration
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'docx', 'txt'}
+app.config['ALLOWED_EXTENSIONS'] = {ext.lstrip('.') for ext in SUPPORTED_EXTENSIONS}
 app.config['API_BEARER_TOKEN'] = os.getenv('API_BEARER_TOKEN', 'default-token-123')
+app.config['BULK_MAX_FILES'] = int(os.getenv('BULK_MAX_FILES', '1000'))
+app.config['BULK_MAX_BYTES'] = int(os.getenv('BULK_MAX_BYTES', str(2 * 1024 ** 3)))
+app.config['UPLOAD_MAX_BYTES'] = int(os.getenv('UPLOAD_MAX_BYTES', str(100 * 1024 ** 2)))
+app.config['UPLOAD_SESSION_TTL_SECONDS'] = int(os.getenv('UPLOAD_SESSION_TTL_SECONDS', str(24 * 3600)))
+
+# Fields selectable from /api/documents, mapped to their SQL expressions
+DOCUMENT_FIELDS = {
+    'id': 'd.id',
+    'filename': 'd.filename',
+    'filepath': 'd.filepath',
+    'status': 'd.status',
+    'llm_config_id': 'd.llm_config_id',
+    'created_at': 'd.created_at',
+    'duplicate_of': 'd.duplicate_of',
+    'model_name': 'l.model_name'
+}
+
+_llm_manager = None
 
 # Helper Functions
+def get_llm_manager() -> LLMServiceManager:
+    """Lazily build the process-wide LLM manager from the environment"""
+    global _llm_manager
+    if _llm_manager is None:
+        _llm_manager = LLMServiceManager.from_env()
+    return _llm_manager
+
+def encode_cursor(created_at: str, document_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = json.dumps([created_at, document_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        created_at, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(created_at), int(document_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def get_tenant() -> str:
+    """Tenant for fair-share scheduling, from the ``X-Tenant-ID`` header"""
+    return (request.headers.get('X-Tenant-ID') or 'default')[:64]
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record handling time per route template (streamed bodies: until headers)"""
+    if 'request_started' in g:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - g.request_started, request.method, endpoint)
+        metrics.HTTP_REQUESTS.inc(request.method, endpoint, response.status_code)
+    return response
+
 def verify_token(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -61,10 +138,13 @@ def upload_file():
         filename = secure_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
+        if detect_format(filepath) is None:
+            os.remove(filepath)
+            return jsonify({'error': 'File content does not match a supported type'}), 400
         
         # Store document metadata
         db = get_db()
-        db.execute('''INSERT INTO documents 
+        document_id = db.insert('''INSERT INTO documents 
                      (filename, filepath, status)
                      VALUES (?, ?, ?)''',
                      (filename, filepath, 'uploaded'))
@@ -72,20 +152,555 @@ def upload_file():
         
         return jsonify({
             'message': 'File uploaded successfully',
-            'documentId': filename
+            'documentId': filename,
+            'id': document_id
         }), 201
         
     return jsonify({'error': 'File type not allowed'}), 400
 
+@app.route('/api/upload/bulk', methods=['POST'])
+@verify_token
+def upload_bulk():
+    """Upload many documents in one request and parse them in parallel
+
+    Accepts any number of ``files`` parts, each a supported document or a
+    zip/tar archive of them. Files whose content is not a supported type
+    are skipped. Archive members are streamed to disk one at a time.
+    All document rows are created in one transaction under a new batch id,
+    then parsed on the background pool; poll /api/batches/<id> for progress.
+    """
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    if not uploads:
+        return jsonify({'error': 'No file part'}), 400
+
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(app.config['UPLOAD_FOLDER'], batch_id)
+    os.makedirs(batch_dir)
+    saved, skipped = [], []
+    remaining = app.config['BULK_MAX_BYTES']
+    try:
+        for upload in uploads:
+            if is_archive(upload.filename):
+                members = iter_archive_members(upload.filename, upload.stream)
+            else:
+                members = [(upload.filename, upload.stream)]
+            for name, stream in members:
+                filename = secure_filename(os.path.basename(name))
+                if not filename or not is_supported(filename):
+                    skipped.append(name)
+                    continue
+                if len(saved) >= app.config['BULK_MAX_FILES']:
+                    raise BulkUploadLimitError(f"More than {app.config['BULK_MAX_FILES']} files")
+                filepath = unique_path(batch_dir, filename)
+                remaining -= copy_limited(stream, filepath, remaining)
+                if detect_format(filepath) is None:
+                    os.remove(filepath)
+                    skipped.append(name)
+                    continue
+                saved.append((filename, filepath))
+    except BulkUploadLimitError as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return jsonify({'error': str(e)}), 413
+    except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError) as e:
+        # Corrupt compressed data surfaces from zlib, truncated streams as EOFError
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return jsonify({'error': f"Invalid archive: {str(e)}"}), 400
+    except Exception:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise
+
+    if not saved:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return jsonify({'error': 'No supported files', 'skipped': skipped}), 400
+
+    db = get_db()
+    try:
+        db.execute('INSERT INTO batches (id, total) VALUES (?, ?)', (batch_id, len(saved)))
+        documents = []
+        for filename, filepath in saved:
+            document_id = db.insert('''INSERT INTO documents (filename, filepath, status, batch_id)
+                                       VALUES (?, ?, ?, ?)''', (filename, filepath, 'queued', batch_id))
+            documents.append({'id': document_id, 'filename': filename, 'filepath': filepath})
+        db.commit()
+    except Exception:
+        db.rollback()
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise
+
+    tenant = get_tenant()
+    for document in documents:
+        submit_document(document['id'], document['filepath'], priority='batch', tenant=tenant)
+
+    return jsonify({
+        'message': f"{len(documents)} files queued for parsing",
+        'batchId': batch_id,
+        'documents': [{'id': d['id'], 'filename': d['filename']} for d in documents],
+        'skipped': skipped
+    }), 202
+
+@app.route('/api/batches/<batch_id>', methods=['GET'])
+@verify_token
+def get_batch(batch_id):
+    """Report parsing progress for an upload batch"""
+    db = get_db()
+    batch = db.execute('SELECT * FROM batches WHERE id = ?', (batch_id,)).fetchone()
+    if batch is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    documents = db.execute('''SELECT id, filename, status FROM documents
+                              WHERE batch_id = ? ORDER BY id''', (batch_id,)).fetchall()
+    counts = {}
+    for document in documents:
+        counts[document['status']] = counts.get(document['status'], 0) + 1
+    finished = sum(counts.get(status, 0) for status in ('parsed', 'truncated', 'failed', 'cancelled'))
+    return jsonify({
+        'batchId': batch_id,
+        'total': batch['total'],
+        'counts': counts,
+        'complete': finished == batch['total'],
+        'documents': [dict(d) for d in documents]
+    }), 200
+
+def upload_session_state(session) -> dict:
+    """Describe an upload session with its received and missing byte ranges"""
+    rows = get_db().execute('SELECT range_start, range_end FROM upload_ranges WHERE session_id = ?',
+                            (session['id'],)).fetchall()
+    ranges = [(row['range_start'], row['range_end']) for row in rows]
+    return {
+        'uploadId': session['id'],
+        'filename': session['filename'],
+        'size': session['size'],
+        'status': session['status'],
+        'received': [[start, end - 1] for start, end in merge_ranges(ranges)],
+        'missing': [[start, end - 1] for start, end in missing_ranges(ranges, session['size'])],
+        'id': session['document_id']
+    }
+
+def expire_upload_sessions(db) -> int:
+    """Delete open upload sessions idle for longer than the session TTL
+
+    A session is idle when it was created before the cutoff and its
+    partial file has not been written since. Returns the number removed.
+    """
+    ttl = app.config['UPLOAD_SESSION_TTL_SECONDS']
+    cutoff = (datetime.utcnow() - timedelta(seconds=ttl)).strftime('%Y-%m-%d %H:%M:%S')
+    stale = db.execute('''SELECT id, path FROM upload_sessions
+                          WHERE status = ? AND created_at < ?''', ('open', cutoff)).fetchall()
+    expired = 0
+    for session in stale:
+        try:
+            if time.time() - os.path.getmtime(session['path']) < ttl:
+                continue
+            os.remove(session['path'])
+        except FileNotFoundError:
+            pass
+        db.execute('DELETE FROM upload_sessions WHERE id = ? AND status = ?', (session['id'], 'open'))
+        expired += 1
+    db.commit()
+    return expired
+
+@app.route('/api/uploads', methods=['POST'])
+@verify_token
+def create_upload():
+    """Start a resumable upload
+
+    Body: ``{"filename": ..., "size": ..., "sha256": ...}`` (sha256 optional).
+    The file is then sent as byte ranges with PUT /api/uploads/<id>, in any
+    order and in parallel, and finished with POST /api/uploads/<id>/complete.
+    Abandoned sessions are swept here (see expire_upload_sessions).
+    """
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid size'}), 400
+    if size <= 0:
+        return jsonify({'error': 'Invalid size'}), 400
+    if size > app.config['UPLOAD_MAX_BYTES']:
+        return jsonify({'error': f"Upload exceeds {app.config['UPLOAD_MAX_BYTES']} bytes"}), 413
+
+    db = get_db()
+    expire_upload_sessions(db)
+
+    upload_id = uuid.uuid4().hex
+    partial_dir = os.path.join(app.config['UPLOAD_FOLDER'], '.partial')
+    os.makedirs(partial_dir, exist_ok=True)
+    path = os.path.join(partial_dir, upload_id)
+    allocate(path, size)
+
+    db.execute('''INSERT INTO upload_sessions (id, filename, size, sha256, path, status)
+                  VALUES (?, ?, ?, ?, ?, ?)''',
+               (upload_id, filename, size, (data.get('sha256') or '').lower() or None, path, 'open'))
+    db.commit()
+    session = db.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload_id,)).fetchone()
+    return jsonify(upload_session_state(session)), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PUT'])
+@verify_token
+def handle_upload(upload_id):
+    """Report upload progress (GET) or receive one byte range (PUT)
+
+    A PUT carries ``Content-Range: bytes <start>-<end>/<size>`` and the raw
+    bytes as its body, which are written straight to their offset in the
+    partial file. After a dropped connection, GET lists the missing ranges
+    so the client resends only those.
+    """
+    db = get_db()
+    session = db.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload_id,)).fetchone()
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if request.method == 'GET':
+        return jsonify(upload_session_state(session)), 200
+    if session['status'] != 'open':
+        return jsonify({'error': f"Upload is {session['status']}"}), 409
+
+    try:
+        start, end = parse_content_range(request.headers.get('Content-Range'), session['size'])
+        write_range(session['path'], start, end, request.stream)
+    except UploadRangeError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        # complete_upload moved the partial file away after the check above
+        return jsonify({'error': 'Upload is completing'}), 409
+
+    db.execute('''INSERT INTO upload_ranges (session_id, range_start, range_end) VALUES (?, ?, ?)
+                  ON CONFLICT DO NOTHING''', (upload_id, start, end))
+    db.commit()
+    return jsonify(upload_session_state(session)), 200
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+@verify_token
+def complete_upload(upload_id):
+    """Verify a fully received upload and register it as a document
+
+    Body (optional): ``{"sha256": ..., "parse": true}``. The checksum from
+    the request or the session is compared with the assembled file; on a
+    mismatch the received ranges are discarded so the file can be resent.
+    With ``parse`` the document is queued for background parsing.
+
+    The session is claimed by switching its status from ``open`` to
+    ``completing`` in one UPDATE, and the partial file is moved aside
+    before it is hashed, so a concurrent complete gets 409 and later range
+    PUTs are refused. A failed check reopens the session.
+    """
+    data = request.get_json(silent=True) or {}
+    db = get_db()
+    session = db.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload_id,)).fetchone()
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if session['status'] == 'complete':
+        return jsonify(upload_session_state(session)), 200
+
+    state = upload_session_state(session)
+    if state['missing']:
+        return jsonify(dict(state, error='Upload incomplete')), 409
+
+    claimed = db.execute('UPDATE upload_sessions SET status = ? WHERE id = ? AND status = ?',
+                         ('completing', upload_id, 'open'))
+    db.commit()
+    if claimed.rowcount != 1:
+        return jsonify({'error': 'Upload is already being completed'}), 409
+
+    assembling = f"{session['path']}.completing"
+
+    def reopen() -> None:
+        if os.path.exists(assembling):
+            os.replace(assembling, session['path'])
+        db.execute('UPDATE upload_sessions SET status = ? WHERE id = ?', ('open', upload_id))
+        db.commit()
+
+    try:
+        os.replace(session['path'], assembling)
+        checksum = file_sha256(assembling)
+        expected = (data.get('sha256') or session['sha256'] or '').lower()
+        if expected and expected != checksum:
+            db.execute('DELETE FROM upload_ranges WHERE session_id = ?', (upload_id,))
+            reopen()
+            return jsonify({'error': 'Checksum mismatch', 'sha256': checksum}), 422
+        if detect_format(assembling, session['filename']) is None:
+            reopen()
+            return jsonify({'error': 'File content does not match a supported type'}), 400
+
+        filepath = unique_path(app.config['UPLOAD_FOLDER'], session['filename'])
+        os.replace(assembling, filepath)
+    except Exception:
+        db.rollback()
+        reopen()
+        raise
+    document_id = db.insert('''INSERT INTO documents (filename, filepath, status)
+                               VALUES (?, ?, ?)''',
+                            (os.path.basename(filepath), filepath, 'queued' if data.get('parse') else 'uploaded'))
+    db.execute('''UPDATE upload_sessions SET status = ?, path = ?, sha256 = ?, document_id = ?
+                  WHERE id = ?''', ('complete', filepath, checksum, document_id, upload_id))
+    db.commit()
+
+    if data.get('parse'):
+        submit_document(document_id, filepath, tenant=get_tenant())
+    return jsonify({
+        'message': 'File uploaded successfully',
+        'uploadId': upload_id,
+        'documentId': os.path.basename(filepath),
+        'id': document_id,
+        'sha256': checksum
+    }), 201
+
 @app.route('/api/documents', methods=['GET'])
 @verify_token
 def get_documents():
+    """List documents newest first, one page at a time
+
+    Query parameters:
+        limit: Page size (default 50, max 500)
+        cursor: Opaque ``next_cursor`` from the previous page
+        fields: Comma-separated subset of DOCUMENT_FIELDS
+        status: Comma-separated statuses to include
+
+    Responses carry an ETag derived from the documents change counter, so
+    an unchanged listing answers If-None-Match with 304 without running
+    the listing query. The counter only moves when a listed column
+    changes (storage.migrations._LISTED_DOCUMENT_COLUMNS); keep the two
+    in step when adding fields.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+
+    fields = [f for f in request.args.get('fields', '').split(',') if f] or list(DOCUMENT_FIELDS)
+    unknown = [f for f in fields if f not in DOCUMENT_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    statuses = [s for s in request.args.get('status', '').split(',') if s]
+
+    cursor = None
+    if request.args.get('cursor'):
+        try:
+            cursor = decode_cursor(request.args['cursor'])
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    etag = hashlib.sha1(
+        f"{get_change_version()}|{request.query_string.decode()}".encode('utf-8')
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # created_at and id are always selected to build the next cursor
+    columns = ', '.join(f"{DOCUMENT_FIELDS[f]} AS {f}" for f in fields)
+    query = f'''SELECT {columns}, d.created_at AS _created_at, d.id AS _id
+                FROM documents d'''
+    if 'model_name' in fields:
+        query += ' LEFT JOIN llm_config l ON d.llm_config_id = l.id'
+    conditions, params = [], []
+    if statuses:
+        conditions.append(f"d.status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if cursor:
+        conditions.append('(d.created_at, d.id) < (?, ?)')
+        params.extend(cursor)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY d.created_at DESC, d.id DESC LIMIT ?'
+    params.append(limit + 1)
+
+    rows = get_db().execute(query, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(str(rows[-1]['_created_at']), rows[-1]['_id'])
+
+    response = jsonify({
+        'documents': [{f: row[f] for f in fields} for row in rows],
+        'next_cursor': next_cursor
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response, 200
+
+@app.route('/api/parse', methods=['POST'])
+@verify_token
+def parse_document():
+    """Parse an uploaded document and store its pages and chunks
+
+    Accepts ``{"id": ...}`` for a document returned by /api/upload, or
+    ``{"filepath": ...}`` for a file already in the upload folder.
+    The parse runs on the shared scheduler, at ``interactive`` priority
+    unless ``"priority"`` says otherwise, under the caller's X-Tenant-ID.
+    ``"deadline"`` caps the parse in seconds; a parse that hits it returns
+    what it has so far with a ``truncated`` marker.
+    """
+    data = request.get_json(silent=True)
+    if not data or not (data.get('id') or data.get('filepath')):
+        return jsonify({'error': 'Missing id or filepath'}), 400
+    priority = data.get('priority', 'interactive')
+    if priority not in PRIORITIES:
+        return jsonify({'error': f"Unknown priority: {priority}"}), 400
+    deadline = data.get('deadline')
+    if deadline is not None:
+        try:
+            deadline = float(deadline)
+        except (TypeError, ValueError):
+            deadline = 0
+        if deadline <= 0:
+            return jsonify({'error': 'deadline must be a positive number of seconds'}), 400
+
+    db = get_db()
+    if data.get('id'):
+        document = db.execute('SELECT id, filepath FROM documents WHERE id = ?', (data['id'],)).fetchone()
+    else:
+        document = db.execute('''SELECT id, filepath FROM documents WHERE filepath = ?
+                                ORDER BY id DESC LIMIT 1''', (data['filepath'],)).fetchone()
+    if document is None or not os.path.exists(document['filepath']):
+        return jsonify({'error': 'File not found'}), 404
+    if get_parser(document['filepath']) is None:
+        return jsonify({'error': 'Unsupported file type'}), 400
+
+    try:
+        future = submit_document(document['id'], document['filepath'],
+                                 priority=priority, tenant=get_tenant(), deadline=deadline)
+        return jsonify(future.result()), 200
+    except CancelledError:
+        return jsonify({'error': 'Parse cancelled before it started'}), 409
+    except Exception as e:
+        app.logger.error(f"Document parsing failed: {str(e)}")
+        return jsonify({'error': 'Document parsing failed'}), 500
+
+@app.route('/api/jobs/<int:document_id>/cancel', methods=['POST'])
+@verify_token
+def cancel_job(document_id):
+    """Cancel a document's queued or running parse
+
+    A queued parse is dropped (200). A running one is stopped at its next
+    page or image and keeps what it parsed so far (202).
+    """
+    state = cancel_document(document_id)
+    if state is None:
+        return jsonify({'error': 'No parse in progress for this document'}), 404
+    return jsonify({'id': document_id, 'status': state}), 200 if state == 'cancelled' else 202
+
+@app.route('/api/scheduler', methods=['GET'])
+@verify_token
+def get_scheduler_stats():
+    """Report parse workers in use and queued jobs per priority and tenant"""
+    return jsonify(get_scheduler().stats()), 200
+
+@app.route('/api/search', methods=['GET'])
+@verify_token
+def search_documents():
+    """Full-text search over parsed pages
+
+    Query parameters:
+        q: Search terms (all must match; ``term*`` matches a prefix)
+        limit: Maximum results (default 20, max 100)
+        offset: Results to skip
+        document_id: Restrict to one document
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing query'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        offset = max(int(request.args.get('offset', 0)), 0)
+        document_id = int(request.args['document_id']) if request.args.get('document_id') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid limit, offset or document_id'}), 400
+
+    started = time.perf_counter()
+    results = get_search_index().search(query, limit=limit, offset=offset, document_id=document_id)
+    return jsonify({
+        'results': results,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    }), 200
+
+@app.route('/status')
+def status():
+    """Return service health status"""
+    return jsonify({
+        'status': 'running',
+        'version': '1.0.0',
+        'timestamp': datetime.utcnow().isoformat(),
+        'startup': warmup.report()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose counters and latency histograms in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/llm/cache', methods=['GET', 'DELETE'])
+@verify_token
+def handle_llm_cache():
+    """Report LLM response cache hit-rate metrics, or clear the cache"""
+    cache = get_llm_manager().cache
+    if cache is None:
+        return jsonify({}), 200
+    if request.method == 'DELETE':
+        cache.clear()
+        return jsonify({'message': 'LLM cache cleared'}), 200
+    return jsonify(cache.stats()), 200
+
+@app.route('/api/llm/providers', methods=['GET'])
+@verify_token
+def get_llm_providers():
+    """Report configured LLM providers with rolling latency, health and rate limits"""
+    manager = get_llm_manager()
+    routing = manager.router.stats() if manager.router else {}
+    return jsonify({
+        'default': manager.default_provider,
+        'providers': {
+            provider: dict(routing.get(provider, {}), rate_limit=service.rate_limiter.stats())
+            for provider, service in manager.services.items()
+        }
+    }), 200
+
+@app.route('/api/llm/stream', methods=['POST'])
+@verify_token
+def stream_completion():
+    """Relay generated tokens to the client as Server-Sent Events
+
+    Each token is sent as a ``data:`` event carrying ``{"token": ...}``;
+    the stream ends with a ``done`` event, or an ``error`` event if the
+    provider fails mid-stream. Sampling parameters default to the latest
+    saved LLM config.
+    """
+    data = request.get_json(silent=True)
+    if not data or not data.get('prompt'):
+        return jsonify({'error': 'Missing prompt'}), 400
+
+    manager = get_llm_manager()
+    provider = data.get('provider') or manager.default_provider
+    if provider not in manager.services:
+        return jsonify({'error': 'LLM provider not configured'}), 400
+
     db = get_db()
-    documents = db.execute('''SELECT d.*, l.model_name 
-                            FROM documents d
-                            LEFT JOIN llm_config l ON d.llm_config_id = l.id
-                            ORDER BY d.created_at DESC''').fetchall()
-    return jsonify([dict(d) for d in documents]), 200
+    config = db.execute('SELECT * FROM llm_config ORDER BY created_at DESC LIMIT 1').fetchone()
+    options = {
+        'temperature': data.get('temperature', config['temperature'] if config else 0.7),
+        'max_tokens': data.get('max_tokens', config['max_tokens'] if config else 2048)
+    }
+
+    def events():
+        try:
+            for token in manager.stream(data['prompt'], provider=provider, **options):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            app.logger.error(f"LLM streaming failed: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'LLM streaming failed'})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Outside gunicorn (which preloads in the master, see gunicorn.conf.py)
+if os.getenv('PRELOAD_PARSERS') == '1':
+    warmup.preload()
+warmup.mark('app_loaded')
 
 if __name__ == '__main__':
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
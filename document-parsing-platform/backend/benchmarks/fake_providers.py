@@ -0,0 +1,139 @@
+"""Local stand-ins for the Ollama and Google AI HTTP APIs
+
+One server answers both APIs, so point the services at it with:
+    OLLAMA_BASE_URL=http://127.0.0.1:<port>
+    GOOGLE_AI_BASE_URL=http://127.0.0.1:<port>/v1beta
+
+Every response waits ``latency_ms`` (+/- ``jitter_ms``); a share of
+requests fails with 500 (``error_rate``) or 429 with Retry-After
+(``rate_limit_rate``). Streaming endpoints emit ``tokens`` tokens spaced
+``token_delay_ms`` apart. Run standalone with:
+    python -m benchmarks.fake_providers --port 11500 --latency-ms 300
+"""
+from typing import Any, Dict, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import argparse
+import json
+import random
+import threading
+import time
+
+class FakeProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency_ms: float = 200, jitter_ms: float = 50,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, tokens: int = 40,
+                 token_delay_ms: float = 10, dimension: int = 768):
+        super().__init__(('127.0.0.1', port), FakeProviderHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.tokens = tokens
+        self.token_delay_ms = token_delay_ms
+        self.dimension = dimension
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def start(self) -> 'FakeProviderServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _embedding(self, text: str) -> list:
+        rng = random.Random(text)
+        return [rng.uniform(-1, 1) for _ in range(self.server.dimension)]
+
+    def _stream(self, content_type: str, events) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        for event in events:
+            self.wfile.write(event.encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(self.server.token_delay_ms / 1000)
+
+    def do_POST(self) -> None:
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        path = urlparse(self.path).path
+        method = path.rsplit(':', 1)[-1] if ':' in path else path
+        server.count(method)
+
+        time.sleep(max(0.0, server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms)) / 1000)
+        roll = random.random()
+        if roll < server.rate_limit_rate:
+            server.count('429')
+            return self._json(429, {'error': 'rate limited'}, {'Retry-After': '1'})
+        if roll < server.rate_limit_rate + server.error_rate:
+            server.count('500')
+            return self._json(500, {'error': 'injected failure'})
+
+        tokens = [f'token{i} ' for i in range(server.tokens)]
+        if method == '/api/generate':
+            lines = [json.dumps({'response': token, 'done': False}) + '\n' for token in tokens]
+            return self._stream('application/x-ndjson', lines + [json.dumps({'response': '', 'done': True}) + '\n'])
+        if method == '/api/embeddings':
+            return self._json(200, {'embedding': self._embedding(payload.get('prompt', ''))})
+        if method == 'generateText':
+            return self._json(200, {'candidates': [{'output': ''.join(tokens)}]})
+        if method == 'streamGenerateContent':
+            return self._stream('text/event-stream', [
+                'data: ' + json.dumps({'candidates': [{'content': {'parts': [{'text': token}]}}]}) + '\n\n'
+                for token in tokens
+            ])
+        if method == 'embedText':
+            return self._json(200, {'embedding': {'value': self._embedding(payload.get('text', ''))}})
+        if method == 'batchEmbedText':
+            return self._json(200, {'embeddings': [{'value': self._embedding(text)}
+                                                   for text in payload.get('texts', [])]})
+        self._json(404, {'error': f'Unknown endpoint {path}'})
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arguments.add_argument('--port', type=int, default=11500)
+    arguments.add_argument('--latency-ms', type=float, default=200)
+    arguments.add_argument('--jitter-ms', type=float, default=50)
+    arguments.add_argument('--error-rate', type=float, default=0.0)
+    arguments.add_argument('--rate-limit-rate', type=float, default=0.0)
+    options = arguments.parse_args()
+
+    server = FakeProviderServer(options.port, options.latency_ms, options.jitter_ms,
+                                options.error_rate, options.rate_limit_rate)
+    print(f'Serving fake Ollama at {server.url} and Google AI at {server.url}/v1beta')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
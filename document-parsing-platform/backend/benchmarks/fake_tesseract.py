@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Stand-in for the ``tesseract`` CLI used by load tests
+
+Point ``TESSERACT_CMD`` at this file. It answers ``--version`` and
+``--list-langs`` like Tesseract and, for a recognition call
+(``tesseract <image> <output base> [options] txt``), sleeps for
+``FAKE_TESSERACT_MS`` (+/- ``FAKE_TESSERACT_JITTER_MS``) and writes fixed
+text, so OCR cost is controlled without Tesseract installed.
+"""
+import os
+import random
+import sys
+import time
+
+TEXT = 'Synthetic OCR output for load testing.\n'
+
+def main(argv) -> int:
+    if '--version' in argv:
+        print('tesseract 5.3.0 (fake)')
+        return 0
+    if '--list-langs' in argv:
+        print('List of available languages (2):\neng\nben')
+        return 0
+    if len(argv) < 2:
+        print('Usage: fake_tesseract.py imagename outputbase [options...] [configfile...]', file=sys.stderr)
+        return 1
+
+    delay = float(os.getenv('FAKE_TESSERACT_MS', '200'))
+    jitter = float(os.getenv('FAKE_TESSERACT_JITTER_MS', '50'))
+    time.sleep(max(0.0, delay + random.uniform(-jitter, jitter)) / 1000)
+
+    output = argv[1]
+    if output in ('stdout', '-'):
+        sys.stdout.write(TEXT)
+    else:
+        with open(output + '.txt', 'w') as f:
+            f.write(TEXT)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
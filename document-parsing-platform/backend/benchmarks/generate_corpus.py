@@ -0,0 +1,225 @@
+"""Generate a reproducible synthetic corpus for the parsing benchmarks
+
+Usage (from the backend directory):
+    python -m benchmarks.generate_corpus --out benchmarks/corpus --scale 1
+
+The same seed and scale always produce the same documents, so results from
+different machines or commits can be compared. A ``manifest.json`` listing
+every file, its kind and its checksum is written next to the documents.
+
+Bangla text is only rendered into scanned pages when a Bengali TrueType
+font is found (``--font`` or ``BENCH_BANGLA_FONT``); Pillow needs libraqm
+to shape it correctly. Without one, mixed-language scans fall back to
+English and the manifest records that.
+"""
+from typing import Any, Dict, List, Optional
+from io import BytesIO
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+from docx import Document
+from docx.shared import Inches
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+ENGLISH_WORDS = (
+    'document parsing platform invoice contract report payment account balance '
+    'section clause agreement total amount date customer service delivery schedule '
+    'revenue quarter summary analysis review approval signature witness office '
+    'district government application certificate registration number reference'
+).split()
+
+BANGLA_WORDS = (
+    'বাংলাদেশ সরকার আবেদন নম্বর তারিখ মোট টাকা চুক্তি প্রতিবেদন হিসাব '
+    'জেলা অফিস স্বাক্ষর গ্রাহক সেবা সনদ নিবন্ধন বিবরণ অনুমোদন পর্যালোচনা'
+).split()
+
+BANGLA_FONTS = (
+    '/usr/share/fonts/truetype/noto/NotoSansBengali-Regular.ttf',
+    '/usr/share/fonts/truetype/lohit-bengali/Lohit-Bengali.ttf',
+    '/usr/share/fonts/truetype/freefont/FreeSerif.ttf'
+)
+LATIN_FONTS = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf'
+)
+
+# (name, generator, options); page, row and image counts are multiplied by --scale
+CORPUS = [
+    ('born_digital_short', 'text_pdf', {'pages': 10}),
+    ('born_digital_long', 'text_pdf', {'pages': 200}),
+    ('scanned_eng', 'scanned_pdf', {'pages': 5, 'languages': ['eng']}),
+    ('scanned_mixed', 'scanned_pdf', {'pages': 5, 'languages': ['eng', 'ben']}),
+    ('docx_large_table', 'docx', {'paragraphs': 20, 'rows': 500, 'cols': 8, 'images': 0,
+                                  'languages': ['eng']}),
+    ('docx_images_mixed', 'docx', {'paragraphs': 200, 'rows': 20, 'cols': 4, 'images': 10,
+                                   'languages': ['eng', 'ben']})
+]
+
+def sentence(rng: random.Random, languages: List[str], words: int = 12) -> str:
+    vocabulary = ENGLISH_WORDS + (BANGLA_WORDS if 'ben' in languages else [])
+    return ' '.join(rng.choice(vocabulary) for _ in range(words)).capitalize() + '.'
+
+def find_font(paths, size: int, explicit: Optional[str] = None):
+    for path in ([explicit] if explicit else []) + list(paths):
+        if path and os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return None
+
+def _pdf_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def write_text_pdf(path: str, pages: List[List[str]], title: str) -> None:
+    """Write a born-digital PDF with one Helvetica text stream per page"""
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # page tree, filled in once page object numbers are known
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        f'<< /Title ({_pdf_escape(title)}) /Author (benchmarks) /CreationDate (D:20240101000000Z) >>'
+    ]
+    kids = []
+    for lines in pages:
+        body = 'BT /F1 10 Tf 13 TL 50 800 Td\n' + '\n'.join(
+            f'({_pdf_escape(line)}) Tj T*' for line in lines
+        ) + '\nET'
+        data = body.encode('latin-1', 'replace')
+        objects.append(f'<< /Length {len(data)} >>\nstream\n{data.decode("latin-1")}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{obj}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode('latin-1')
+    out += (f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R /Info 4 0 R >>\n'
+            f'startxref\n{xref}\n%%EOF\n').encode('latin-1')
+    with open(path, 'wb') as f:
+        f.write(out)
+
+def render_scan(rng: random.Random, lines: List[str], font, size=(1240, 1754)) -> Image.Image:
+    """Render text as a slightly skewed, noisy 150 dpi greyscale scan"""
+    page = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(page)
+    y = 100
+    for line in lines:
+        draw.text((100, y), line, fill=rng.randint(0, 60), font=font)
+        y += 36
+    page = page.rotate(rng.uniform(-1.5, 1.5), fillcolor=255)
+    noise = Image.effect_noise(size, 40)
+    return Image.blend(page, noise, 0.08)
+
+class CorpusGenerator:
+    """Builds the benchmark corpus described by ``CORPUS``"""
+
+    def __init__(self, out_dir: str, seed: int = 1234, scale: float = 1.0,
+                 bangla_font: Optional[str] = None):
+        self.out_dir = out_dir
+        self.seed = seed
+        self.scale = scale
+        self.bangla_font = find_font(BANGLA_FONTS, 28, bangla_font)
+        self.latin_font = find_font(LATIN_FONTS, 28) or ImageFont.load_default()
+        if self.bangla_font is None:
+            logger.warning('No Bengali font found; mixed-language scans will be English only')
+
+    def _count(self, value: int) -> int:
+        return max(1, int(round(value * self.scale)))
+
+    def _languages(self, languages: List[str]) -> List[str]:
+        if 'ben' in languages and self.bangla_font is None:
+            return [lang for lang in languages if lang != 'ben'] or ['eng']
+        return languages
+
+    def text_pdf(self, path: str, rng: random.Random, pages: int) -> Dict[str, Any]:
+        content = [[sentence(rng, ['eng']) for _ in range(55)] for _ in range(self._count(pages))]
+        write_text_pdf(path, content, os.path.basename(path))
+        return {'pages': len(content), 'images': 0, 'languages': ['eng']}
+
+    def scanned_pdf(self, path: str, rng: random.Random, pages: int, languages: List[str]) -> Dict[str, Any]:
+        languages = self._languages(languages)
+        font = self.bangla_font if 'ben' in languages else self.latin_font
+        scans = [render_scan(rng, [sentence(rng, languages, 6) for _ in range(40)], font)
+                 for _ in range(self._count(pages))]
+        # Pillow stores greyscale pages as DCTDecode (JPEG) image XObjects
+        scans[0].save(path, 'PDF', save_all=True, append_images=scans[1:], resolution=150.0, quality=75)
+        image_path = os.path.join(self.out_dir, 'images', os.path.basename(path)[:-4] + '.png')
+        scans[0].save(image_path)
+        return {'pages': len(scans), 'images': len(scans), 'languages': languages,
+                'sample_image': os.path.relpath(image_path, self.out_dir)}
+
+    def docx(self, path: str, rng: random.Random, paragraphs: int, rows: int, cols: int,
+             images: int, languages: List[str]) -> Dict[str, Any]:
+        document = Document()
+        document.core_properties.author = 'benchmarks'
+        document.add_heading(sentence(rng, languages, 5), level=1)
+        for _ in range(self._count(paragraphs)):
+            document.add_paragraph(sentence(rng, languages, rng.randint(10, 40)))
+
+        table = document.add_table(rows=self._count(rows), cols=cols)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = f'{rng.choice(ENGLISH_WORDS)} {rng.randint(0, 99999)}'
+
+        image_count = self._count(images) if images else 0
+        for _ in range(image_count):
+            image = render_scan(rng, [sentence(rng, ['eng'], 6) for _ in range(8)],
+                                self.latin_font, size=(1200, 400))
+            buffer = BytesIO()
+            image.save(buffer, format='PNG')
+            buffer.seek(0)
+            document.add_picture(buffer, width=Inches(6))
+        document.save(path)
+        return {'pages': 1, 'images': image_count, 'languages': languages,
+                'table_cells': len(table.rows) * cols}
+
+    def generate(self) -> Dict[str, Any]:
+        os.makedirs(os.path.join(self.out_dir, 'images'), exist_ok=True)
+        documents = []
+        for name, kind, options in CORPUS:
+            # Each document gets its own stream so adding entries keeps the others stable
+            rng = random.Random(f'{self.seed}:{name}')
+            extension = 'docx' if kind == 'docx' else 'pdf'
+            path = os.path.join(self.out_dir, f'{name}.{extension}')
+            logger.info(f'Generating {path}')
+            details = getattr(self, kind)(path, rng, **options)
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            documents.append(dict(details, name=name, kind=kind, path=os.path.basename(path),
+                                  bytes=os.path.getsize(path), sha256=digest))
+
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'seed': self.seed,
+            'scale': self.scale,
+            'documents': documents
+        }
+        with open(os.path.join(self.out_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return manifest
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    arguments = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arguments.add_argument('--out', default=os.path.join('benchmarks', 'corpus'))
+    arguments.add_argument('--seed', type=int, default=1234)
+    arguments.add_argument('--scale', type=float, default=1.0,
+                           help='Multiply page, paragraph, row and image counts')
+    arguments.add_argument('--font', default=os.getenv('BENCH_BANGLA_FONT'),
+                           help='Bengali TrueType font for scanned pages')
+    options = arguments.parse_args()
+
+    manifest = CorpusGenerator(options.out, options.seed, options.scale, options.font).generate()
+    print(f"Generated {len(manifest['documents'])} documents in {options.out}")
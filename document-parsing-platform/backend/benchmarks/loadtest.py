@@ -0,0 +1,310 @@
+"""End-to-end load test of the Flask service against local stand-ins
+
+Usage (from the backend directory):
+    python -m benchmarks.loadtest --rps 20 --duration 60 --mix upload=2,parse=1,list=5,search=1,llm=1
+
+Unless ``--url`` names a running server, this starts the fake provider
+server (benchmarks.fake_providers), then boots the app in a scratch
+directory. The app uses the fake providers, its own database and the fake
+Tesseract (benchmarks/fake_tesseract.py).
+
+Requests are issued open-loop at the target rate. Latency is measured from
+each request's scheduled start, so time spent queued behind a saturated
+server is counted rather than hidden. The report gives p50/p95/p99
+latency, throughput and error rate per endpoint.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+from benchmarks.fake_providers import FakeProviderServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_TESSERACT = os.path.join(BACKEND_DIR, 'benchmarks', 'fake_tesseract.py')
+SEARCH_TERMS = ('invoice', 'contract', 'report', 'payment', 'revenue', 'certificate')
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def sample_files(corpus: str) -> List[Tuple[str, bytes]]:
+    """Upload payloads: the benchmark corpus if generated, else one small PDF"""
+    manifest = os.path.join(corpus, 'manifest.json')
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            documents = json.load(f)['documents']
+        files = []
+        for document in documents:
+            with open(os.path.join(corpus, document['path']), 'rb') as f:
+                files.append((document['path'], f.read()))
+        return files
+
+    from benchmarks.generate_corpus import write_text_pdf, sentence
+    rng = random.Random(0)
+    path = os.path.join(tempfile.mkdtemp(), 'sample.pdf')
+    write_text_pdf(path, [[sentence(rng, ['eng']) for _ in range(50)] for _ in range(3)], 'sample')
+    with open(path, 'rb') as f:
+        return [('sample.pdf', f.read())]
+
+class AppServer:
+    """The Flask app in a subprocess wired to the fake providers"""
+
+    def __init__(self, providers_url: str, token: str, server: str = 'flask', workers: int = 2):
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.workdir = tempfile.mkdtemp(prefix='loadtest-')
+        os.makedirs(os.path.join(self.workdir, 'uploads'))
+        self.env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.getenv('PYTHONPATH')])),
+            API_BEARER_TOKEN=token,
+            OLLAMA_MODEL='fake',
+            OLLAMA_BASE_URL=providers_url,
+            GOOGLE_AI_KEY='fake',
+            GOOGLE_AI_MODEL='fake',
+            GOOGLE_AI_BASE_URL=f'{providers_url}/v1beta',
+            TESSERACT_CMD=FAKE_TESSERACT,
+            SEARCH_INDEX_PATH=os.path.join(self.workdir, 'search_index.db')
+        )
+        self.env.pop('DATABASE_URL', None)
+        if server == 'gunicorn':
+            self.command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'),
+                            '-b', f'127.0.0.1:{self.port}', '-w', str(workers), '--threads', '8', 'app:app']
+        else:
+            self.command = [sys.executable, '-m', 'flask', '--app', 'app', 'run',
+                            '--port', str(self.port), '--with-threads']
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 30) -> 'AppServer':
+        log = open(os.path.join(self.workdir, 'server.log'), 'w')
+        self.process = subprocess.Popen(self.command, cwd=self.workdir, env=self.env,
+                                        stdout=log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'App exited during startup; see {log.name}')
+            try:
+                if requests.get(f'{self.url}/status', timeout=1).ok:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f'App did not start within {timeout}s; see {log.name}')
+
+    def stop(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+class LoadTest:
+    """Open-loop traffic generator with per-endpoint latency accounting"""
+
+    def __init__(self, url: str, token: str, mix: Dict[str, float], files: List[Tuple[str, bytes]],
+                 seed: int = 0):
+        self.url = url
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.files = files
+        self.operations: Dict[str, Callable[[requests.Session], Tuple[str, bool]]] = {
+            'upload': self.upload,
+            'parse': self.parse,
+            'list': self.list,
+            'search': self.search,
+            'llm': self.llm
+        }
+        unknown = [name for name in mix if name not in self.operations]
+        if unknown:
+            raise ValueError(f"Unknown operations: {', '.join(unknown)}")
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.rng = random.Random(seed)
+        self.document_ids: deque = deque(maxlen=1000)
+        self.samples: List[Tuple[str, float, bool]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+            self._local.session.headers.update(self.headers)
+        return self._local.session
+
+    def upload(self, session: requests.Session) -> Tuple[str, bool]:
+        name, data = random.choice(self.files)
+        response = session.post(f'{self.url}/api/upload',
+                                files={'file': (f'{uuid.uuid4().hex[:8]}_{name}', data)}, timeout=120)
+        if response.status_code == 201:
+            self.document_ids.append(response.json()['id'])
+        return '/api/upload', response.status_code == 201
+
+    def parse(self, session: requests.Session) -> Tuple[str, bool]:
+        if not self.document_ids:
+            return self.upload(session)
+        response = session.post(f'{self.url}/api/parse', json={'id': random.choice(self.document_ids)},
+                                timeout=300)
+        return '/api/parse', response.ok
+
+    def list(self, session: requests.Session) -> Tuple[str, bool]:
+        response = session.get(f'{self.url}/api/documents', params={'limit': 50}, timeout=60)
+        return '/api/documents', response.ok
+
+    def search(self, session: requests.Session) -> Tuple[str, bool]:
+        response = session.get(f'{self.url}/api/search', params={'q': random.choice(SEARCH_TERMS)},
+                               timeout=60)
+        return '/api/search', response.ok
+
+    def llm(self, session: requests.Session) -> Tuple[str, bool]:
+        response = session.post(f'{self.url}/api/llm/stream',
+                                json={'prompt': f'Summarize document {uuid.uuid4().hex}'}, timeout=300)
+        # Provider failures arrive as an SSE error event on a 200 response
+        return '/api/llm/stream', response.ok and 'event: error' not in response.text
+
+    def _run_one(self, name: str, scheduled: float, record: bool) -> None:
+        endpoint = name
+        try:
+            endpoint, ok = self.operations[name](self._session())
+        except requests.RequestException:
+            ok = False
+        latency = time.monotonic() - scheduled
+        if record:
+            with self._lock:
+                self.samples.append((endpoint, latency, ok))
+
+    def run(self, rps: float, duration: float, warmup: float = 5, workers: int = 64) -> float:
+        """Drive traffic for ``warmup + duration`` seconds; returns the measured window"""
+        total = warmup + duration
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i in range(int(total * rps)):
+                scheduled = started + i / rps
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                name = self.rng.choices(self.names, self.weights)[0]
+                pool.submit(self._run_one, name, scheduled, scheduled - started >= warmup)
+        return max(time.monotonic() - started - warmup, 1e-9)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints: Dict[str, List[Tuple[float, bool]]] = {}
+        for endpoint, latency, ok in self.samples:
+            endpoints.setdefault(endpoint, []).append((latency, ok))
+        endpoints['total'] = [(latency, ok) for _, latency, ok in self.samples]
+
+        report = {}
+        for endpoint, samples in endpoints.items():
+            latencies = [latency * 1000 for latency, _ in samples]
+            errors = sum(1 for _, ok in samples if not ok)
+            report[endpoint] = {
+                'requests': len(samples),
+                'errors': errors,
+                'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+                'throughput_rps': round((len(samples) - errors) / elapsed, 2),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'max_ms': max(latencies) if latencies else None
+            }
+        return report
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = (f"{'endpoint':<18} {'reqs':>7} {'err%':>7} {'ok rps':>8} "
+              f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print(header)
+    print('-' * len(header))
+    for endpoint, r in report.items():
+        def ms(value):
+            return f'{value:.1f}' if value is not None else '-'
+        print(f"{endpoint:<18} {r['requests']:>7} {r['error_rate']:>7.1%} {r['throughput_rps']:>8.2f} "
+              f"{ms(r['p50_ms']):>9} {ms(r['p95_ms']):>9} {ms(r['p99_ms']):>9} {ms(r['max_ms']):>9}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arguments.add_argument('--url', help='Target a running server instead of booting one')
+    arguments.add_argument('--token', default=os.getenv('API_BEARER_TOKEN', 'loadtest-token'))
+    arguments.add_argument('--rps', type=float, default=10)
+    arguments.add_argument('--duration', type=float, default=60)
+    arguments.add_argument('--warmup', type=float, default=5)
+    arguments.add_argument('--workers', type=int, default=64, help='Client concurrency cap')
+    arguments.add_argument('--mix', default='upload=2,parse=1,list=5,search=1,llm=1')
+    arguments.add_argument('--corpus', default=os.path.join('benchmarks', 'corpus'))
+    arguments.add_argument('--server', choices=('flask', 'gunicorn'), default='flask')
+    arguments.add_argument('--server-workers', type=int, default=2)
+    arguments.add_argument('--provider-latency-ms', type=float, default=200)
+    arguments.add_argument('--provider-jitter-ms', type=float, default=50)
+    arguments.add_argument('--provider-error-rate', type=float, default=0.0)
+    arguments.add_argument('--provider-rate-limit-rate', type=float, default=0.0)
+    arguments.add_argument('--ocr-ms', type=float, default=200, help='Fake Tesseract time per image')
+    arguments.add_argument('--output', help='Write the report as JSON')
+    options = arguments.parse_args(argv)
+
+    providers = app = None
+    url = options.url
+    if url is None:
+        os.environ['FAKE_TESSERACT_MS'] = str(options.ocr_ms)
+        providers = FakeProviderServer(
+            latency_ms=options.provider_latency_ms,
+            jitter_ms=options.provider_jitter_ms,
+            error_rate=options.provider_error_rate,
+            rate_limit_rate=options.provider_rate_limit_rate
+        ).start()
+        app = AppServer(providers.url, options.token, options.server, options.server_workers).start()
+        url = app.url
+        print(f'App at {url} (workdir {app.workdir}), fake providers at {providers.url}', file=sys.stderr)
+
+    try:
+        test = LoadTest(url, options.token, parse_mix(options.mix), sample_files(options.corpus))
+        elapsed = test.run(options.rps, options.duration, options.warmup, options.workers)
+        report = test.report(elapsed)
+    finally:
+        if app:
+            app.stop()
+        if providers:
+            providers.stop()
+
+    print_report(report)
+    if providers:
+        print(f'\nProvider calls: {json.dumps(providers.counts)}')
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({
+                'target_rps': options.rps,
+                'duration': options.duration,
+                'mix': parse_mix(options.mix),
+                'endpoints': report,
+                'provider_calls': providers.counts if providers else None
+            }, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Run the parsing benchmarks and compare them against a baseline
+
+Usage (from the backend directory):
+    python -m benchmarks.generate_corpus
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Every (configuration, document) pair is measured in a fresh process, so
+peak RSS belongs to that parse alone and import costs are not shared.
+Reported per pair: median wall time, pages/sec, OCR ms/image, peak RSS and
+the size of the JSON result. Results are saved under benchmarks/results/.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+# name -> (module, class, constructor kwargs, input kinds it applies to)
+CONFIGS = {
+    'pdf': ('parsers.pdf_parser', 'PDFParser', {'ocr_languages': ['eng']}, ('text_pdf', 'scanned_pdf')),
+    'docx': ('parsers.docx_parser', 'DOCXParser', {'ocr_languages': ['eng']}, ('docx',)),
+    'ocr_eng': ('parsers.ocr_processor', 'OCRProcessor', {'languages': ['eng']}, ('image',)),
+    'ocr_eng_ben': ('parsers.ocr_processor', 'OCRProcessor', {'languages': ['eng', 'ben']}, ('image',))
+}
+
+# metric -> True when higher is better
+METRICS = {
+    'pages_per_sec': True,
+    'ocr_ms_per_image': False,
+    'peak_rss_mb': False,
+    'output_bytes': False
+}
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+def measure(config: str, path: str, repeat: int) -> Dict[str, Any]:
+    """Parse one input ``repeat`` times in this process and report its metrics"""
+    module, name, kwargs, _ = CONFIGS[config]
+    instance = getattr(importlib.import_module(module), name)(**kwargs)
+    ocr_times: List[float] = []
+
+    if name == 'OCRProcessor':
+        import cv2
+        image = cv2.imread(path)
+
+        def run() -> Tuple[Any, int]:
+            started = time.perf_counter()
+            text = instance.process_image(image)
+            ocr_times.append(time.perf_counter() - started)
+            return {'text': text}, 1
+    else:
+        perform_ocr = instance._perform_ocr
+
+        def timed_ocr(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return perform_ocr(*args, **kwargs)
+            finally:
+                ocr_times.append(time.perf_counter() - started)
+        instance._perform_ocr = timed_ocr
+
+        def run() -> Tuple[Any, int]:
+            result = instance.parse(path)
+            return result, result.get('metadata', {}).get('pages') or 1
+
+    seconds = []
+    for _ in range(repeat):
+        ocr_times.clear()
+        started = time.perf_counter()
+        result, pages = run()
+        seconds.append(time.perf_counter() - started)
+
+    median = statistics.median(seconds)
+    return {
+        'pages': pages,
+        'seconds': round(median, 4),
+        'seconds_all': [round(s, 4) for s in seconds],
+        'pages_per_sec': round(pages / median, 3) if median else None,
+        'ocr_images': len(ocr_times),
+        'ocr_ms_per_image': round(1000 * sum(ocr_times) / len(ocr_times), 2) if ocr_times else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'output_bytes': len(json.dumps(result, default=str).encode('utf-8'))
+    }
+
+def plan(manifest: Dict[str, Any], corpus: str, configs: List[str]) -> List[Tuple[str, str, str]]:
+    """List (config, input name, path) pairs for the corpus"""
+    inputs = []
+    for document in manifest['documents']:
+        inputs.append((document['name'], document['kind'], os.path.join(corpus, document['path'])))
+        if document.get('sample_image'):
+            inputs.append((f"{document['name']}_image", 'image',
+                           os.path.join(corpus, document['sample_image'])))
+    return [(config, name, path)
+            for config in configs
+            for name, kind, path in inputs
+            if kind in CONFIGS[config][3]]
+
+def environment() -> Dict[str, Any]:
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+    try:
+        import pytesseract
+        info['tesseract'] = str(pytesseract.get_tesseract_version())
+    except Exception:
+        info['tesseract'] = None
+    try:
+        info['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                        text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info['commit'] = None
+    return info
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float) -> List[Dict[str, Any]]:
+    """Relative change of each metric against the baseline; flags regressions beyond ``threshold``"""
+    previous = {(r['config'], r['input']): r for r in baseline['results']}
+    changes = []
+    for result in results:
+        before = previous.get((result['config'], result['input']))
+        if before is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            changes.append({
+                'config': result['config'],
+                'input': result['input'],
+                'metric': metric,
+                'baseline': old,
+                'current': new,
+                'change': round(change, 4),
+                'regression': worse > threshold
+            })
+    return changes
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    header = f"{'config':<12} {'input':<26} {'pages/s':>9} {'ocr ms/img':>11} {'rss MB':>8} {'out KB':>9}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        ocr = f"{r['ocr_ms_per_image']:.1f}" if r['ocr_ms_per_image'] is not None else '-'
+        print(f"{r['config']:<12} {r['input']:<26} {r['pages_per_sec'] or 0:>9.2f} {ocr:>11} "
+              f"{r['peak_rss_mb']:>8.1f} {r['output_bytes'] / 1024:>9.1f}")
+
+def print_changes(changes: List[Dict[str, Any]]) -> None:
+    for c in changes:
+        marker = 'REGRESSION' if c['regression'] else ''
+        print(f"{c['config']:<12} {c['input']:<26} {c['metric']:<17} "
+              f"{c['baseline']:>10} -> {c['current']:<10} {c['change']:+.1%} {marker}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arguments.add_argument('--corpus', default=os.path.join('benchmarks', 'corpus'))
+    arguments.add_argument('--configs', default=','.join(CONFIGS),
+                           help='Comma-separated subset of: ' + ', '.join(CONFIGS))
+    arguments.add_argument('--repeat', type=int, default=3)
+    arguments.add_argument('--output', help='Results file (default benchmarks/results/<timestamp>.json)')
+    arguments.add_argument('--baseline', help='Earlier results file to compare against')
+    arguments.add_argument('--threshold', type=float, default=0.10,
+                           help='Relative change counted as a regression (default 0.10)')
+    arguments.add_argument('--fail-on-regression', action='store_true')
+    options = arguments.parse_args(argv)
+
+    configs = [c for c in options.configs.split(',') if c]
+    unknown = [c for c in configs if c not in CONFIGS]
+    if unknown:
+        arguments.error(f"Unknown configs: {', '.join(unknown)}")
+    with open(os.path.join(options.corpus, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    results = []
+    spawn = multiprocessing.get_context('spawn')
+    for config, name, path in plan(manifest, options.corpus, configs):
+        print(f"Measuring {config} on {name}...", file=sys.stderr)
+        # A fresh single-worker pool per pair keeps peak RSS per parse
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            metrics = pool.submit(measure, config, path, options.repeat).result()
+        results.append(dict(metrics, config=config, input=name, input_bytes=os.path.getsize(path)))
+
+    report = {
+        'created': datetime.utcnow().isoformat(),
+        'environment': environment(),
+        'corpus': {'seed': manifest['seed'], 'scale': manifest['scale'], 'version': manifest['version']},
+        'repeat': options.repeat,
+        'results': results
+    }
+    output = options.output or os.path.join(
+        'benchmarks', 'results', datetime.utcnow().strftime('%Y%m%dT%H%M%S') + '.json'
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_results(results)
+    print(f"\nSaved {output}")
+
+    if not options.baseline:
+        return 0
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('corpus') != report['corpus']:
+        print('Warning: baseline was measured on a different corpus', file=sys.stderr)
+    changes = compare(results, baseline, options.threshold)
+    print(f"\nCompared with {options.baseline}:")
+    print_changes(changes)
+    regressions = [c for c in changes if c['regression']]
+    print(f"\n{len(regressions)} regressions beyond {options.threshold:.0%}")
+    return 1 if regressions and options.fail_on_regression else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""Gunicorn settings for the backend
+
+    gunicorn --config gunicorn.conf.py --bind 0.0.0.0:5000 --workers 4 app:app
+
+The app is imported once in the master (``preload_app``), which then
+preloads the parsers and discovers OCR languages (services.warmup) before
+forking. Workers start warm and share those pages copy-on-write. Set
+``GUNICORN_PRELOAD=0`` to load the app in each worker instead, e.g. for
+``--reload`` during development.
+"""
+import gc
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before workers fork
+    if not server.cfg.preload_app:
+        return
+    from services import warmup
+    stages = warmup.preload()
+    server.log.info('Preloaded ' + ', '.join(f'{name} in {seconds:.2f}s' for name, seconds in stages.items()))
+    # Keep the preloaded objects out of the collector so workers' GC passes
+    # do not touch (and un-share) their pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    from services import warmup
+    warmup.mark('worker_forked')
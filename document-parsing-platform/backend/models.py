@@ -1,42 +1,65 @@
-import sqlite3
-from sqlite3 import Connection
-from typing import Optional
+import os
+import threading
+from typing import Any, Optional
+
+from storage.base import StorageBackend
 
 DATABASE = 'document_parser.db'
 
-def get_db() -> Connection:
-    """Get a database connection"""
-    db = sqlite3.connect(DATABASE)
-    db.row_factory = sqlite3.Row
-    return db
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+def get_backend() -> StorageBackend:
+    """Get the configured storage backend
+
+    ``DATABASE_URL`` pointing at PostgreSQL selects the pooled PostgreSQL
+    backend (sized by ``DB_POOL_MIN``/``DB_POOL_MAX``); otherwise the local
+    SQLite file is used.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            url = os.getenv('DATABASE_URL', '')
+            if url.startswith(('postgres://', 'postgresql://')):
+                from storage.postgres_backend import PostgresBackend
+                _backend = PostgresBackend(
+                    url,
+                    min_connections=int(os.getenv('DB_POOL_MIN', '1')),
+                    max_connections=int(os.getenv('DB_POOL_MAX', '10'))
+                )
+            else:
+                from storage.sqlite_backend import SQLiteBackend
+                _backend = SQLiteBackend(DATABASE)
+        return _backend
+
+def get_db() -> Any:
+    """Get this thread's database connection"""
+    return get_backend().get_connection()
+
+def close_db(exception: Optional[BaseException] = None) -> None:
+    """Release this thread's connection at request teardown
+
+    Uncommitted work is rolled back. SQLite connections stay open for reuse
+    by the thread; PostgreSQL connections go back to the pool.
+    """
+    get_backend().release_connection(exception)
+
+def get_change_version(name: str = 'documents') -> int:
+    """Return the change counter for a listing (a single primary-key read)
+
+    Read on every call rather than cached: each gunicorn worker has its own
+    memory, so a copy held in process would miss other workers' writes and
+    answer with a stale 304.
+    """
+    row = get_db().execute('SELECT version FROM change_counter WHERE name = ?', (name,)).fetchone()
+    return row['version'] if row else 0
 
 def init_db():
-    """Initialize the database with required tables"""
-    db = get_db()
-    
-    # Create llm_config table
-    db.execute('''
-        CREATE TABLE IF NOT EXISTS llm_config (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            model_name TEXT NOT NULL,
-            temperature REAL NOT NULL,
-            max_tokens INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create documents table
-    db.execute('''
-        CREATE TABLE IF NOT EXISTS documents (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            filename TEXT NOT NULL,
-            filepath TEXT NOT NULL,
-            status TEXT NOT NULL,
-            llm_config_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (llm_config_id) REFERENCES llm_config(id)
-        )
-    ''')
-    
-    db.commit()
-    db.close()
\ No newline at end of file
+    """Initialize the database by applying pending migrations
+
+    Connections opened here are closed again so processes forked afterwards
+    (gunicorn workers) start without inherited handles.
+    """
+    backend = get_backend()
+    backend.migrate()
+    backend.close()
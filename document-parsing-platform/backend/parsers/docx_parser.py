@@ -1,21 +1,28 @@
 from docx import Document
 from docx.table import Table
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 import base64
 from io import BytesIO
 from PIL import Image
-import pytesseract
 import cv2
 import numpy as np
 
+from parsers.ocr_processor import run_tesseract
+from services.cancellation import CancellationToken, OperationCancelled
+from services.metrics import collect_timings, timed
+
 class DOCXParser:
     def __init__(self, ocr_languages: list = ['eng']):
         self.ocr_languages = ocr_languages
         self.handwriting_languages = ['ben']  # Bengali support
 
-    def parse(self, file_path: str) -> Dict[str, Any]:
-        """Parse a DOCX file and extract text, tables, and images"""
+    def parse(self, file_path: str, token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """Parse a DOCX file and extract text, tables, and images
+
+        Stops at the next body element once ``token`` fires and returns the
+        partial result with a ``truncated`` marker.
+        """
         result = {
             'text': '',
             'tables': [],
@@ -24,32 +31,53 @@ class DOCXParser:
         }
 
         try:
-            doc = Document(file_path)
-            
-            # Extract metadata
-            result['metadata']['author'] = doc.core_properties.author
-            result['metadata']['created'] = str(doc.core_properties.created)
-            result['metadata']['modified'] = str(doc.core_properties.modified)
-            
-            # Process document elements
-            for element in doc.element.body:
-                if element.tag.endswith('p'):  # Paragraph
-                    paragraph = element
-                    result['text'] += self._extract_paragraph_text(paragraph) + '\n'
-                
-                elif element.tag.endswith('tbl'):  # Table
-                    table = Table(element, doc)
-                    result['tables'].append(self._extract_table_data(table))
-                
-                elif element.tag.endswith('drawing'):  # Image
-                    image = self._extract_docx_image(element)
-                    if image:
-                        ocr_text = self._perform_ocr(image)
-                        result['images'].append({
-                            'text': ocr_text,
-                            'base64': self._image_to_base64(image)
-                        })
+            with collect_timings() as timings:
+                with timed('docx', 'open'):
+                    doc = Document(file_path)
+
+                    # Extract metadata
+                    result['metadata']['author'] = doc.core_properties.author
+                    result['metadata']['created'] = str(doc.core_properties.created)
+                    result['metadata']['modified'] = str(doc.core_properties.modified)
+
+                # Process document elements, stopping early if the token fires
+                elements = list(doc.element.body)
+                processed = 0
+                try:
+                    for element in elements:
+                        if token is not None:
+                            token.check()
+                        if element.tag.endswith('p'):  # Paragraph
+                            paragraph = element
+                            with timed('docx', 'paragraph'):
+                                result['text'] += self._extract_paragraph_text(paragraph) + '\n'
+
+                        elif element.tag.endswith('tbl'):  # Table
+                            with timed('docx', 'table'):
+                                table = Table(element, doc)
+                                result['tables'].append(self._extract_table_data(table))
+
+                        elif element.tag.endswith('drawing'):  # Image
+                            with timed('docx', 'decode_image'):
+                                image = self._extract_docx_image(element)
+                            if image:
+                                ocr_text = self._perform_ocr(image, token)
+                                with timed('docx', 'encode_image'):
+                                    encoded = self._image_to_base64(image)
+                                result['images'].append({
+                                    'text': ocr_text,
+                                    'base64': encoded
+                                })
+                        processed += 1
+                except OperationCancelled as e:
+                    result['truncated'] = {
+                        'reason': e.reason,
+                        'unit': 'elements',
+                        'processed': processed,
+                        'total': len(elements)
+                    }
 
+            result['timings'] = timings.summary()
             return result
 
         except Exception as e:
@@ -91,14 +119,18 @@ class DOCXParser:
             return None
         return None
 
-    def _perform_ocr(self, image: Image.Image) -> str:
+    def _perform_ocr(self, image: Image.Image, token: Optional[CancellationToken] = None) -> str:
         """Perform OCR on an image with support for multiple languages"""
         try:
-            img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-            thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+            with timed('docx', 'ocr_preprocess'):
+                img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+                gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+                thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
             languages = '+'.join(self.ocr_languages + self.handwriting_languages)
-            return pytesseract.image_to_string(thresh, lang=languages)
+            with timed('docx', 'tesseract'):
+                return run_tesseract(thresh, languages, token=token)
+        except OperationCancelled:
+            raise
         except Exception as e:
             print(f"OCR failed: {str(e)}")
             return ""
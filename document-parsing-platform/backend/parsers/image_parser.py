@@ -0,0 +1,70 @@
+from PIL import Image, ImageSequence
+from typing import Dict, Any, Optional
+import numpy as np
+import json
+import logging
+
+from parsers.ocr_processor import OCRProcessor
+from services.cancellation import CancellationToken, OperationCancelled
+from services.metrics import collect_timings, timed
+
+logger = logging.getLogger(__name__)
+
+class ImageParser:
+    def __init__(self, ocr_languages: list = ['eng']):
+        self.ocr_languages = ocr_languages
+        self.handwriting_languages = ['ben']  # Bengali support
+        self.ocr = OCRProcessor(languages=self.ocr_languages + self.handwriting_languages)
+
+    def parse(self, file_path: str, token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """OCR a scanned image (PNG, JPEG, BMP or multi-page TIFF)
+
+        Each frame is a page. Frames are decoded one at a time and passed to
+        OCRProcessor as grayscale arrays, so a long TIFF never has more than
+        one page in memory. Stops at the next frame once ``token`` fires and
+        returns the partial result with a ``truncated`` marker.
+        """
+        result = {
+            'text': '',
+            'pages': [],
+            'tables': [],
+            'images': [],
+            'metadata': {}
+        }
+
+        try:
+            with collect_timings() as timings, Image.open(file_path) as image:
+                result['metadata']['format'] = image.format
+                result['metadata']['width'], result['metadata']['height'] = image.size
+                result['metadata']['pages'] = getattr(image, 'n_frames', 1)
+
+                try:
+                    for page_num, frame in enumerate(ImageSequence.Iterator(image)):
+                        if token is not None:
+                            token.check()
+                        with timed('image', 'decode'):
+                            gray = np.array(frame.convert('L'))
+                        page_text = self.ocr.process_image(gray, token)
+                        result['pages'].append({'page': page_num + 1, 'text': page_text})
+                        if page_text:
+                            result['text'] += f"\n\n--- Page {page_num + 1} ---\n{page_text}"
+                except OperationCancelled as e:
+                    logger.warning(f"Image parsing of {file_path} stopped after "
+                                   f"{len(result['pages'])} pages: {e.reason}")
+                    result['truncated'] = {
+                        'reason': e.reason,
+                        'unit': 'pages',
+                        'processed': len(result['pages']),
+                        'total': result['metadata']['pages']
+                    }
+
+            result['timings'] = timings.summary()
+            return result
+
+        except Exception as e:
+            logger.error(f"Image parsing failed for {file_path}: {str(e)}", exc_info=True)
+            raise Exception(f"Image parsing failed: {str(e)}") from e
+
+    def to_json(self, result: Dict[str, Any]) -> str:
+        """Convert parsing result to JSON"""
+        return json.dumps(result, indent=2)
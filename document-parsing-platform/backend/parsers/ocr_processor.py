@@ -2,8 +2,64 @@ import pytesseract
 import cv2
 import numpy as np
 from PIL import Image
-from typing import Optional, List
+from typing import FrozenSet, Optional, List
+from functools import lru_cache
 import logging
+import os
+import shlex
+import subprocess
+import tempfile
+
+from services.cancellation import CancellationToken, OperationCancelled
+from services.metrics import timed
+
+def run_tesseract(image: np.ndarray, lang: str, config: str = '',
+                  token: Optional[CancellationToken] = None, poll_interval: float = 0.1) -> str:
+    """
+    Run the Tesseract CLI on an image as a subprocess this process owns
+
+    Unlike pytesseract.image_to_string, the subprocess is registered with
+    the cancellation token and killed as soon as the token is cancelled or
+    its deadline passes, raising OperationCancelled.
+    """
+    if token is not None:
+        token.check()
+    with tempfile.TemporaryDirectory(prefix='ocr-') as workdir:
+        path = os.path.join(workdir, 'image.png')
+        cv2.imwrite(path, image)
+        command = [pytesseract.pytesseract.tesseract_cmd, path, 'stdout', '-l', lang, *shlex.split(config)]
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if token is not None:
+            token.register(process)
+        try:
+            while True:
+                try:
+                    output, error = process.communicate(timeout=poll_interval)
+                    break
+                except subprocess.TimeoutExpired:
+                    if token is not None and token.cancelled:
+                        process.kill()
+                        process.communicate()
+                        raise OperationCancelled(token.reason)
+        finally:
+            if token is not None:
+                token.unregister(process)
+
+    if process.returncode != 0:
+        if token is not None and token.cancelled:
+            raise OperationCancelled(token.reason)
+        raise RuntimeError(f"Tesseract failed ({process.returncode}): {error.decode('utf-8', 'replace').strip()}")
+    return output.decode('utf-8', 'replace')
+
+@lru_cache(maxsize=None)
+def available_languages() -> FrozenSet[str]:
+    """
+    Languages the installed Tesseract supports
+
+    Discovered once per process (``tesseract --list-langs``) and cached;
+    a gunicorn master that preloads it passes the result to its workers.
+    """
+    return frozenset(pytesseract.get_languages(config=''))
 
 class OCRProcessor:
     def __init__(self, languages: List[str] = ['eng'], config: Optional[str] = None):
@@ -14,9 +70,9 @@ class OCRProcessor:
             languages: List of language codes (e.g., ['eng', 'ben'])
             config: Additional Tesseract config parameters
         """
+        self.logger = logging.getLogger(__name__)
         self.languages = self._validate_languages(languages)
         self.config = config or '--oem 3 --psm 6'
-        self.logger = logging.getLogger(__name__)
         
         # Bangla handwriting specific parameters
         self.bangla_config = {
@@ -30,12 +86,13 @@ class OCRProcessor:
             }
         }
 
-    def process_image(self, image: np.ndarray) -> str:
+    def process_image(self, image: np.ndarray, token: Optional[CancellationToken] = None) -> str:
         """
         Perform OCR on an image with preprocessing
         
         Args:
             image: Input image as numpy array (OpenCV format)
+            token: Cancellation token; raises OperationCancelled when it fires
             
         Returns:
             Extracted text
@@ -55,12 +112,11 @@ class OCRProcessor:
             custom_config = self.bangla_config['tesseract']['config'] if use_bangla_config else self.config
             lang_param = '+'.join(self.languages)
             
-            return pytesseract.image_to_string(
-                processed,
-                lang=lang_param,
-                config=custom_config
-            )
+            with timed('ocr', 'tesseract'):
+                return run_tesseract(processed, lang_param, custom_config, token)
             
+        except OperationCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"OCR processing failed: {str(e)}")
             return ""
@@ -76,14 +132,17 @@ class OCRProcessor:
             Preprocessed image
         """
         # Apply adaptive thresholding
-        processed = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+        with timed('ocr', 'threshold'):
+            processed = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
         
         # Denoising
-        processed = cv2.fastNlMeansDenoising(processed, h=10)
+        with timed('ocr', 'denoise'):
+            processed = cv2.fastNlMeansDenoising(processed, h=10)
         
         # Deskew (if needed)
-        if self._needs_deskew(processed):
-            processed = self._deskew_image(processed)
+        with timed('ocr', 'deskew'):
+            if self._needs_deskew(processed):
+                processed = self._deskew_image(processed)
             
         return processed
 
@@ -139,11 +198,12 @@ class OCRProcessor:
         Validate and normalize language codes
         """
         valid_langs = []
+        installed = available_languages()
         for lang in languages:
             lang = lang.lower().strip()
             if lang == 'bn' or lang == 'bangla':
                 valid_langs.append('ben')  # Tesseract uses 'ben' for Bengali
-            elif lang in pytesseract.get_languages():
+            elif lang in installed:
                 valid_langs.append(lang)
             else:
                 self.logger.warning(f"Unsupported language code: {lang}")
@@ -2,30 +2,46 @@ import PyPDF2
 import io
 import base64
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from PIL import Image
-import pytesseract
 import cv2
 import numpy as np
 import json
 import os
 
+from parsers.ocr_processor import run_tesseract
+from parsers.pdf_tables import PDFTableExtractor, fragment_collector
+from parsers.registry import sniff
+from services.cancellation import CancellationToken, OperationCancelled
+from services.metrics import collect_timings, timed
+
 logger = logging.getLogger(__name__)
 
 class PDFParser:
-    def __init__(self, ocr_languages: list = ['eng']):
+    def __init__(self, ocr_languages: list = ['eng'], extract_tables: Optional[bool] = None):
         self.ocr_languages = ocr_languages
         self.handwriting_languages = ['ben']  # Bengali support
+        # Table extraction renders pages with poppler; PDF_TABLES=0 turns it off
+        self.extract_tables = os.getenv('PDF_TABLES', '1') != '0' if extract_tables is None else extract_tables
+
+    def parse(self, file_path: str, token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """Parse a PDF file and extract text, images, and metadata
 
-    def parse(self, file_path: str) -> Dict[str, Any]:
-        """Parse a PDF file and extract text, images, and metadata"""
+        Tables (see parsers.pdf_tables) are extracted after the text layer,
+        from the text positions gathered while reading it.
+
+        When ``token`` is cancelled or its deadline passes, parsing stops at
+        the next page or image (killing any running OCR) and the partial
+        result is returned with a ``truncated`` marker.
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
-        if not file_path.lower().endswith('.pdf'):
+        if sniff(file_path) != 'pdf':
             raise ValueError("Invalid file type. Only PDF files are supported")
 
         result = {
             'text': '',
+            'pages': [],
             'tables': [],
             'images': [],
             'metadata': {}
@@ -33,41 +49,95 @@ class PDFParser:
 
         try:
             logger.info(f"Starting PDF parsing for: {file_path}")
-            with open(file_path, 'rb') as file:
+            with collect_timings() as timings, open(file_path, 'rb') as file:
                 # Extract text and metadata
-                pdf_reader = PyPDF2.PdfReader(file)
-                result['metadata']['pages'] = len(pdf_reader.pages)
-                result['metadata']['author'] = pdf_reader.metadata.get('/Author', '')
-                result['metadata']['title'] = pdf_reader.metadata.get('/Title', '')
-                result['metadata']['created'] = pdf_reader.metadata.get('/CreationDate', '')
-
-                # Process each page
-                for page_num, page in enumerate(pdf_reader.pages):
-                    # Extract text
-                    page_text = page.extract_text()
-                    if page_text:
-                        result['text'] += f"\n\n--- Page {page_num + 1} ---\n{page_text}"
-
-                    # Extract images
-                    if '/XObject' in page['/Resources']:
-                        x_object = page['/Resources']['/XObject'].get_object()
-                        for obj in x_object:
-                            if x_object[obj]['/Subtype'] == '/Image':
-                                image = self._extract_pdf_image(x_object[obj])
-                                if image:
-                                    ocr_text = self._perform_ocr(image)
-                                    result['images'].append({
-                                        'page': page_num + 1,
-                                        'text': ocr_text,
-                                        'base64': self._image_to_base64(image)
-                                    })
+                with timed('pdf', 'open'):
+                    pdf_reader = PyPDF2.PdfReader(file)
+                    result['metadata']['pages'] = len(pdf_reader.pages)
+                    result['metadata']['author'] = pdf_reader.metadata.get('/Author', '')
+                    result['metadata']['title'] = pdf_reader.metadata.get('/Title', '')
+                    result['metadata']['created'] = pdf_reader.metadata.get('/CreationDate', '')
+
+                # Process each page, stopping early if the token fires
+                page_fragments = {}
+                try:
+                    for page_num, page in enumerate(pdf_reader.pages):
+                        if token is not None:
+                            token.check()
+
+                        # Extract text
+                        with timed('pdf', 'extract_text'):
+                            if self.extract_tables:
+                                fragments = page_fragments.setdefault(page_num + 1, [])
+                                page_text = page.extract_text(visitor_text=fragment_collector(page, fragments))
+                            else:
+                                page_text = page.extract_text()
+                        result['pages'].append({'page': page_num + 1, 'text': page_text or ''})
+                        if page_text:
+                            result['text'] += f"\n\n--- Page {page_num + 1} ---\n{page_text}"
+
+                        # Extract images
+                        if '/XObject' in page['/Resources']:
+                            x_object = page['/Resources']['/XObject'].get_object()
+                            for obj in x_object:
+                                if x_object[obj]['/Subtype'] == '/Image':
+                                    if token is not None:
+                                        token.check()
+                                    with timed('pdf', 'decode_image'):
+                                        image = self._extract_pdf_image(x_object[obj])
+                                    if image:
+                                        ocr_text = self._perform_ocr(image, token)
+                                        with timed('pdf', 'encode_image'):
+                                            encoded = self._image_to_base64(image)
+                                        result['images'].append({
+                                            'page': page_num + 1,
+                                            'text': ocr_text,
+                                            'base64': encoded
+                                        })
+                except OperationCancelled as e:
+                    logger.warning(f"PDF parsing of {file_path} stopped after "
+                                   f"{len(result['pages'])} pages: {e.reason}")
+                    result['truncated'] = {
+                        'reason': e.reason,
+                        'unit': 'pages',
+                        'processed': len(result['pages']),
+                        'total': result['metadata']['pages']
+                    }
+
+                if self.extract_tables and not result.get('truncated'):
+                    self._extract_tables(file_path, page_fragments, result, token)
 
+            result['timings'] = timings.summary()
             return result
 
         except Exception as e:
             logger.error(f"PDF parsing failed for {file_path}: {str(e)}", exc_info=True)
             raise Exception(f"PDF parsing failed: {str(e)}") from e
 
+    def _extract_tables(self, file_path: str, page_fragments: dict, result: Dict[str, Any],
+                        token: Optional[CancellationToken] = None) -> None:
+        """Add detected tables to ``result['tables']``
+
+        Failures (e.g. poppler not installed) are logged and leave the text
+        result intact.
+        """
+        languages = '+'.join(self.ocr_languages + self.handwriting_languages)
+        processed = 0
+        try:
+            for _, tables in PDFTableExtractor(languages).extract(file_path, page_fragments, token):
+                result['tables'].extend(tables)
+                processed += 1
+        except OperationCancelled as e:
+            logger.warning(f"PDF table extraction of {file_path} stopped after {processed} pages: {e.reason}")
+            result['truncated'] = {
+                'reason': e.reason,
+                'unit': 'table_pages',
+                'processed': processed,
+                'total': result['metadata']['pages']
+            }
+        except Exception as e:
+            logger.warning(f"PDF table extraction failed for {file_path}: {str(e)}")
+
     def _extract_pdf_image(self, image_obj) -> Image.Image:
         """Extract image from PDF XObject"""
         try:
@@ -82,19 +152,23 @@ class PDFParser:
             logger.warning(f"Image extraction failed: {str(e)}")
             return None
 
-    def _perform_ocr(self, image: Image.Image) -> str:
+    def _perform_ocr(self, image: Image.Image, token: Optional[CancellationToken] = None) -> str:
         """Perform OCR on an image with support for multiple languages"""
         try:
-            # Convert to OpenCV format
-            img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            # Preprocessing for better OCR
-            gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-            thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-            
+            with timed('pdf', 'ocr_preprocess'):
+                # Convert to OpenCV format
+                img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+
+                # Preprocessing for better OCR
+                gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+                thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
             # Combine all languages (English + any handwriting languages)
             languages = '+'.join(self.ocr_languages + self.handwriting_languages)
-            return pytesseract.image_to_string(thresh, lang=languages)
+            with timed('pdf', 'tesseract'):
+                return run_tesseract(thresh, languages, token=token)
+        except OperationCancelled:
+            raise
         except Exception as e:
             logger.error(f"OCR failed: {str(e)}", exc_info=True)
             return ""
@@ -0,0 +1,269 @@
+"""Table extraction for PDFs
+
+Two detectors feed the ``tables`` field of a PDF parse result:
+
+* Ruled tables are found on a low-resolution greyscale render of each page
+  (72 dpi, so one pixel is one PDF point). Morphological opening with long
+  thin kernels keeps only horizontal and vertical rules. Their union gives
+  the table outlines, and row and column projections of the rules give the
+  grid. Cells are filled from the page's text layer, or by OCR of the table
+  region when the page has none (scans).
+* Borderless tables on born-digital pages come from text positions. Text
+  runs are grouped into lines by baseline and into cells by horizontal
+  gaps. A run of at least three consecutive lines whose cells line up
+  column by column is a table.
+
+Each table is ``{'page', 'method', 'bbox', 'rows'}``. ``bbox`` is
+``[x0, top, x1, bottom]`` in PDF points from the page's top-left corner,
+and ``rows`` is a list of rows of cell strings.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from bisect import bisect_right
+import math
+
+import cv2
+import numpy as np
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from parsers.ocr_processor import run_tesseract
+from services.cancellation import CancellationToken
+from services.metrics import timed
+
+# (x, baseline, font size, text) in points from the top-left of the page
+Fragment = Tuple[float, float, float, str]
+
+DETECT_DPI = 72
+OCR_DPI = 200
+RENDER_BATCH_PAGES = 8
+
+def fragment_collector(page, fragments: List[Fragment]) -> Callable:
+    """Build a PyPDF2 ``visitor_text`` callback that records text positions
+
+    Positions are taken from the text matrix combined with the current
+    transformation matrix, and converted to top-left page coordinates.
+    """
+    box = page.mediabox
+    left, top = float(box.left), float(box.bottom) + float(box.height)
+
+    def visit(text, cm, tm, font_dict, font_size):
+        if not text or not text.strip():
+            return
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        scale = math.hypot(tm[2] * cm[0] + tm[3] * cm[2], tm[2] * cm[1] + tm[3] * cm[3]) or 1.0
+        fragments.append((x - left, top - y, (font_size or 10) * scale, text.strip()))
+    return visit
+
+def _run_centers(mask: np.ndarray) -> List[float]:
+    """Centres of the runs of True in a 1-D mask"""
+    index = np.flatnonzero(mask)
+    if index.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(index) > 1)
+    starts = np.concatenate(([index[0]], index[breaks + 1]))
+    ends = np.concatenate((index[breaks], [index[-1]]))
+    return ((starts + ends) / 2).tolist()
+
+def find_ruled_tables(gray: np.ndarray, min_cells: int = 2) -> List[Dict[str, Any]]:
+    """Find ruled grids in a greyscale page render
+
+    Returns ``{'bbox': (x, y, w, h), 'rows': [...], 'cols': [...]}`` per
+    grid, with rule positions in image pixels.
+    """
+    height, width = gray.shape
+    binary = cv2.adaptiveThreshold(cv2.bitwise_not(gray), 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                   cv2.THRESH_BINARY, 15, -2)
+    h_len, v_len = max(width // 30, 10), max(height // 50, 10)
+    horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (h_len, 1)))
+    vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, v_len)))
+    grid = cv2.dilate(cv2.bitwise_or(horizontal, vertical), np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(grid, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    tables = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < h_len or h < v_len:
+            continue
+        # A rule spans most of the table; shorter strokes are text or partial borders
+        rows = _run_centers((horizontal[y:y + h, x:x + w] > 0).sum(axis=1) >= 0.5 * w)
+        cols = _run_centers((vertical[y:y + h, x:x + w] > 0).sum(axis=0) >= 0.5 * h)
+        if len(rows) < 2 or len(cols) < 2 or (len(rows) - 1) * (len(cols) - 1) < min_cells:
+            continue
+        tables.append({
+            'bbox': (x, y, w, h),
+            'rows': [y + r for r in rows],
+            'cols': [x + c for c in cols]
+        })
+    return tables
+
+def _cell_index(lines: List[float], position: float) -> Optional[int]:
+    index = bisect_right(lines, position) - 1
+    return index if 0 <= index < len(lines) - 1 else None
+
+def fill_from_text(table: Dict[str, Any], fragments: List[Fragment], scale: float) -> List[List[str]]:
+    """Place text fragments in a grid's cells"""
+    rows, cols = table['rows'], table['cols']
+    cells = [[[] for _ in cols[:-1]] for _ in rows[:-1]]
+    for x, baseline, size, text in sorted(fragments, key=lambda f: (f[1], f[0])):
+        # Middle of the glyphs, slightly above the baseline
+        row = _cell_index(rows, (baseline - size * 0.3) * scale)
+        col = _cell_index(cols, (x + 1) * scale)
+        if row is not None and col is not None:
+            cells[row][col].append(text)
+    return [[' '.join(cell) for cell in row] for row in cells]
+
+def fill_from_ocr(table: Dict[str, Any], page: np.ndarray, ratio: float, languages: str,
+                  token: Optional[CancellationToken] = None) -> List[List[str]]:
+    """OCR a grid's region once and place the recognised words in its cells
+
+    ``page`` is a render ``ratio`` times the detection resolution. Tesseract
+    is asked for TSV output so each word comes with its box.
+    """
+    x, y, w, h = table['bbox']
+    x0, y0 = int(x * ratio), int(y * ratio)
+    crop = page[y0:int((y + h) * ratio), x0:int((x + w) * ratio)]
+    tsv = run_tesseract(crop, languages, '--psm 6 tsv', token)
+
+    rows, cols = table['rows'], table['cols']
+    cells = [[[] for _ in cols[:-1]] for _ in rows[:-1]]
+    for line in tsv.splitlines()[1:]:
+        fields = line.split('\t')
+        if len(fields) < 12 or fields[0] != '5' or not fields[11].strip():
+            continue
+        left, top, width, height = (int(value) for value in fields[6:10])
+        row = _cell_index(rows, (y0 + top + height / 2) / ratio)
+        col = _cell_index(cols, (x0 + left + width / 2) / ratio)
+        if row is not None and col is not None:
+            cells[row][col].append(fields[11].strip())
+    return [[' '.join(cell) for cell in row] for row in cells]
+
+def find_aligned_tables(fragments: List[Fragment], min_rows: int = 3, min_cols: int = 2) -> List[Dict[str, Any]]:
+    """Find borderless tables from the positions of text on a page
+
+    Widths are estimated from character counts (half the font size per
+    character), which is enough to separate columns from word gaps.
+    """
+    if not fragments:
+        return []
+
+    lines: List[List[Fragment]] = []
+    for fragment in sorted(fragments, key=lambda f: (f[1], f[0])):
+        if lines and abs(fragment[1] - lines[-1][0][1]) <= fragment[2] * 0.4:
+            lines[-1].append(fragment)
+        else:
+            lines.append([fragment])
+
+    def cells_of(line: List[Fragment]) -> List[List[Any]]:
+        cells: List[List[Any]] = []  # [start, end, text]
+        for x, _, size, text in sorted(line):
+            end = x + len(text) * size * 0.5
+            if cells and x - cells[-1][1] < size:
+                cells[-1][1] = max(cells[-1][1], end)
+                cells[-1][2] += ' ' + text
+            else:
+                cells.append([x, end, text])
+        return cells
+
+    def aligned(previous: List[List[Any]], current: List[List[Any]]) -> bool:
+        return len(previous) == len(current) and all(
+            a[0] <= b[1] and b[0] <= a[1] for a, b in zip(previous, current)
+        )
+
+    tables = []
+    run: List[Tuple[List[Fragment], List[List[Any]]]] = []
+
+    def close_run() -> None:
+        if len(run) >= min_rows:
+            starts = [cell[0] for _, cells in run for cell in cells]
+            ends = [cell[1] for _, cells in run for cell in cells]
+            tables.append({
+                'bbox': [round(min(starts), 1), round(run[0][0][0][1] - run[0][0][0][2], 1),
+                         round(max(ends), 1), round(run[-1][0][0][1], 1)],
+                'rows': [[cell[2] for cell in cells] for _, cells in run]
+            })
+        run.clear()
+
+    for line in lines:
+        cells = cells_of(line)
+        size = line[0][2]
+        if len(cells) < min_cols:
+            close_run()
+            continue
+        if run and (not aligned(run[-1][1], cells) or line[0][1] - run[-1][0][0][1] > size * 2.5):
+            close_run()
+        run.append((line, cells))
+    close_run()
+    return tables
+
+def _inside(fragment: Fragment, bbox: List[float]) -> bool:
+    return bbox[0] <= fragment[0] <= bbox[2] and bbox[1] <= fragment[1] <= bbox[3]
+
+class PDFTableExtractor:
+    def __init__(self, languages: str = 'eng', detect_dpi: int = DETECT_DPI, ocr_dpi: int = OCR_DPI,
+                 batch_pages: int = RENDER_BATCH_PAGES):
+        """
+        Args:
+            languages: Tesseract languages for OCR of tables on scanned pages
+            detect_dpi: Render resolution for rule detection
+            ocr_dpi: Render resolution for OCR of table regions
+            batch_pages: Pages rendered per poppler call
+        """
+        self.languages = languages
+        self.detect_dpi = detect_dpi
+        self.ocr_dpi = ocr_dpi
+        self.batch_pages = batch_pages
+
+    def extract(self, file_path: str, page_fragments: Dict[int, List[Fragment]],
+                token: Optional[CancellationToken] = None) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """Yield (page number, tables) for each page, in order
+
+        ``page_fragments`` holds the text positions gathered while the text
+        layer was extracted (see fragment_collector); pages missing from it
+        are treated as having no text layer.
+        """
+        scale = self.detect_dpi / 72
+        total = pdfinfo_from_path(file_path)['Pages']
+        for first in range(1, total + 1, self.batch_pages):
+            last = min(first + self.batch_pages - 1, total)
+            if token is not None:
+                token.check()
+            with timed('pdf', 'table_render'):
+                renders = convert_from_path(file_path, dpi=self.detect_dpi, first_page=first,
+                                            last_page=last, grayscale=True)
+            for page_number, render in zip(range(first, last + 1), renders):
+                if token is not None:
+                    token.check()
+                fragments = page_fragments.get(page_number, [])
+                yield page_number, self._page_tables(file_path, page_number, np.array(render),
+                                                     fragments, scale, token)
+
+    def _page_tables(self, file_path: str, page_number: int, gray: np.ndarray, fragments: List[Fragment],
+                     scale: float, token: Optional[CancellationToken]) -> List[Dict[str, Any]]:
+        tables = []
+        with timed('pdf', 'table_detect'):
+            grids = find_ruled_tables(gray)
+        hi_res = None
+        for grid in grids:
+            x, y, w, h = grid['bbox']
+            bbox = [round(x / scale, 1), round(y / scale, 1), round((x + w) / scale, 1), round((y + h) / scale, 1)]
+            with timed('pdf', 'table_fill'):
+                rows = fill_from_text(grid, fragments, scale)
+            method = 'ruled'
+            if not fragments:
+                if hi_res is None:
+                    with timed('pdf', 'table_render'):
+                        hi_res = np.array(convert_from_path(file_path, dpi=self.ocr_dpi, first_page=page_number,
+                                                            last_page=page_number, grayscale=True)[0])
+                with timed('pdf', 'table_ocr'):
+                    rows = fill_from_ocr(grid, hi_res, self.ocr_dpi / self.detect_dpi, self.languages, token)
+                method = 'ruled_ocr'
+            if not any(cell for row in rows for cell in row):
+                continue
+            tables.append({'page': page_number, 'method': method, 'bbox': bbox, 'rows': rows})
+
+        # Text outside ruled grids may still hold borderless tables
+        remaining = [f for f in fragments if not any(_inside(f, table['bbox']) for table in tables)]
+        with timed('pdf', 'table_align'):
+            for table in find_aligned_tables(remaining):
+                tables.append({'page': page_number, 'method': 'aligned', **table})
+        return tables
@@ -0,0 +1,133 @@
+"""Document formats, detected from file content rather than the name
+
+The registry maps each format to its parser class and file extensions.
+``detect_format`` reads the first bytes of a file (and, for zip-based
+Office files, the archive listing) to decide what it really is, so a
+renamed file goes to the right parser and a file that is not what its
+extension claims is rejected. Plain text has no signature, so it is only
+accepted with a text extension.
+
+Parser modules are imported on demand; importing this module is cheap.
+"""
+from typing import Optional, Tuple
+import codecs
+import importlib
+import os
+import struct
+import zipfile
+
+# format -> (parser module, parser class, extensions)
+FORMATS = {
+    'pdf': ('parsers.pdf_parser', 'PDFParser', ('.pdf',)),
+    'docx': ('parsers.docx_parser', 'DOCXParser', ('.docx',)),
+    'xlsx': ('parsers.xlsx_parser', 'XLSXParser', ('.xlsx', '.xlsm')),
+    'txt': ('parsers.txt_parser', 'TXTParser', ('.txt',)),
+    'image': ('parsers.image_parser', 'ImageParser', ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp'))
+}
+
+SUPPORTED_EXTENSIONS: Tuple[str, ...] = tuple(ext for _, _, exts in FORMATS.values() for ext in exts)
+
+SNIFF_BYTES = 8192
+
+IMAGE_SIGNATURES = (
+    b'\x89PNG\r\n\x1a\n',
+    b'\xff\xd8\xff',        # JPEG
+    b'II*\x00', b'MM\x00*'   # TIFF
+)
+
+TEXT_BOMS = (codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+def format_for_extension(filename: str) -> Optional[str]:
+    """Format implied by a file name, without reading the file"""
+    name = filename.lower()
+    for name_format, (_, _, extensions) in FORMATS.items():
+        if name.endswith(extensions):
+            return name_format
+    return None
+
+def sniff(filepath: str) -> Optional[str]:
+    """Format from the file's leading bytes, or None if unrecognised"""
+    with open(filepath, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    # Only a BOM or whitespace may precede the header; text that merely
+    # mentions %PDF- further in is not a PDF
+    body = head[len(codecs.BOM_UTF8):] if head.startswith(codecs.BOM_UTF8) else head
+    if body.lstrip(b' \t\r\n\f\x00').startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        return _sniff_office(filepath)
+    if head.startswith(IMAGE_SIGNATURES) or _is_bmp(head, os.path.getsize(filepath)):
+        return 'image'
+    if _looks_like_text(head):
+        return 'txt'
+    return None
+
+def _is_bmp(head: bytes, size: int) -> bool:
+    """Check the BMP file header, not just its two-byte "BM" tag
+
+    The header's file size must match the file, the reserved fields must be
+    zero and the pixel data must start inside the file, so text that
+    happens to begin with "BM" is not taken for an image.
+    """
+    if len(head) < 26 or not head.startswith(b'BM'):
+        return False
+    declared, reserved, offset, info_size = struct.unpack('<IIII', head[2:18])
+    return declared == size and reserved == 0 and 26 <= offset < size and info_size in (12, 40, 52, 56, 64, 108, 124)
+
+def _sniff_office(filepath: str) -> Optional[str]:
+    """Tell DOCX from XLSX by their main part; reads only the zip directory"""
+    try:
+        with zipfile.ZipFile(filepath) as archive:
+            names = set(archive.namelist())
+    except zipfile.BadZipFile:
+        return None
+    if 'word/document.xml' in names:
+        return 'docx'
+    if 'xl/workbook.xml' in names:
+        return 'xlsx'
+    return None
+
+def _looks_like_text(head: bytes) -> bool:
+    if head.startswith(TEXT_BOMS):
+        return True
+    if b'\x00' in head:
+        return False
+    control = sum(1 for byte in head if byte < 32 and byte not in b'\t\n\r\f\b\x1b')
+    return control <= len(head) // 100
+
+def detect_format(filepath: str, filename: Optional[str] = None) -> Optional[str]:
+    """Format of a stored file, judged by content; None if unsupported
+
+    ``filename`` is the name to check the extension of for plain text,
+    when the file is stored under another name.
+    """
+    try:
+        found = sniff(filepath)
+    except OSError:
+        return None
+    if found == 'txt' and format_for_extension(filename or filepath) != 'txt':
+        return None
+    return found
+
+def get_parser(filepath: str):
+    """Return a parser instance for the file's detected format, or None"""
+    found = detect_format(filepath)
+    if found is None:
+        return None
+    module, name, _ = FORMATS[found]
+    return getattr(importlib.import_module(module), name)()
+
+def preload() -> None:
+    """Import every parser module (see services.warmup)
+
+    All modules are attempted; an ImportError naming every one that
+    failed is raised afterwards.
+    """
+    failed = []
+    for module, _, _ in FORMATS.values():
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            failed.append(f"{module}: {str(e)}")
+    if failed:
+        raise ImportError('; '.join(failed))
@@ -0,0 +1,132 @@
+from typing import Dict, Any, Optional
+import codecs
+import json
+import logging
+
+from services.cancellation import CancellationToken, OperationCancelled
+from services.metrics import collect_timings, timed
+
+logger = logging.getLogger(__name__)
+
+# Checked in order: the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+)
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Guess a text encoding from the first bytes of a file
+
+    A byte-order mark wins; otherwise UTF-8 if the sample decodes as UTF-8
+    (a multi-byte sequence cut off at the end of the sample is allowed),
+    else Windows-1252, which covers most legacy Western text.
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+class TXTParser:
+    def __init__(self, chunk_chars: int = 1024 * 1024, page_chars: int = 20000):
+        """
+        Args:
+            chunk_chars: Characters decoded per read
+            page_chars: Target page size; pages end at a line break or a
+                form feed
+        """
+        self.chunk_chars = chunk_chars
+        self.page_chars = page_chars
+
+    def parse(self, file_path: str, token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """Parse a plain-text file into pages
+
+        The file is decoded and paginated in fixed-size chunks, so splitting
+        needs no more than one chunk plus one page of working memory. The
+        result itself holds the full text (as pages and as ``text``), so
+        its size grows with the file like every parser result. Undecodable
+        bytes become U+FFFD. Stops at the next chunk once ``token`` fires
+        and returns the partial result with a ``truncated`` marker.
+        """
+        result = {
+            'text': '',
+            'pages': [],
+            'tables': [],
+            'images': [],
+            'metadata': {}
+        }
+
+        try:
+            with collect_timings() as timings:
+                with timed('txt', 'detect_encoding'), open(file_path, 'rb') as f:
+                    encoding = detect_encoding(f.read(64 * 1024))
+                result['metadata']['encoding'] = encoding
+
+                pages = []
+                pending = ''
+                read_chars = 0
+
+                def add_page(text: str) -> None:
+                    pages.append({'page': len(pages) + 1, 'text': text})
+
+                try:
+                    with open(file_path, 'r', encoding=encoding, errors='replace', newline='') as f:
+                        while True:
+                            if token is not None:
+                                token.check()
+                            with timed('txt', 'read'):
+                                chunk = f.read(self.chunk_chars)
+                            if not chunk:
+                                break
+                            read_chars += len(chunk)
+                            with timed('txt', 'paginate'):
+                                pending += chunk
+                                start = 0
+                                while True:
+                                    end = start + self.page_chars
+                                    feed = pending.find('\f', start, end)
+                                    if feed >= 0:
+                                        add_page(pending[start:feed])
+                                        start = feed + 1
+                                        continue
+                                    if len(pending) < end:
+                                        break
+                                    cut = pending.rfind('\n', start, end)
+                                    cut = cut + 1 if cut >= start else end
+                                    add_page(pending[start:cut])
+                                    start = cut
+                                pending = pending[start:]
+                    if pending:
+                        add_page(pending)
+                except OperationCancelled as e:
+                    logger.warning(f"Text parsing of {file_path} stopped after {read_chars} characters: {e.reason}")
+                    if pending:
+                        add_page(pending)
+                    result['truncated'] = {
+                        'reason': e.reason,
+                        'unit': 'characters',
+                        'processed': read_chars,
+                        'total': None
+                    }
+
+                result['pages'] = pages
+                result['text'] = ''.join(page['text'] for page in pages)
+                result['metadata']['pages'] = len(pages)
+
+            result['timings'] = timings.summary()
+            return result
+
+        except Exception as e:
+            logger.error(f"Text parsing failed for {file_path}: {str(e)}", exc_info=True)
+            raise Exception(f"Text parsing failed: {str(e)}") from e
+
+    def to_json(self, result: Dict[str, Any]) -> str:
+        """Convert parsing result to JSON"""
+        return json.dumps(result, indent=2)
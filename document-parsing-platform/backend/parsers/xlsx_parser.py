@@ -0,0 +1,97 @@
+from openpyxl import load_workbook
+from typing import Dict, Any, Optional
+import json
+import logging
+
+from services.cancellation import CancellationToken, OperationCancelled
+from services.metrics import collect_timings, timed
+
+logger = logging.getLogger(__name__)
+
+class XLSXParser:
+    def __init__(self, max_table_rows: int = 10000, check_every: int = 1000):
+        """
+        Args:
+            max_table_rows: Rows kept per sheet in ``tables``; the text
+                layer always holds every row
+            check_every: Rows between cancellation checks
+        """
+        self.max_table_rows = max_table_rows
+        self.check_every = check_every
+
+    def parse(self, file_path: str, token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """Parse an XLSX workbook into one page of tab-separated text per sheet
+
+        The workbook is opened read-only, so rows are streamed from the
+        archive instead of loading openpyxl's full cell model. The result
+        still holds every row's text, plus up to ``max_table_rows`` rows
+        per sheet in ``tables``, so its size grows with the workbook. Cached
+        formula values are used, not the formulas. Stops at the next block
+        of rows once ``token`` fires and returns the partial result with a
+        ``truncated`` marker.
+        """
+        result = {
+            'text': '',
+            'pages': [],
+            'tables': [],
+            'images': [],
+            'metadata': {}
+        }
+
+        try:
+            with collect_timings() as timings:
+                with timed('xlsx', 'open'):
+                    workbook = load_workbook(file_path, read_only=True, data_only=True)
+                try:
+                    result['metadata']['author'] = workbook.properties.creator or ''
+                    result['metadata']['title'] = workbook.properties.title or ''
+                    result['metadata']['created'] = str(workbook.properties.created or '')
+                    result['metadata']['sheets'] = workbook.sheetnames
+
+                    rows_read = 0
+                    try:
+                        for sheet_num, sheet in enumerate(workbook.worksheets):
+                            if token is not None:
+                                token.check()
+                            lines, table = [], []
+                            with timed('xlsx', 'rows'):
+                                for row in sheet.iter_rows(values_only=True):
+                                    rows_read += 1
+                                    if token is not None and rows_read % self.check_every == 0:
+                                        token.check()
+                                    cells = ['' if value is None else str(value) for value in row]
+                                    while cells and not cells[-1]:
+                                        cells.pop()
+                                    if not cells:
+                                        continue
+                                    lines.append('\t'.join(cells))
+                                    if len(table) < self.max_table_rows:
+                                        table.append(cells)
+                            page_text = '\n'.join(lines)
+                            result['pages'].append({'page': sheet_num + 1, 'sheet': sheet.title, 'text': page_text})
+                            if page_text:
+                                result['text'] += f"\n\n--- Sheet {sheet.title} ---\n{page_text}"
+                            if table:
+                                result['tables'].append(table)
+                    except OperationCancelled as e:
+                        logger.warning(f"XLSX parsing of {file_path} stopped after {rows_read} rows: {e.reason}")
+                        result['truncated'] = {
+                            'reason': e.reason,
+                            'unit': 'sheets',
+                            'processed': len(result['pages']),
+                            'total': len(workbook.sheetnames)
+                        }
+                    result['metadata']['rows'] = rows_read
+                finally:
+                    workbook.close()
+
+            result['timings'] = timings.summary()
+            return result
+
+        except Exception as e:
+            logger.error(f"XLSX parsing failed for {file_path}: {str(e)}", exc_info=True)
+            raise Exception(f"XLSX parsing failed: {str(e)}") from e
+
+    def to_json(self, result: Dict[str, Any]) -> str:
+        """Convert parsing result to JSON"""
+        return json.dumps(result, indent=2)
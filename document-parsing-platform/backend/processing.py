@@ -0,0 +1,221 @@
+from typing import Dict, Any, Optional, Tuple
+from concurrent.futures import Future
+import logging
+import os
+import threading
+
+from models import get_db, close_db
+from parsers import registry
+from services.cancellation import CancellationToken
+from services.chunking import iter_page_texts, split_into_chunks
+from services.dedup import index_signature
+from services.metrics import collect_timings, timed
+from services.scheduler import FairScheduler, estimate_cost, parse_weights
+from services.search_service import get_search_index
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = 3000
+
+SUPPORTED_EXTENSIONS = registry.SUPPORTED_EXTENSIONS
+
+def is_supported(filepath: str) -> bool:
+    """Check by name whether a parser exists for the file, without reading it"""
+    return filepath.lower().endswith(SUPPORTED_EXTENSIONS)
+
+def configure_tesseract() -> None:
+    """Point the Tesseract bindings at ``TESSERACT_CMD`` when it is set"""
+    if os.getenv('TESSERACT_CMD'):
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = os.environ['TESSERACT_CMD']
+
+def get_parser(filepath: str):
+    """Return a parser instance for the file, or None if unsupported
+
+    The parser is chosen by the file's content (parsers.registry), not its
+    name. Parser modules pull in OpenCV, NumPy and Tesseract bindings, so
+    they are imported on first use rather than at application start
+    (unless services.warmup preloaded them). ``TESSERACT_CMD`` overrides
+    the Tesseract executable.
+    """
+    configure_tesseract()
+    return registry.get_parser(filepath)
+
+def save_parse_result(db, document_id: int, result: Dict[str, Any]) -> None:
+    """Replace a document's stored pages and chunks with a new parse result
+
+    Rows are written with batched inserts; the caller commits.
+    """
+    db.execute('DELETE FROM document_pages WHERE document_id = ?', (document_id,))
+    db.execute('DELETE FROM document_chunks WHERE document_id = ?', (document_id,))
+    db.bulk_insert(
+        'document_pages',
+        ('document_id', 'page_number', 'text'),
+        ((document_id, page_number, text) for page_number, text in iter_page_texts(result))
+    )
+    db.bulk_insert(
+        'document_chunks',
+        ('document_id', 'chunk_index', 'page_start', 'page_end', 'text', 'tokens', 'content_hash'),
+        (
+            (document_id, chunk['index'], chunk['pages'][0], chunk['pages'][1],
+             chunk['text'], chunk['tokens'], chunk['hash'])
+            for chunk in split_into_chunks(result, CHUNK_TOKENS)
+        )
+    )
+
+def process_document(document_id: int, filepath: str,
+                     token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+    """Parse a stored document and persist its results
+
+    The document moves through ``processing`` to ``parsed``, or to
+    ``failed`` if no parser matches the file's content or parsing raises.
+    If ``token`` stops the parse early the partial result is stored and
+    the document is marked ``truncated``. Near-duplicates are linked
+    through ``documents.duplicate_of``; the result's ``duplicate_of`` names
+    the canonical copy when this document is the duplicate
+    (services.dedup). The result's ``timings`` covers parser stages plus
+    storing and indexing.
+    """
+    db = get_db()
+    try:
+        parser = get_parser(filepath)
+        if parser is None:
+            raise ValueError(f"Unsupported file type: {filepath}")
+    except Exception as e:
+        logger.error(f"Processing failed for document {document_id}: {str(e)}")
+        db.execute('UPDATE documents SET status = ? WHERE id = ?', ('failed', document_id))
+        db.commit()
+        raise
+
+    db.execute('UPDATE documents SET status = ? WHERE id = ?', ('processing', document_id))
+    db.commit()
+
+    with collect_timings() as timings:
+        try:
+            with timed('pipeline', 'parse'):
+                result = parser.parse(filepath, token=token)
+            status = 'truncated' if result.get('truncated') else 'parsed'
+            with timed('pipeline', 'save'):
+                save_parse_result(db, document_id, result)
+                db.execute('UPDATE documents SET status = ? WHERE id = ?', (status, document_id))
+                db.commit()
+        except Exception as e:
+            logger.error(f"Processing failed for document {document_id}: {str(e)}")
+            db.rollback()
+            db.execute('UPDATE documents SET status = ? WHERE id = ?', ('failed', document_id))
+            db.commit()
+            raise
+
+        with timed('pipeline', 'dedup'):
+            duplicate = dedup_document(document_id, result)
+        if duplicate is not None:
+            result['duplicate_of'] = duplicate
+        with timed('pipeline', 'index'):
+            index_document(document_id, result)
+    result['timings'] = timings.summary()
+    return result
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> FairScheduler:
+    """Get the process-wide parse scheduler
+
+    Sized by ``PARSE_WORKERS``; ``PARSE_RESERVED_SMALL_WORKERS`` workers
+    are kept for jobs below ``PARSE_SMALL_JOB_COST`` estimated seconds and
+    ``TENANT_WEIGHTS`` (``tenant=weight,...``) sets fair-share weights.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FairScheduler(
+                workers=int(os.getenv('PARSE_WORKERS', '4')),
+                reserved_small=int(os.getenv('PARSE_RESERVED_SMALL_WORKERS', '1')),
+                small_cost=float(os.getenv('PARSE_SMALL_JOB_COST', '5')),
+                tenant_weights=parse_weights(os.getenv('TENANT_WEIGHTS', ''))
+            )
+        return _scheduler
+
+# document id -> (future, token) for queued and running parse jobs
+_jobs: Dict[int, Tuple[Future, CancellationToken]] = {}
+_jobs_lock = threading.Lock()
+
+def _run_document(document_id: int, filepath: str, token: CancellationToken) -> Dict[str, Any]:
+    token.start()
+    try:
+        return process_document(document_id, filepath, token)
+    finally:
+        close_db()
+
+def submit_document(document_id: int, filepath: str, priority: str = 'normal',
+                    tenant: str = 'default', deadline: Optional[float] = None) -> Future:
+    """Queue a document on the shared parse scheduler
+
+    The job's cost is estimated from the file up front. ``deadline`` caps
+    the seconds the parse may run once started (default
+    ``PARSE_DEADLINE_SECONDS``; 0 for none). The returned Future resolves
+    to the parse result, or raises if parsing failed (the failure is
+    already logged and recorded on the document).
+    """
+    if deadline is None:
+        deadline = float(os.getenv('PARSE_DEADLINE_SECONDS', '600'))
+    token = CancellationToken(timeout=deadline or None)
+    cost = estimate_cost(filepath)['cost']
+    with _jobs_lock:
+        future = get_scheduler().submit(_run_document, document_id, filepath, token,
+                                        cost=cost, priority=priority, tenant=tenant)
+        _jobs[document_id] = (future, token)
+
+    def forget(done: Future) -> None:
+        with _jobs_lock:
+            if _jobs.get(document_id, (None,))[0] is done:
+                del _jobs[document_id]
+    future.add_done_callback(forget)
+    return future
+
+def cancel_document(document_id: int) -> Optional[str]:
+    """Cancel a queued or running parse
+
+    Returns ``'cancelled'`` if the job had not started (the document is
+    marked ``cancelled``), ``'cancelling'`` if it is running and will stop
+    at its next page or image with a partial result, or None if no such
+    job is in flight.
+    """
+    with _jobs_lock:
+        job = _jobs.get(document_id)
+    if job is None:
+        return None
+    future, token = job
+    if future.cancel():
+        db = get_db()
+        db.execute('UPDATE documents SET status = ? WHERE id = ?', ('cancelled', document_id))
+        db.commit()
+        return 'cancelled'
+    token.cancel()
+    return 'cancelling'
+
+def dedup_document(document_id: int, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Record a parse result's MinHash signature and link near-duplicates
+
+    Runs after the parse is stored. Failures are logged rather than raised
+    so they never mark a parsed document ``failed``; re-parsing retries.
+    """
+    db = get_db()
+    try:
+        return index_signature(db, document_id, (text for _, text in iter_page_texts(result)))
+    except Exception as e:
+        logger.error(f"Near-duplicate check failed for document {document_id}: {str(e)}")
+        db.rollback()
+        return None
+
+def index_document(document_id: int, result: Dict[str, Any]) -> None:
+    """Add a parse result to the full-text index
+
+    Indexing failures are logged rather than raised: the parse result is
+    already stored and the index can be rebuilt from it.
+    """
+    try:
+        row = get_db().execute('SELECT filename FROM documents WHERE id = ?', (document_id,)).fetchone()
+        get_search_index().index_document(document_id, row['filename'] if row else '', iter_page_texts(result))
+    except Exception as e:
+        logger.error(f"Search indexing failed for document {document_id}: {str(e)}")
@@ -0,0 +1,338 @@
+from typing import Dict, Any, Optional, List, Union
+import logging
+from abc import ABC, abstractmethod
+import asyncio
+import aiohttp
+import json
+import os
+
+from services.llm_service import LLMProvider
+from services.llm_cache import LLMResponseCache
+from services.metrics import timed_provider
+from services.rate_limiter import get_rate_limiter, parse_retry_after, estimate_tokens
+
+class AsyncBaseLLMService(ABC):
+    """Abstract base class for asyncio LLM services
+
+    Services do not own HTTP connections: the manager hands them a shared
+    aiohttp session so keep-alive connections are pooled across providers.
+    """
+
+    provider: LLMProvider
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.validate_config()
+        self.timeout = aiohttp.ClientTimeout(total=config.get('timeout', 60))
+        # Same process-wide limiter as the sync services for this provider
+        self.rate_limiter = get_rate_limiter(
+            self.provider.value,
+            config.get('requests_per_minute'),
+            config.get('tokens_per_minute')
+        )
+
+    @abstractmethod
+    def validate_config(self) -> None:
+        """Validate the configuration for this provider"""
+        pass
+
+    @abstractmethod
+    async def generate(self, session: aiohttp.ClientSession, prompt: str, **kwargs) -> str:
+        """Generate text from a prompt"""
+        pass
+
+    @abstractmethod
+    async def embed(self, session: aiohttp.ClientSession, text: str) -> List[float]:
+        """Generate embeddings for text"""
+        pass
+
+class AsyncGoogleAIService(AsyncBaseLLMService):
+    provider = LLMProvider.GOOGLE_AI
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+    def validate_config(self) -> None:
+        required = ['api_key', 'model_name']
+        if not all(k in self.config for k in required):
+            raise ValueError(f"Missing required config keys: {required}")
+
+    def _url(self, method: str) -> str:
+        base_url = self.config.get('base_url', self.BASE_URL)
+        return f"{base_url}/models/{self.config['model_name']}:{method}"
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.config['api_key']}",
+            "Content-Type": "application/json"
+        }
+
+    async def _retry_request(self, session: aiohttp.ClientSession, url: str,
+                             payload: Dict[str, Any], tokens: int = 0,
+                             max_retries: int = 3) -> Dict[str, Any]:
+        """POST through the provider rate limiter with retries"""
+        for attempt in range(max_retries):
+            await self.rate_limiter.acquire_async(tokens)
+            try:
+                async with session.post(url, headers=self._headers(), json=payload,
+                                        timeout=self.timeout) as response:
+                    if response.status == 429:
+                        self.rate_limiter.on_rate_limited(parse_retry_after(response.headers.get('Retry-After')))
+                    response.raise_for_status()
+                    data = await response.json()
+                    self.rate_limiter.on_success()
+                    return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == max_retries - 1:
+                    raise
+                if getattr(e, 'status', None) == 429:
+                    self.logger.warning(f"Attempt {attempt + 1} rate limited. Queued behind the rate limiter...")
+                    continue
+                wait_time = 2 ** (attempt + 1)
+                self.logger.warning(f"Attempt {attempt + 1} failed. Retrying in {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+
+    async def generate(self, session: aiohttp.ClientSession, prompt: str, **kwargs) -> str:
+        try:
+            params = {
+                "prompt": prompt,
+                "temperature": kwargs.get('temperature', 0.7),
+                "maxOutputTokens": kwargs.get('max_tokens', 2048)
+            }
+            data = await self._retry_request(session, self._url('generateText'), params,
+                                             tokens=estimate_tokens(prompt) + params['maxOutputTokens'])
+            return data['candidates'][0]['output']
+
+        except Exception as e:
+            self.logger.error(f"Google AI generation failed: {str(e)}")
+            raise
+
+    async def embed(self, session: aiohttp.ClientSession, text: str) -> List[float]:
+        try:
+            data = await self._retry_request(session, self._url('embedText'), {"text": text},
+                                             tokens=estimate_tokens(text))
+            return data['embedding']['value']
+
+        except Exception as e:
+            self.logger.error(f"Google AI embedding failed: {str(e)}")
+            raise
+
+class AsyncOllamaService(AsyncBaseLLMService):
+    provider = LLMProvider.OLLAMA
+    BASE_URL = "http://localhost:11434"
+
+    def validate_config(self) -> None:
+        required = ['model_name']
+        if not all(k in self.config for k in required):
+            raise ValueError(f"Missing required config keys: {required}")
+
+    def _url(self, path: str) -> str:
+        return f"{self.config.get('base_url', self.BASE_URL)}{path}"
+
+    async def generate(self, session: aiohttp.ClientSession, prompt: str, **kwargs) -> str:
+        try:
+            payload = {
+                "model": self.config['model_name'],
+                "prompt": prompt,
+                "options": {
+                    "temperature": kwargs.get('temperature', 0.7),
+                    "num_ctx": kwargs.get('max_tokens', 2048)
+                }
+            }
+            await self.rate_limiter.acquire_async(estimate_tokens(prompt))
+            async with session.post(self._url("/api/generate"), json=payload,
+                                    timeout=self.timeout) as response:
+                response.raise_for_status()
+
+                # Ollama streams newline-delimited JSON chunks
+                full_response = ""
+                async for line in response.content:
+                    line = line.strip()
+                    if line:
+                        chunk = json.loads(line)
+                        full_response += chunk.get("response", "")
+
+                return full_response
+
+        except Exception as e:
+            self.logger.error(f"Ollama generation failed: {str(e)}")
+            raise
+
+    async def embed(self, session: aiohttp.ClientSession, text: str) -> List[float]:
+        try:
+            payload = {
+                "model": self.config['model_name'],
+                "prompt": text
+            }
+            await self.rate_limiter.acquire_async(estimate_tokens(text))
+            async with session.post(self._url("/api/embeddings"), json=payload,
+                                    timeout=self.timeout) as response:
+                response.raise_for_status()
+                data = await response.json()
+                return data['embedding']
+
+        except Exception as e:
+            self.logger.error(f"Ollama embedding failed: {str(e)}")
+            raise
+
+class AsyncLLMServiceFactory:
+    """Factory class for creating asyncio LLM service instances"""
+
+    @staticmethod
+    def create_service(provider: str, config: Dict[str, Any]) -> AsyncBaseLLMService:
+        provider_enum = LLMProvider(provider.lower())
+
+        if provider_enum == LLMProvider.GOOGLE_AI:
+            return AsyncGoogleAIService(config)
+        elif provider_enum == LLMProvider.OLLAMA:
+            return AsyncOllamaService(config)
+        # Add other providers here...
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+
+class AsyncLLMServiceManager:
+    """Manages asyncio LLM services over a shared connection pool
+
+    Each provider gets its own semaphore so a slow local Ollama cannot
+    exhaust the slots available to a remote provider and vice versa.
+    Use as an async context manager so pooled connections are closed.
+    """
+
+    def __init__(self, pool_size: int = 100, keepalive_timeout: float = 30,
+                 cache: Optional[LLMResponseCache] = None):
+        self.services: Dict[str, AsyncBaseLLMService] = {}
+        self.concurrency: Dict[str, int] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.default_provider: Optional[str] = None
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.cache = cache
+        self.logger = logging.getLogger(__name__)
+
+    async def __aenter__(self) -> 'AsyncLLMServiceManager':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def add_provider(self, provider: str, config: Dict[str, Any]) -> None:
+        """Add a new LLM provider
+
+        ``config['max_concurrency']`` caps in-flight requests to the
+        provider (default 8).
+        """
+        try:
+            service = AsyncLLMServiceFactory.create_service(provider, config)
+            self.services[provider] = service
+            self.concurrency[provider] = config.get('max_concurrency', 8)
+            if not self.default_provider:
+                self.default_provider = provider
+            self.logger.info(f"Added async LLM provider: {provider}")
+        except Exception as e:
+            self.logger.error(f"Failed to add provider {provider}: {str(e)}")
+            raise
+
+    def set_default_provider(self, provider: str) -> None:
+        """Set the default provider"""
+        if provider not in self.services:
+            raise ValueError(f"Provider not configured: {provider}")
+        self.default_provider = provider
+        self.logger.info(f"Set default async LLM provider to: {provider}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Lazily create the shared session inside the running event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        """Create per-provider semaphores inside the running event loop"""
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(self.concurrency[provider])
+        return self._semaphores[provider]
+
+    def _resolve(self, provider: Optional[str]) -> str:
+        provider = provider or self.default_provider
+        if not provider:
+            raise ValueError("No LLM provider configured")
+        if provider not in self.services:
+            raise ValueError(f"Provider not configured: {provider}")
+        return provider
+
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def generate(self, prompt: str, provider: Optional[str] = None,
+                       use_cache: Optional[bool] = None, **kwargs) -> str:
+        """Generate text using the specified or default provider"""
+        provider = self._resolve(provider)
+
+        cache_key = None
+        if self.cache is not None and self.cache.is_cacheable(kwargs.get('temperature', 0.7), use_cache):
+            cache_key = self.cache.make_key(
+                provider,
+                self.services[provider].config['model_name'],
+                prompt,
+                kwargs.get('temperature', 0.7),
+                kwargs.get('max_tokens', 2048)
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            async with self._semaphore(provider):
+                with timed_provider('llm', provider, 'generate'):
+                    response = await self.services[provider].generate(self._get_session(), prompt, **kwargs)
+        except Exception as e:
+            self.logger.error(f"Generation failed with provider {provider}: {str(e)}")
+            raise
+
+        if cache_key is not None:
+            self.cache.set(cache_key, response)
+        return response
+
+    async def generate_many(self, prompts: List[str], provider: Optional[str] = None,
+                            return_exceptions: bool = False, **kwargs) -> List[Union[str, Exception]]:
+        """Generate completions for many prompts concurrently
+
+        Results are returned in prompt order. Concurrency is bounded by the
+        provider's semaphore, so hundreds of prompts can be submitted at once.
+        With ``return_exceptions`` failed prompts yield their exception
+        instead of cancelling the whole batch.
+        """
+        tasks = [self.generate(prompt, provider=provider, **kwargs) for prompt in prompts]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+    async def embed(self, text: str, provider: Optional[str] = None) -> List[float]:
+        """Generate embeddings using the specified or default provider"""
+        provider = self._resolve(provider)
+        try:
+            async with self._semaphore(provider):
+                with timed_provider('llm', provider, 'embed'):
+                    return await self.services[provider].embed(self._get_session(), text)
+        except Exception as e:
+            self.logger.error(f"Embedding failed with provider {provider}: {str(e)}")
+            raise
+
+# Example usage
+if __name__ == '__main__':
+    async def main():
+        async with AsyncLLMServiceManager() as manager:
+            manager.add_provider("ollama", {
+                "model_name": os.getenv("OLLAMA_MODEL", "llama2"),
+                "max_concurrency": 4
+            })
+            prompts = [f"Summarize the number {i} in one sentence" for i in range(10)]
+            responses = await manager.generate_many(prompts, return_exceptions=True)
+            for prompt, response in zip(prompts, responses):
+                print(f"{prompt}: {response}")
+
+    asyncio.run(main())
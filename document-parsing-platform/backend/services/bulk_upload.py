@@ -0,0 +1,68 @@
+from typing import BinaryIO, Iterator, Tuple
+import os
+import tarfile
+import zipfile
+
+ZIP_EXTENSIONS = ('.zip',)
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+class BulkUploadLimitError(Exception):
+    """Raised when an upload exceeds the member count or size limits"""
+    pass
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ZIP_EXTENSIONS + TAR_EXTENSIONS)
+
+def iter_archive_members(filename: str, stream: BinaryIO) -> Iterator[Tuple[str, BinaryIO]]:
+    """Yield (member name, readable stream) for each regular file in an archive
+
+    Members are read one at a time straight from the upload stream; nothing
+    is extracted as a whole. Tar archives are read in streaming mode, so
+    each member must be consumed before the next one is requested.
+    """
+    if filename.lower().endswith(ZIP_EXTENSIONS):
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as member:
+                    yield info.filename, member
+    else:
+        with tarfile.open(fileobj=stream, mode='r|*') as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                member = archive.extractfile(info)
+                if member is not None:
+                    yield info.name, member
+
+def copy_limited(source: BinaryIO, destination: str, max_bytes: int,
+                 buffer_size: int = 1024 * 1024) -> int:
+    """Copy a stream to a file, refusing to write more than ``max_bytes``
+
+    Guards against archives whose members decompress far beyond their
+    declared size. Returns the number of bytes written.
+    """
+    written = 0
+    with open(destination, 'wb') as target:
+        while True:
+            block = source.read(buffer_size)
+            if not block:
+                break
+            written += len(block)
+            if written > max_bytes:
+                target.close()
+                os.remove(destination)
+                raise BulkUploadLimitError(f"Upload exceeds {max_bytes} bytes")
+            target.write(block)
+    return written
+
+def unique_path(directory: str, filename: str) -> str:
+    """Return a path in ``directory`` that does not collide with existing files"""
+    base, extension = os.path.splitext(filename)
+    candidate = os.path.join(directory, filename)
+    counter = 1
+    while os.path.exists(candidate):
+        candidate = os.path.join(directory, f"{base}_{counter}{extension}")
+        counter += 1
+    return candidate
@@ -0,0 +1,63 @@
+from typing import Optional, Set
+import subprocess
+import threading
+import time
+
+class OperationCancelled(Exception):
+    """Raised when work is stopped by its cancellation token"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Operation stopped: {reason}")
+        self.reason = reason
+
+class CancellationToken:
+    """Cooperative cancellation with an optional deadline
+
+    Long-running work calls ``check()`` (or reads ``cancelled``) between
+    units such as pages and images. Subprocesses registered with the token
+    are killed as soon as it is cancelled, so a stuck OCR call does not
+    have to finish first. The deadline runs from ``start()``, i.e. from
+    when the job leaves the queue, not from submission.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.deadline: Optional[float] = None
+        self.reason: Optional[str] = None
+        self._processes: Set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self.timeout:
+            self.deadline = time.monotonic() + self.timeout
+
+    def cancel(self, reason: str = 'cancelled') -> None:
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+            processes = list(self._processes)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+
+    @property
+    def cancelled(self) -> bool:
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel('deadline')
+        return self.reason is not None
+
+    def check(self) -> None:
+        """Raise OperationCancelled if cancelled or past the deadline"""
+        if self.cancelled:
+            raise OperationCancelled(self.reason)
+
+    def register(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(process)
+            cancelled = self.reason is not None
+        if cancelled:
+            process.kill()
+
+    def unregister(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(process)
@@ -0,0 +1,100 @@
+from typing import Dict, Any, List, Iterator, Tuple
+import hashlib
+
+from services.rate_limiter import estimate_tokens
+
+def iter_page_texts(parse_result: Dict[str, Any]) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) pairs from a parser result
+
+    Parsers that report per-page text are used page by page; otherwise the
+    whole text counts as page 1. OCR text from images is appended to the
+    page it came from.
+    """
+    image_text: Dict[int, List[str]] = {}
+    for image in parse_result.get('images', []):
+        if image.get('text', '').strip():
+            image_text.setdefault(image.get('page', 1), []).append(image['text'])
+
+    pages = parse_result.get('pages') or [{'page': 1, 'text': parse_result.get('text', '')}]
+    for page in pages:
+        parts = [page.get('text', '')] + image_text.pop(page['page'], [])
+        yield page['page'], '\n'.join(part for part in parts if part.strip())
+    for page_num, texts in sorted(image_text.items()):
+        yield page_num, '\n'.join(texts)
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Split text that exceeds the budget on paragraph, then line, then character bounds"""
+    max_chars = max_tokens * 4
+    pieces: List[str] = []
+    current = ''
+    for paragraph in text.split('\n'):
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 1 > max_chars:
+            pieces.append(current)
+            current = ''
+        current = f"{current}\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _is_cut_point(piece: str, tokens: int, target_tokens: int) -> bool:
+    """Whether a chunk should end after ``piece``, decided by its content alone
+
+    The piece's hash is read as a fraction in [0, 1), and a piece is a cut
+    point with probability ``tokens / target_tokens``. Chunks then average
+    about ``target_tokens``, and no other page can move the decision.
+    """
+    fraction = int.from_bytes(hashlib.sha256(piece.encode('utf-8')).digest()[:8], 'big') / 2 ** 64
+    return fraction < tokens / target_tokens
+
+def split_into_chunks(parse_result: Dict[str, Any], max_tokens: int = 3000) -> List[Dict[str, Any]]:
+    """Pack a parser result into chunks of at most ``max_tokens`` estimated tokens
+
+    Boundaries are content-defined: a chunk ends after a page piece whose
+    hash marks it as a cut point (see _is_cut_point), aiming at half the
+    budget, or earlier when the next piece would overflow the budget. An
+    edited page changes only the chunks from the cut point before it to
+    the first cut point after it; chunks elsewhere keep their text and
+    hash. Each chunk carries its page range, token estimate and a content
+    hash usable as a cache key.
+    """
+    target_tokens = max(max_tokens // 2, 1)
+    chunks: List[Dict[str, Any]] = []
+    buffer: List[str] = []
+    first_page = last_page = None
+    buffer_tokens = 0
+
+    def flush() -> None:
+        nonlocal buffer, buffer_tokens, first_page
+        if buffer:
+            text = '\n\n'.join(buffer)
+            chunks.append({
+                'index': len(chunks),
+                'pages': [first_page, last_page],
+                'text': text,
+                'tokens': estimate_tokens(text),
+                'hash': hashlib.sha256(text.encode('utf-8')).hexdigest()
+            })
+        buffer, buffer_tokens, first_page = [], 0, None
+
+    for page_num, text in iter_page_texts(parse_result):
+        if not text.strip():
+            continue
+        for piece in _split_oversized(text, max_tokens):
+            tokens = estimate_tokens(piece)
+            if buffer and buffer_tokens + tokens > max_tokens:
+                flush()
+            if first_page is None:
+                first_page = page_num
+            last_page = page_num
+            buffer.append(piece)
+            buffer_tokens += tokens
+            if _is_cut_point(piece, tokens, target_tokens):
+                flush()
+    flush()
+    return chunks
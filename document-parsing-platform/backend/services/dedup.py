@@ -0,0 +1,165 @@
+"""Near-duplicate detection with MinHash signatures and LSH banding
+
+Each parsed document gets a MinHash signature over its five-word
+shingles. Equal signature positions estimate the Jaccard similarity of
+two documents' shingle sets. The signature is cut into bands, and every
+band is hashed into a bucket stored in ``document_lsh_bands``. Documents
+sharing a bucket in any band are candidates. Only those are compared
+signature to signature, so a lookup touches a handful of rows rather than
+the whole corpus.
+
+With 32 bands of 4 rows, pairs at Jaccard 0.9 share a bucket with
+probability > 0.999 and pairs at 0.3 with about 0.23, so the threshold
+check (``DEDUP_JACCARD_THRESHOLD``, default 0.9) decides the rest.
+In each group of near-duplicates the document with the lowest id is
+canonical, whatever order the copies are parsed in.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import os
+import random
+import string
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+MAX_CANDIDATES = 50
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(1)  # fixed so stored signatures stay comparable
+_PERM_A = [_rng.randrange(1, 1 << 32) for _ in range(NUM_PERM)]
+_PERM_B = [_rng.randrange(0, 1 << 32) for _ in range(NUM_PERM)]
+
+def jaccard_threshold() -> float:
+    return float(os.getenv('DEDUP_JACCARD_THRESHOLD', '0.9'))
+
+def shingle_hashes(texts: Iterable[str], size: int = SHINGLE_WORDS) -> List[int]:
+    """32-bit hashes of the distinct word shingles in the texts
+
+    Words are lowercased and stripped of surrounding punctuation, so
+    re-flowed or re-OCRed copies of the same text shingle alike. Texts
+    shorter than ``size`` words yield a single shingle.
+    """
+    words = [word.strip(string.punctuation) for text in texts for word in text.lower().split()]
+    words = [word for word in words if word]
+    if not words:
+        return []
+    spans = range(max(len(words) - size + 1, 1))
+    return list({
+        int.from_bytes(hashlib.blake2b(' '.join(words[i:i + size]).encode('utf-8'), digest_size=4).digest(), 'big')
+        for i in spans
+    })
+
+def minhash(hashes: List[int], block: int = 4096) -> bytes:
+    """MinHash signature of shingle hashes, as NUM_PERM little-endian uint32s
+
+    Each permutation is ``(a * h + b) mod (2^61 - 1)`` truncated to 32
+    bits, evaluated with NumPy over blocks of shingles so memory stays
+    bounded on long documents.
+    """
+    import numpy as np  # imported here so app start-up stays light
+
+    a = np.array(_PERM_A, dtype=np.uint64)[:, None]
+    b = np.array(_PERM_B, dtype=np.uint64)[:, None]
+    signature = np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint64)
+    values = np.array(hashes, dtype=np.uint64)
+    for start in range(0, len(values), block):
+        permuted = ((a * values[None, start:start + block] + b) % _MERSENNE) & 0xFFFFFFFF
+        signature = np.minimum(signature, permuted.min(axis=1))
+    return signature.astype('<u4').tobytes()
+
+def similarity(first: bytes, second: bytes) -> float:
+    """Estimated Jaccard similarity: the share of equal signature positions"""
+    import numpy as np
+
+    return float((np.frombuffer(first, dtype='<u4') == np.frombuffer(second, dtype='<u4')).mean())
+
+def band_buckets(signature: bytes) -> List[int]:
+    """Signed 64-bit bucket per band (fits SQLite INTEGER and PostgreSQL BIGINT)"""
+    width = ROWS * 4
+    return [
+        int.from_bytes(hashlib.blake2b(bytes([band]) + signature[band * width:(band + 1) * width],
+                                       digest_size=8).digest(), 'big', signed=True)
+        for band in range(BANDS)
+    ]
+
+def index_signature(db, document_id: int, texts: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """Store a document's signature and link it with its near-duplicates
+
+    The signature is committed before candidates are looked up. Two copies
+    indexed concurrently by different workers then see each other, whichever
+    order their ids and transactions take. Within a group of near-duplicates
+    the lowest id is canonical. If this document is older than the group's
+    canonical copy, it takes that role and the group is re-pointed at it.
+    ``documents.duplicate_of`` / ``duplicate_similarity`` are set on
+    whichever document is the duplicate.
+
+    Returns ``{'id', 'similarity'}`` of the canonical document when this
+    one is a duplicate, otherwise None. Documents without text get no
+    signature. Commits its own transactions.
+    """
+    db.execute('DELETE FROM document_lsh_bands WHERE document_id = ?', (document_id,))
+    db.execute('DELETE FROM document_signatures WHERE document_id = ?', (document_id,))
+    db.execute('UPDATE documents SET duplicate_of = NULL, duplicate_similarity = NULL WHERE id = ?',
+               (document_id,))
+    hashes = shingle_hashes(texts)
+    if not hashes:
+        db.commit()
+        return None
+
+    signature = minhash(hashes)
+    buckets = band_buckets(signature)
+    db.execute('INSERT INTO document_signatures (document_id, signature, shingles) VALUES (?, ?, ?)',
+               (document_id, signature, len(hashes)))
+    db.bulk_insert('document_lsh_bands', ('band', 'bucket', 'document_id'),
+                   ((band, bucket, document_id) for band, bucket in enumerate(buckets)))
+    db.commit()
+
+    match = _best_match(db, document_id, signature, buckets)
+    if match is None or match['canonical'] == document_id:
+        return None
+    if match['canonical'] < document_id:
+        db.execute('UPDATE documents SET duplicate_of = ?, duplicate_similarity = ? WHERE id = ?',
+                   (match['canonical'], match['similarity'], document_id))
+        db.commit()
+        return {'id': match['canonical'], 'similarity': match['similarity']}
+
+    # This document predates the group: it becomes canonical. Members keep
+    # their similarity to the previous canonical copy.
+    db.execute('UPDATE documents SET duplicate_of = ? WHERE duplicate_of = ?',
+               (document_id, match['canonical']))
+    db.execute('UPDATE documents SET duplicate_of = ?, duplicate_similarity = ? WHERE id = ?',
+               (document_id, match['similarity'], match['canonical']))
+    db.commit()
+    return None
+
+def _best_match(db, document_id: int, signature: bytes, buckets: List[int]) -> Optional[Dict[str, Any]]:
+    """Most similar other document at or above the threshold
+
+    Returns ``{'id', 'canonical', 'similarity'}``, where ``canonical`` is
+    the match's canonical copy (itself unless it is a duplicate).
+    """
+    where = ' OR '.join('(band = ? AND bucket = ?)' for _ in buckets)
+    params = [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+    candidates = db.execute(
+        f'''SELECT DISTINCT b.document_id, s.signature, d.duplicate_of
+            FROM document_lsh_bands b
+            JOIN document_signatures s ON s.document_id = b.document_id
+            JOIN documents d ON d.id = b.document_id
+            WHERE b.document_id != ? AND ({where})
+            ORDER BY b.document_id LIMIT {MAX_CANDIDATES}''',
+        [document_id] + params
+    ).fetchall()
+
+    threshold = jaccard_threshold()
+    best = None
+    for row in candidates:
+        score = round(similarity(signature, bytes(row['signature'])), 4)
+        if score >= threshold and (best is None or score > best['similarity']):
+            best = {
+                'id': row['document_id'],
+                'canonical': row['duplicate_of'] or row['document_id'],
+                'similarity': score
+            }
+    return best
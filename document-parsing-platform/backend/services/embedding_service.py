@@ -6,6 +6,9 @@ import os
 import numpy as np
 from enum import Enum
 
+from services.metrics import timed_provider
+from services.rate_limiter import get_rate_limiter, parse_retry_after, estimate_tokens
+
 class EmbeddingProvider(Enum):
     GOOGLE_AI = "google-ai"
     AWAN = "awan"
@@ -18,11 +21,39 @@ class EmbeddingProvider(Enum):
 class BaseEmbeddingService(ABC):
     """Abstract base class for embedding services"""
     
+    provider: EmbeddingProvider
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.validate_config()
         self.dimension = self.get_embedding_dimension()
+        # Shared with the LLM service for the same provider
+        self.rate_limiter = get_rate_limiter(
+            self.provider.value,
+            config.get('requests_per_minute'),
+            config.get('tokens_per_minute')
+        )
+        
+    def _post(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+              tokens: int = 0, max_retries: int = 3, operation: str = 'embed') -> requests.Response:
+        """POST through the provider rate limiter, retrying after 429 responses
+
+        Every 429 is reported to the shared limiter, including one on the
+        last attempt, so later callers wait instead of hitting the quota.
+        """
+        for attempt in range(max_retries):
+            self.rate_limiter.acquire(tokens)
+            with timed_provider('embedding', self.provider.value, operation):
+                response = requests.post(url, headers=headers, json=payload,
+                                         timeout=self.config.get('timeout', 60))
+            if response.status_code == 429:
+                self.rate_limiter.on_rate_limited(parse_retry_after(response.headers.get('Retry-After')))
+                if attempt < max_retries - 1:
+                    continue
+            response.raise_for_status()
+            self.rate_limiter.on_success()
+            return response
         
     @abstractmethod
     def validate_config(self) -> None:
@@ -51,6 +82,9 @@ class BaseEmbeddingService(ABC):
         return (embedding / norm).tolist()
 
 class GoogleAIEmbeddingService(BaseEmbeddingService):
+    provider = EmbeddingProvider.GOOGLE_AI
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
     def validate_config(self) -> None:
         required = ['api_key', 'model_name']
         if not all(k in self.config for k in required):
@@ -67,12 +101,12 @@ class GoogleAIEmbeddingService(BaseEmbeddingService):
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.config['model_name']}:embedText",
+            response = self._post(
+                f"{self.config.get('base_url', self.BASE_URL)}/models/{self.config['model_name']}:embedText",
+                {"text": text},
                 headers=headers,
-                json={"text": text}
+                tokens=estimate_tokens(text)
             )
-            response.raise_for_status()
             embedding = response.json()['embedding']['value']
             return self.normalize(embedding)
             
@@ -87,12 +121,13 @@ class GoogleAIEmbeddingService(BaseEmbeddingService):
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.config['model_name']}:batchEmbedText",
+            response = self._post(
+                f"{self.config.get('base_url', self.BASE_URL)}/models/{self.config['model_name']}:batchEmbedText",
+                {"texts": texts},
                 headers=headers,
-                json={"texts": texts}
+                tokens=sum(estimate_tokens(text) for text in texts),
+                operation='batch_embed'
             )
-            response.raise_for_status()
             embeddings = [e['value'] for e in response.json()['embeddings']]
             return [self.normalize(embedding) for embedding in embeddings]
             
@@ -101,6 +136,9 @@ class GoogleAIEmbeddingService(BaseEmbeddingService):
             raise
 
 class OllamaEmbeddingService(BaseEmbeddingService):
+    provider = EmbeddingProvider.OLLAMA
+    BASE_URL = "http://localhost:11434"
+
     def validate_config(self) -> None:
         required = ['model_name']
         if not all(k in self.config for k in required):
@@ -112,14 +150,14 @@ class OllamaEmbeddingService(BaseEmbeddingService):
             
     def embed(self, text: str) -> List[float]:
         try:
-            response = requests.post(
-                "http://localhost:11434/api/embeddings",
-                json={
+            response = self._post(
+                f"{self.config.get('base_url', self.BASE_URL)}/api/embeddings",
+                {
                     "model": self.config['model_name'],
                     "prompt": text
-                }
+                },
+                tokens=estimate_tokens(text)
             )
-            response.raise_for_status()
             embedding = response.json()['embedding']
             return self.normalize(embedding)
             
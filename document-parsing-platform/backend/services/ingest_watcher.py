@@ -0,0 +1,239 @@
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+import logging
+import os
+import signal
+import threading
+import time
+
+from models import init_db, get_db, close_db
+from parsers.registry import detect_format
+from processing import is_supported, submit_document
+
+# Names written by browsers, editors and copy tools while a file is incomplete
+PARTIAL_SUFFIXES = ('.part', '.partial', '.tmp', '.crdownload', '.download')
+
+UNSUPPORTED_CONTENT = 'File content does not match a supported type'
+
+class DirectoryWatcher:
+    """Ingests documents dropped into watched directories
+
+    Directories are polled every ``poll_interval`` seconds. A file is only
+    picked up once its size and modification time have not changed for
+    ``settle_seconds``, so partially written files are left alone.
+
+    Ready files are registered in batches of ``batch_size`` (one transaction
+    per batch) and parsed through the shared parse scheduler as ``tenant``
+    at ``priority``, so a large drop takes only its fair share of parse
+    workers and each parse gets the usual deadline. At most
+    ``max_in_flight`` files are submitted at once. When every slot is busy
+    the scan loop blocks, so a large drop never builds an unbounded backlog
+    in memory.
+
+    Progress is kept in ``ingest_files`` keyed by path, size and mtime. A
+    file that changes is re-parsed into the document row it already has.
+    On restart finished files are skipped and interrupted ones are resumed
+    with their existing document row.
+    """
+
+    def __init__(self, directories: List[str], poll_interval: float = 2.0,
+                 settle_seconds: float = 5.0, batch_size: int = 20, max_in_flight: int = 4,
+                 tenant: str = 'ingest', priority: str = 'batch'):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.tenant = tenant
+        self.priority = priority
+        self.logger = logging.getLogger(__name__)
+        # path -> (size, mtime_ns) of files already handed to the pipeline
+        self._known: Dict[str, Tuple[int, int]] = {}
+        # path -> (size, mtime_ns, first seen with that signature)
+        self._observed: Dict[str, Tuple[int, int, float]] = {}
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='ingest')
+        self._stop = threading.Event()
+
+    def _set_status(self, path: str, status: str, error: Optional[str] = None) -> None:
+        db = get_db()
+        db.execute('''UPDATE ingest_files SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+                      WHERE path = ?''', (status, error, path))
+        db.commit()
+
+    def _resume(self) -> None:
+        """Load recorded progress and resubmit files interrupted by a restart"""
+        rows = get_db().execute(
+            'SELECT path, size, mtime_ns, status, document_id FROM ingest_files'
+        ).fetchall()
+        close_db()
+        interrupted = []
+        for row in rows:
+            self._known[row['path']] = (row['size'], row['mtime_ns'])
+            if row['status'] in ('queued', 'processing') and row['document_id']:
+                interrupted.append((row['document_id'], row['path']))
+        if interrupted:
+            self.logger.info(f"Resuming {len(interrupted)} interrupted files")
+        for document_id, path in interrupted:
+            if not self._submit(document_id, path):
+                return
+
+    def scan(self) -> List[Tuple[str, int, int]]:
+        """Return (path, size, mtime_ns) of new or changed files that have settled"""
+        now = time.monotonic()
+        seen = set()
+        ready = []
+        for directory in self.directories:
+            for root, dirs, files in os.walk(directory):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in files:
+                    if name.startswith(('.', '~$')) or name.lower().endswith(PARTIAL_SUFFIXES):
+                        continue
+                    path = os.path.join(root, name)
+                    if not is_supported(path):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    seen.add(path)
+                    signature = (stat.st_size, stat.st_mtime_ns)
+                    if self._known.get(path) == signature:
+                        continue
+                    previous = self._observed.get(path)
+                    if previous is None or previous[:2] != signature:
+                        self._observed[path] = (*signature, now)
+                    elif stat.st_size > 0 and now - previous[2] >= self.settle_seconds:
+                        ready.append((path, *signature))
+        for path in list(self._observed):
+            if path not in seen:
+                del self._observed[path]
+        return ready
+
+    def _enqueue(self, batch: List[Tuple[str, int, int]]) -> bool:
+        """Register a batch of files in one transaction and submit them
+
+        A path seen before keeps its document row; only new paths get one.
+        Files are sniffed first (parsers.registry.detect_format), like
+        uploads: one whose content is not a supported type gets no document
+        row and is recorded as failed until it changes again.
+        """
+        db = get_db()
+        queued, rejected = [], []
+        try:
+            for path, size, mtime_ns in batch:
+                if detect_format(path) is None:
+                    updated = db.execute(
+                        '''UPDATE ingest_files SET size = ?, mtime_ns = ?, status = ?, error = ?,
+                                  updated_at = CURRENT_TIMESTAMP
+                           WHERE path = ?''',
+                        (size, mtime_ns, 'failed', UNSUPPORTED_CONTENT, path)
+                    ).rowcount
+                    if not updated:
+                        db.execute(
+                            '''INSERT INTO ingest_files (path, size, mtime_ns, status, error)
+                               VALUES (?, ?, ?, ?, ?)''',
+                            (path, size, mtime_ns, 'failed', UNSUPPORTED_CONTENT)
+                        )
+                    rejected.append((path, (size, mtime_ns)))
+                    continue
+                known = db.execute('SELECT document_id FROM ingest_files WHERE path = ?', (path,)).fetchone()
+                document_id = known['document_id'] if known else None
+                if document_id is None or not db.execute(
+                    'UPDATE documents SET filename = ?, filepath = ?, status = ? WHERE id = ?',
+                    (os.path.basename(path), path, 'queued', document_id)
+                ).rowcount:
+                    document_id = db.insert(
+                        'INSERT INTO documents (filename, filepath, status) VALUES (?, ?, ?)',
+                        (os.path.basename(path), path, 'queued')
+                    )
+                updated = db.execute(
+                    '''UPDATE ingest_files SET size = ?, mtime_ns = ?, document_id = ?, status = ?,
+                              error = NULL, updated_at = CURRENT_TIMESTAMP
+                       WHERE path = ?''',
+                    (size, mtime_ns, document_id, 'queued', path)
+                ).rowcount
+                if not updated:
+                    db.execute(
+                        '''INSERT INTO ingest_files (path, size, mtime_ns, document_id, status)
+                           VALUES (?, ?, ?, ?, ?)''',
+                        (path, size, mtime_ns, document_id, 'queued')
+                    )
+                queued.append((document_id, path, (size, mtime_ns)))
+            db.commit()
+        finally:
+            close_db()
+
+        for path, signature in rejected:
+            self.logger.warning(f"Skipping {path}: {UNSUPPORTED_CONTENT.lower()}")
+            self._known[path] = signature
+            self._observed.pop(path, None)
+        self.logger.info(f"Queued batch of {len(queued)} files")
+        for document_id, path, signature in queued:
+            self._known[path] = signature
+            self._observed.pop(path, None)
+            if not self._submit(document_id, path):
+                return False
+        return True
+
+    def _submit(self, document_id: int, path: str) -> bool:
+        """Wait for a free processing slot, then submit; False if stopping"""
+        while not self._slots.acquire(timeout=1):
+            if self._stop.is_set():
+                return False
+        self._executor.submit(self._process, document_id, path)
+        return True
+
+    def _process(self, document_id: int, path: str) -> None:
+        """Parse one file on the shared scheduler and wait for the outcome"""
+        try:
+            self._set_status(path, 'processing')
+            submit_document(document_id, path, priority=self.priority, tenant=self.tenant).result()
+            self._set_status(path, 'done')
+        except CancelledError:
+            self._set_status(path, 'cancelled')
+        except Exception as e:
+            self.logger.error(f"Ingestion failed for {path}: {str(e)}")
+            try:
+                self._set_status(path, 'failed', str(e))
+            except Exception:
+                self.logger.exception(f"Could not record failure for {path}")
+        finally:
+            close_db()
+            self._slots.release()
+
+    def run(self) -> None:
+        """Watch until stop() is called"""
+        self.logger.info(f"Watching {', '.join(self.directories)}")
+        self._resume()
+        while not self._stop.is_set():
+            ready = self.scan()
+            for start in range(0, len(ready), self.batch_size):
+                if self._stop.is_set() or not self._enqueue(ready[start:start + self.batch_size]):
+                    break
+            self._stop.wait(self.poll_interval)
+        self._executor.shutdown(wait=True)
+
+    def stop(self) -> None:
+        """Stop scanning; files already submitted finish processing"""
+        self._stop.set()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    directories = [d for d in os.getenv('INGEST_WATCH_DIRS', 'inbox').split(os.pathsep) if d]
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    init_db()
+    watcher = DirectoryWatcher(
+        directories,
+        poll_interval=float(os.getenv('INGEST_POLL_INTERVAL', '2')),
+        settle_seconds=float(os.getenv('INGEST_SETTLE_SECONDS', '5')),
+        batch_size=int(os.getenv('INGEST_BATCH_SIZE', '20')),
+        max_in_flight=int(os.getenv('INGEST_MAX_IN_FLIGHT', '4')),
+        tenant=os.getenv('INGEST_TENANT', 'ingest'),
+        priority=os.getenv('INGEST_PRIORITY', 'batch')
+    )
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    signal.signal(signal.SIGINT, lambda *_: watcher.stop())
+    watcher.run()
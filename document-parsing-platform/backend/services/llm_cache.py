@@ -0,0 +1,100 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import threading
+import time
+
+class LLMResponseCache:
+    """Size-bounded LRU cache of LLM completions with per-entry TTL
+
+    Entries are keyed on (provider, model, normalized prompt, temperature,
+    max_tokens). Sampling with a non-zero temperature is not repeatable, so
+    those requests bypass the cache unless ``cache_nondeterministic`` is set
+    or the caller opts in per request.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 cache_nondeterministic: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_nondeterministic = cache_nondeterministic
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Collapse whitespace so formatting-only differences share an entry"""
+        return ' '.join(prompt.split())
+
+    def make_key(self, provider: str, model: str, prompt: str,
+                 temperature: float, max_tokens: int) -> str:
+        """Build a stable digest for the request parameters"""
+        payload = json.dumps([
+            provider,
+            model,
+            self.normalize_prompt(prompt),
+            round(float(temperature), 4),
+            int(max_tokens)
+        ], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def is_cacheable(self, temperature: float, use_cache: Optional[bool] = None) -> bool:
+        """Decide whether a request may be served from or stored in the cache"""
+        if use_cache is not None:
+            cacheable = use_cache
+        else:
+            cacheable = float(temperature) == 0 or self.cache_nondeterministic
+        if not cacheable:
+            with self._lock:
+                self.bypasses += 1
+        return cacheable
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached completion, or None on miss or expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store a completion, evicting least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit-rate metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypasses': self.bypasses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
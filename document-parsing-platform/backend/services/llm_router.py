@@ -0,0 +1,137 @@
+from typing import Dict, Any, Optional, List
+from collections import deque
+import logging
+import threading
+import time
+
+class ProviderStats:
+    """Rolling latency and error-rate window for one provider"""
+
+    def __init__(self, window: int = 100):
+        self.samples: deque = deque(maxlen=window)  # (latency_seconds, ok)
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.samples.append((latency, ok))
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+
+    def reset(self) -> None:
+        """Forget the window, e.g. when a cooldown ends"""
+        self.samples.clear()
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile over successful requests, or None without data"""
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(q / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def successes(self) -> int:
+        return sum(1 for _, ok in self.samples if ok)
+
+class LatencyAwareRouter:
+    """Ranks providers by rolling latency and health
+
+    A provider is taken out of rotation for ``cooldown_seconds`` once its
+    windowed error rate exceeds ``max_error_rate`` or after
+    ``failure_threshold`` consecutive failures. When the cooldown ends its
+    window is cleared and it is ranked as unmeasured, so the next call
+    probes it (half-open); a failed probe starts a new cooldown. Healthy
+    providers are ordered by median latency (providers without samples
+    first, so they get measured); unhealthy ones are kept at the end as a
+    last resort.
+    """
+
+    def __init__(self, window: int = 100, max_error_rate: float = 0.5,
+                 failure_threshold: int = 3, cooldown_seconds: float = 30,
+                 hedge: bool = False, hedge_percentile: float = 95,
+                 min_hedge_samples: int = 10, min_hedge_delay: float = 0.05):
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_samples = min_hedge_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.providers: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _stats(self, provider: str) -> ProviderStats:
+        if provider not in self.providers:
+            self.providers[provider] = ProviderStats(self.window)
+        return self.providers[provider]
+
+    def record(self, provider: str, latency: float, ok: bool) -> None:
+        """Record the outcome of a provider call"""
+        with self._lock:
+            stats = self._stats(provider)
+            stats.record(latency, ok)
+            if not ok and (stats.consecutive_failures >= self.failure_threshold
+                           or stats.error_rate > self.max_error_rate):
+                stats.unhealthy_until = time.monotonic() + self.cooldown_seconds
+                self.logger.warning(f"Provider {provider} marked unhealthy after "
+                                    f"{stats.consecutive_failures} consecutive failures "
+                                    f"(error rate {stats.error_rate:.0%})")
+
+    def _healthy(self, stats: ProviderStats, now: float) -> bool:
+        """Health check that ends an expired cooldown; caller holds the lock"""
+        if stats.unhealthy_until > now:
+            return False
+        if stats.unhealthy_until:
+            # Without traffic the old window would never change: start afresh
+            stats.reset()
+        return stats.error_rate <= self.max_error_rate
+
+    def is_healthy(self, provider: str) -> bool:
+        with self._lock:
+            return self._healthy(self._stats(provider), time.monotonic())
+
+    def rank(self, providers: List[str]) -> List[str]:
+        """Order providers from most to least preferred"""
+        def score(provider: str) -> float:
+            median = self._stats(provider).percentile(50)
+            return 0.0 if median is None else median
+
+        healthy = [p for p in providers if self.is_healthy(p)]
+        unhealthy = [p for p in providers if p not in healthy]
+        with self._lock:
+            return sorted(healthy, key=score) + sorted(unhealthy, key=score)
+
+    def hedge_delay(self, provider: str) -> Optional[float]:
+        """Delay before firing a hedged duplicate, or None to not hedge"""
+        if not self.hedge:
+            return None
+        with self._lock:
+            stats = self._stats(provider)
+            if stats.successes < self.min_hedge_samples:
+                return None
+            return max(self.min_hedge_delay, stats.percentile(self.hedge_percentile))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-provider latency and health metrics"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                provider: {
+                    'samples': len(stats.samples),
+                    'p50': stats.percentile(50),
+                    'p95': stats.percentile(95),
+                    'p99': stats.percentile(99),
+                    'error_rate': stats.error_rate,
+                    'healthy': self._healthy(stats, now)
+                }
+                for provider, stats in self.providers.items()
+            }
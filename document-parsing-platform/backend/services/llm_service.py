@@ -1,12 +1,19 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator
 import logging
 from abc import ABC, abstractmethod
 import requests
+from requests.adapters import HTTPAdapter
 import time
 from functools import wraps
 import os
 import json
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from services.llm_cache import LLMResponseCache
+from services.llm_router import LatencyAwareRouter
+from services.metrics import observe_provider, timed_provider
+from services.rate_limiter import get_rate_limiter, parse_retry_after, estimate_tokens
 
 class LLMProvider(Enum):
     GOOGLE_AI = "google-ai"
@@ -20,88 +27,161 @@ class LLMProvider(Enum):
 class BaseLLMService(ABC):
     """Abstract base class for LLM services"""
     
+    provider: LLMProvider
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.validate_config()
+        self.timeout = config.get('timeout', 60)
+        # Shared with the embedding service for the same provider
+        self.rate_limiter = get_rate_limiter(
+            self.provider.value,
+            config.get('requests_per_minute'),
+            config.get('tokens_per_minute')
+        )
+        # Keep-alive session so repeated calls reuse pooled connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=config.get('pool_size', 10)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         
     @abstractmethod
     def validate_config(self) -> None:
         """Validate the configuration for this provider"""
         pass
-        
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Content-Type": "application/json"}
+
+    def _retry_request(self, url: str, payload: Dict[str, Any], tokens: int = 0,
+                       max_retries: int = 3, stream: bool = False) -> requests.Response:
+        """POST through the provider rate limiter with retries
+
+        Every 429 feeds ``Retry-After`` back into the shared limiter, which
+        holds this and every other caller until the provider accepts
+        requests again; other failures back off exponentially. With
+        ``stream`` the body is left unread and the caller must close the
+        response.
+        """
+        for attempt in range(max_retries):
+            self.rate_limiter.acquire(tokens)
+            response = None
+            try:
+                response = self.session.post(
+                    url,
+                    headers=self._headers(),
+                    json=payload,
+                    timeout=self.timeout,
+                    stream=stream
+                )
+                if response.status_code == 429:
+                    self.rate_limiter.on_rate_limited(parse_retry_after(response.headers.get('Retry-After')))
+                response.raise_for_status()
+                self.rate_limiter.on_success()
+                return response
+            except requests.exceptions.RequestException as e:
+                if response is not None:
+                    response.close()
+                if attempt == max_retries - 1:
+                    raise
+                if getattr(e.response, 'status_code', None) == 429:
+                    self.logger.warning(f"Attempt {attempt + 1} rate limited. Queued behind the rate limiter...")
+                    continue
+                wait_time = 2 ** (attempt + 1)
+                self.logger.warning(f"Attempt {attempt + 1} failed. Retrying in {wait_time} seconds...")
+                time.sleep(wait_time)
+
     @abstractmethod
     def generate(self, prompt: str, **kwargs) -> str:
         """Generate text from a prompt"""
         pass
         
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Yield generated text incrementally as the provider produces it
+
+        Providers without a streaming API fall back to a single chunk.
+        """
+        yield self.generate(prompt, **kwargs)
+        
     @abstractmethod
     def embed(self, text: str) -> list[float]:
         """Generate embeddings for text"""
         pass
 
 class GoogleAIService(BaseLLMService):
+    provider = LLMProvider.GOOGLE_AI
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
     def validate_config(self) -> None:
         required = ['api_key', 'model_name']
         if not all(k in self.config for k in required):
             raise ValueError(f"Missing required config keys: {required}")
-            
+
+    def _url(self, method: str) -> str:
+        base_url = self.config.get('base_url', self.BASE_URL)
+        return f"{base_url}/models/{self.config['model_name']}:{method}"
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.config['api_key']}",
+            "Content-Type": "application/json"
+        }
+
     def generate(self, prompt: str, **kwargs) -> str:
         try:
-            headers = {
-                "Authorization": f"Bearer {self.config['api_key']}",
-                "Content-Type": "application/json"
-            }
-            
             params = {
                 "prompt": prompt,
                 "temperature": kwargs.get('temperature', 0.7),
                 "maxOutputTokens": kwargs.get('max_tokens', 2048)
             }
-            
-            def retry_request(url, headers, params, max_retries=3):
-                for attempt in range(max_retries):
-                    try:
-                        response = requests.post(
-                            url,
-                            headers=headers,
-                            json=params,
-                            timeout=10
-                        )
-                        response.raise_for_status()
-                        return response
-                    except requests.exceptions.RequestException as e:
-                        if attempt == max_retries - 1:
-                            raise
-                        wait_time = 2 ** (attempt + 1)
-                        self.logger.warning(f"Attempt {attempt + 1} failed. Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-
-            response = retry_request(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.config['model_name']}:generateText",
-                headers=headers,
-                json=params
+
+            response = self._retry_request(
+                self._url('generateText'),
+                params,
+                tokens=estimate_tokens(prompt) + params['maxOutputTokens']
             )
-            response.raise_for_status()
             return response.json()['candidates'][0]['output']
             
         except Exception as e:
             self.logger.error(f"Google AI generation failed: {str(e)}")
             raise
 
-    def embed(self, text: str) -> list[float]:
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream tokens via the server-sent events variant of generateContent"""
         try:
-            headers = {
-                "Authorization": f"Bearer {self.config['api_key']}",
-                "Content-Type": "application/json"
+            payload = {
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {
+                    "temperature": kwargs.get('temperature', 0.7),
+                    "maxOutputTokens": kwargs.get('max_tokens', 2048)
+                }
             }
-            
-            response = retry_request(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.config['model_name']}:embedText",
-                headers=headers,
-                json={"text": text}
-            )
-            response.raise_for_status()
+            with self._retry_request(
+                f"{self._url('streamGenerateContent')}?alt=sse",
+                payload,
+                tokens=estimate_tokens(prompt) + payload['generationConfig']['maxOutputTokens'],
+                stream=True
+            ) as response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    chunk = json.loads(line[len('data:'):])
+                    for candidate in chunk.get('candidates', [])[:1]:
+                        for part in candidate.get('content', {}).get('parts', []):
+                            if part.get('text'):
+                                yield part['text']
+
+        except Exception as e:
+            self.logger.error(f"Google AI streaming failed: {str(e)}")
+            raise
+
+    def embed(self, text: str) -> list[float]:
+        try:
+            response = self._retry_request(self._url('embedText'), {"text": text}, tokens=estimate_tokens(text))
             return response.json()['embedding']['value']
             
         except Exception as e:
@@ -109,34 +189,45 @@ class GoogleAIService(BaseLLMService):
             raise
 
 class OllamaService(BaseLLMService):
+    provider = LLMProvider.OLLAMA
+
     def validate_config(self) -> None:
         required = ['model_name']
         if not all(k in self.config for k in required):
             raise ValueError(f"Missing required config keys: {required}")
             
+    BASE_URL = "http://localhost:11434"
+
+    def _url(self, path: str) -> str:
+        return f"{self.config.get('base_url', self.BASE_URL)}{path}"
+            
     def generate(self, prompt: str, **kwargs) -> str:
+        # Ollama streams the response, so we need to collect it
+        return "".join(self.stream(prompt, **kwargs))
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
         try:
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={
+            # Reserve the prompt plus the output budget, as for Google AI
+            with self._retry_request(
+                self._url("/api/generate"),
+                {
                     "model": self.config['model_name'],
                     "prompt": prompt,
                     "options": {
                         "temperature": kwargs.get('temperature', 0.7),
                         "num_ctx": kwargs.get('max_tokens', 2048)
                     }
-                }
-            )
-            response.raise_for_status()
-            
-            # Ollama streams the response, so we need to collect it
-            full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    chunk = json.loads(line)
-                    full_response += chunk.get("response", "")
-                    
-            return full_response
+                },
+                tokens=estimate_tokens(prompt) + kwargs.get('max_tokens', 2048),
+                stream=True
+            ) as response:
+                for line in response.iter_lines():
+                    if line:
+                        chunk = json.loads(line)
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            break
             
         except Exception as e:
             self.logger.error(f"Ollama generation failed: {str(e)}")
@@ -144,14 +235,14 @@ class OllamaService(BaseLLMService):
 
     def embed(self, text: str) -> list[float]:
         try:
-            response = requests.post(
-                "http://localhost:11434/api/embeddings",
-                json={
+            response = self._retry_request(
+                self._url("/api/embeddings"),
+                {
                     "model": self.config['model_name'],
                     "prompt": text
-                }
+                },
+                tokens=estimate_tokens(text)
             )
-            response.raise_for_status()
             return response.json()['embedding']
             
         except Exception as e:
@@ -176,9 +267,14 @@ class LLMServiceFactory:
 class LLMServiceManager:
     """Manages multiple LLM service instances"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMResponseCache] = None,
+                 router: Optional[LatencyAwareRouter] = None, hedge_workers: int = 16):
         self.services: Dict[str, BaseLLMService] = {}
         self.default_provider: Optional[str] = None
+        self.cache = cache
+        self.router = router
+        self.hedge_workers = hedge_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
         self.logger = logging.getLogger(__name__)
         
     def add_provider(self, provider: str, config: Dict[str, Any]) -> None:
@@ -200,17 +296,116 @@ class LLMServiceManager:
         self.default_provider = provider
         self.logger.info(f"Set default LLM provider to: {provider}")
         
-    def generate(self, prompt: str, provider: Optional[str] = None, **kwargs) -> str:
-        """Generate text using the specified or default provider"""
+    def generate(self, prompt: str, provider: Optional[str] = None,
+                 use_cache: Optional[bool] = None, **kwargs) -> str:
+        """Generate text using the specified or default provider
+
+        When a response cache is attached, deterministic requests are served
+        from it; ``use_cache`` forces the cache on or off for this call.
+        Without an explicit provider and with a router attached, the request
+        goes to the fastest healthy provider and fails over on errors.
+        """
+        if provider is None and self.router is not None and len(self.services) > 1:
+            return self._routed_generate(prompt, use_cache, kwargs)
+
         provider = provider or self.default_provider
         if not provider:
             raise ValueError("No LLM provider configured")
+        return self._generate_with(provider, prompt, use_cache, kwargs)
+
+    def _generate_with(self, provider: str, prompt: str, use_cache: Optional[bool],
+                       kwargs: Dict[str, Any]) -> str:
+        """Generate with one provider, consulting the cache and recording latency"""
+        cache_key = None
+        if self.cache is not None and self.cache.is_cacheable(kwargs.get('temperature', 0.7), use_cache):
+            cache_key = self.cache.make_key(
+                provider,
+                self.services[provider].config['model_name'],
+                prompt,
+                kwargs.get('temperature', 0.7),
+                kwargs.get('max_tokens', 2048)
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
             
+        started = time.monotonic()
         try:
-            return self.services[provider].generate(prompt, **kwargs)
+            response = self.services[provider].generate(prompt, **kwargs)
         except Exception as e:
+            observe_provider('llm', provider, 'generate', time.monotonic() - started, ok=False)
+            if self.router is not None:
+                self.router.record(provider, time.monotonic() - started, ok=False)
             self.logger.error(f"Generation failed with provider {provider}: {str(e)}")
             raise
+        observe_provider('llm', provider, 'generate', time.monotonic() - started)
+        if self.router is not None:
+            self.router.record(provider, time.monotonic() - started, ok=True)
+
+        if cache_key is not None:
+            self.cache.set(cache_key, response)
+        return response
+
+    def _routed_generate(self, prompt: str, use_cache: Optional[bool], kwargs: Dict[str, Any]) -> str:
+        """Try providers in router order, hedging slow requests and failing over on errors
+
+        If the preferred provider has not answered within its hedge delay
+        a duplicate request goes to the next provider and the first
+        successful answer wins. Abandoned requests finish in the background
+        so their latency still feeds the router.
+        """
+        candidates = self.router.rank(list(self.services))
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers,
+                                                thread_name_prefix='llm-hedge')
+
+        pending = {}
+        next_index = 0
+        last_error: Optional[Exception] = None
+
+        def launch() -> None:
+            nonlocal next_index
+            candidate = candidates[next_index]
+            next_index += 1
+            future = self._executor.submit(self._generate_with, candidate, prompt, use_cache, kwargs)
+            pending[future] = candidate
+
+        launch()
+        hedged = False
+        while pending:
+            timeout = None
+            if not hedged and len(pending) == 1 and next_index < len(candidates):
+                timeout = self.router.hedge_delay(next(iter(pending.values())))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                self.logger.info(f"Hedging request to {candidates[next_index]}")
+                launch()
+                continue
+            for future in done:
+                candidate = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+                    self.logger.warning(f"Provider {candidate} failed, failing over: {str(e)}")
+            if not pending and next_index < len(candidates):
+                launch()
+
+        raise last_error
+            
+    def stream(self, prompt: str, provider: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """Stream generated text using the specified or default provider"""
+        provider = provider or self.default_provider
+        if not provider:
+            raise ValueError("No LLM provider configured")
+            
+        try:
+            with timed_provider('llm', provider, 'stream'):
+                yield from self.services[provider].stream(prompt, **kwargs)
+        except Exception as e:
+            self.logger.error(f"Streaming failed with provider {provider}: {str(e)}")
+            raise
             
     def embed(self, text: str, provider: Optional[str] = None) -> list[float]:
         """Generate embeddings using the specified or default provider"""
@@ -219,11 +414,46 @@ class LLMServiceManager:
             raise ValueError("No LLM provider configured")
             
         try:
-            return self.services[provider].embed(text)
+            with timed_provider('llm', provider, 'embed'):
+                return self.services[provider].embed(text)
         except Exception as e:
             self.logger.error(f"Embedding failed with provider {provider}: {str(e)}")
             raise
 
+    @classmethod
+    def from_env(cls) -> 'LLMServiceManager':
+        """Build a manager from environment variables
+
+        Ollama is configured when ``OLLAMA_MODEL`` is set and Google AI when
+        ``GOOGLE_AI_KEY`` is set; ``LLM_PROVIDER`` selects the default.
+        """
+        manager = cls(cache=LLMResponseCache(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL", "3600")),
+            cache_nondeterministic=os.getenv("LLM_CACHE_NONDETERMINISTIC", "").lower() in ("1", "true", "yes")
+        ))
+        if os.getenv("OLLAMA_MODEL"):
+            config = {"model_name": os.getenv("OLLAMA_MODEL")}
+            if os.getenv("OLLAMA_BASE_URL"):
+                config["base_url"] = os.getenv("OLLAMA_BASE_URL")
+            manager.add_provider(LLMProvider.OLLAMA.value, config)
+        if os.getenv("GOOGLE_AI_KEY"):
+            config = {
+                "api_key": os.getenv("GOOGLE_AI_KEY"),
+                "model_name": os.getenv("GOOGLE_AI_MODEL", "text-bison-001")
+            }
+            if os.getenv("GOOGLE_AI_BASE_URL"):
+                config["base_url"] = os.getenv("GOOGLE_AI_BASE_URL")
+            manager.add_provider(LLMProvider.GOOGLE_AI.value, config)
+        if os.getenv("LLM_ROUTING", "").lower() in ("1", "true", "yes"):
+            manager.router = LatencyAwareRouter(
+                hedge=os.getenv("LLM_HEDGE", "").lower() in ("1", "true", "yes"),
+                hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+            )
+        if os.getenv("LLM_PROVIDER") in manager.services:
+            manager.set_default_provider(os.getenv("LLM_PROVIDER"))
+        return manager
+
 # Example usage
 if __name__ == '__main__':
     # Initialize with Google AI
@@ -0,0 +1,216 @@
+"""Lightweight in-process metrics with Prometheus text exposition
+
+Counters and histograms live in a process-wide registry rendered by the
+``/metrics`` endpoint. Under gunicorn each worker keeps its own registry,
+so scrape workers individually or aggregate in Prometheus.
+
+Stage timings are recorded with ``timed(component, stage)``. Inside
+``collect_timings()`` the same timings are also summed per stage, which
+parsers attach to their result as a ``timings`` breakdown.
+"""
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import bisect
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = tuple(str(label) for label in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_labels(self.label_names, key)} {_number(value)}' for key, value in items]
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = tuple(str(label) for label in labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, [list(entry[0]), entry[1], entry[2]]) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket'
+                             f'{_labels(self.label_names, key, (("le", _number(bound)),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, key)} {count}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'docparse_stage_duration_seconds', 'Time spent in each processing stage', ('component', 'stage')
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'docparse_stage_errors_total', 'Processing stages that raised', ('component', 'stage')
+)
+PROVIDER_SECONDS = REGISTRY.histogram(
+    'provider_request_duration_seconds', 'LLM and embedding provider call latency',
+    ('service', 'provider', 'operation')
+)
+PROVIDER_ERRORS = REGISTRY.counter(
+    'provider_request_errors_total', 'Failed LLM and embedding provider calls',
+    ('service', 'provider', 'operation')
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Flask request handling time', ('method', 'endpoint')
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'Flask requests by response status', ('method', 'endpoint', 'status')
+)
+
+class TimingBreakdown:
+    """Per-stage totals for one unit of work, e.g. a single parse"""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+
+    def add(self, key: str, seconds: float) -> None:
+        entry = self.stages.setdefault(key, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {key: {'seconds': round(seconds, 6), 'count': count}
+                for key, (seconds, count) in self.stages.items()}
+
+_collectors: ContextVar[Tuple[TimingBreakdown, ...]] = ContextVar('timing_collectors', default=())
+
+@contextmanager
+def collect_timings() -> Iterator[TimingBreakdown]:
+    """Collect every ``timed`` stage run in this context into a breakdown
+
+    Collectors nest: an outer collector also sees the stages recorded by
+    inner ones.
+    """
+    breakdown = TimingBreakdown()
+    token = _collectors.set(_collectors.get() + (breakdown,))
+    try:
+        yield breakdown
+    finally:
+        _collectors.reset(token)
+
+@contextmanager
+def timed(component: str, stage: str) -> Iterator[None]:
+    """Time a block into STAGE_SECONDS and any active breakdown; count failures"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(component, stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, component, stage)
+        for breakdown in _collectors.get():
+            breakdown.add(f'{component}.{stage}', elapsed)
+
+def observe_provider(service: str, provider: str, operation: str, seconds: float,
+                     ok: bool = True) -> None:
+    PROVIDER_SECONDS.observe(seconds, service, provider, operation)
+    if not ok:
+        PROVIDER_ERRORS.inc(service, provider, operation)
+
+@contextmanager
+def timed_provider(service: str, provider: str, operation: str) -> Iterator[None]:
+    """Time a provider call, counting it as an error if it raises"""
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        observe_provider(service, provider, operation, time.perf_counter() - started, ok)
+
+def render(registry: Optional[Registry] = None) -> str:
+    return (registry or REGISTRY).render()
@@ -0,0 +1,163 @@
+from typing import Dict, Optional
+import asyncio
+import email.utils
+import logging
+import os
+import threading
+import time
+
+class TokenBucket:
+    """Token bucket that lets callers reserve capacity ahead of time
+
+    Reservations may drive the balance negative; the returned wait is how
+    long the caller must pause before its reservation is covered. Callers
+    therefore queue in reservation order instead of polling.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.rate_per_minute / 60.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Reserve ``amount`` tokens and return the seconds to wait"""
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.refill_per_second
+
+class RateLimiter:
+    """Adaptive requests/min and tokens/min limiter for one provider
+
+    A 429 pauses every caller until ``Retry-After`` has passed and halves
+    the effective rates; each success then restores a fraction of the
+    configured rate (additive increase, multiplicative decrease).
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, min_rate_fraction: float = 0.1,
+                 recovery_fraction: float = 0.05):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.min_rate_fraction = min_rate_fraction
+        self.recovery_fraction = recovery_fraction
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.request_bucket:
+                wait = max(wait, self.request_bucket.reserve(1, now))
+            if self.token_bucket and tokens:
+                wait = max(wait, self.token_bucket.reserve(tokens, now))
+            return wait
+
+    def acquire(self, tokens: float = 0) -> float:
+        """Block until a request of ``tokens`` estimated tokens may be sent
+
+        Returns the seconds spent waiting.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 0) -> float:
+        """Asyncio variant of :meth:`acquire`"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        """Recover towards the configured rates after a successful call"""
+        with self._lock:
+            for bucket, configured in ((self.request_bucket, self.requests_per_minute),
+                                       (self.token_bucket, self.tokens_per_minute)):
+                if bucket and bucket.rate_per_minute < configured:
+                    bucket.rate_per_minute = min(configured,
+                                                 bucket.rate_per_minute + configured * self.recovery_fraction)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Pause all callers and back off after a 429 response"""
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + (retry_after if retry_after is not None else 1.0))
+            for bucket, configured in ((self.request_bucket, self.requests_per_minute),
+                                       (self.token_bucket, self.tokens_per_minute)):
+                if bucket:
+                    bucket.rate_per_minute = max(configured * self.min_rate_fraction,
+                                                 bucket.rate_per_minute / 2)
+                    bucket._refill(now)
+                    bucket.tokens = min(bucket.tokens, 0)
+        self.logger.warning(f"Provider {self.name} rate limited; pausing {retry_after or 1.0:.1f}s")
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return {
+                'requests_per_minute': self.request_bucket.rate_per_minute if self.request_bucket else None,
+                'tokens_per_minute': self.token_bucket.rate_per_minute if self.token_bucket else None,
+                'paused_for': max(0.0, self.paused_until - time.monotonic()),
+                'throttled': self.throttled
+            }
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)"""
+    return len(text) // 4 + 1
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, requests_per_minute: Optional[float] = None,
+                     tokens_per_minute: Optional[float] = None) -> RateLimiter:
+    """Return the process-wide limiter for a provider
+
+    LLM and embedding services for the same provider share one limiter so
+    they draw from the same quota. Limits come from the first caller's
+    config, falling back to ``RATE_LIMIT_<PROVIDER>_RPM`` and
+    ``RATE_LIMIT_<PROVIDER>_TPM``; unset limits are unbounded.
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            env_prefix = f"RATE_LIMIT_{provider.upper().replace('-', '_')}"
+            rpm = requests_per_minute or os.getenv(f"{env_prefix}_RPM")
+            tpm = tokens_per_minute or os.getenv(f"{env_prefix}_TPM")
+            _limiters[provider] = RateLimiter(
+                provider,
+                requests_per_minute=float(rpm) if rpm else None,
+                tokens_per_minute=float(tpm) if tpm else None
+            )
+        return _limiters[provider]
@@ -0,0 +1,85 @@
+from typing import BinaryIO, List, Optional, Tuple
+import hashlib
+import os
+import re
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+class UploadRangeError(ValueError):
+    """Raised for malformed or out-of-bounds byte ranges"""
+    pass
+
+def parse_content_range(header: Optional[str], size: int) -> Tuple[int, int]:
+    """Parse ``Content-Range: bytes start-end/total`` into a half-open range
+
+    Raises UploadRangeError if the header is missing or the range falls
+    outside a file of ``size`` bytes.
+    """
+    match = CONTENT_RANGE.match((header or '').strip())
+    if not match:
+        raise UploadRangeError('Missing or malformed Content-Range header')
+    start, last, total = match.groups()
+    start, end = int(start), int(last) + 1
+    if total != '*' and int(total) != size:
+        raise UploadRangeError(f"Content-Range total {total} does not match upload size {size}")
+    if start >= end or end > size:
+        raise UploadRangeError(f"Range {start}-{last} outside upload of {size} bytes")
+    return start, end
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping or adjacent half-open ranges"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def missing_ranges(ranges: List[Tuple[int, int]], size: int) -> List[Tuple[int, int]]:
+    """Return the gaps in ``[0, size)`` not covered by ``ranges``"""
+    gaps = []
+    position = 0
+    for start, end in merge_ranges(ranges):
+        if start > position:
+            gaps.append((position, start))
+        position = max(position, end)
+    if position < size:
+        gaps.append((position, size))
+    return gaps
+
+def allocate(path: str, size: int) -> None:
+    """Create the partial file at its final size (sparse where supported)"""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+def write_range(path: str, start: int, end: int, stream: BinaryIO,
+                buffer_size: int = 1024 * 1024) -> int:
+    """Write ``end - start`` bytes from a stream at their offset in the file
+
+    Writes go straight to position with pwrite, so concurrent requests for
+    different ranges of one upload never interfere. Raises UploadRangeError
+    if the body is shorter or longer than the declared range.
+    """
+    expected = end - start
+    written = 0
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        while written < expected:
+            block = stream.read(min(buffer_size, expected - written))
+            if not block:
+                break
+            os.pwrite(fd, block, start + written)
+            written += len(block)
+        if written != expected or stream.read(1):
+            raise UploadRangeError(f"Body length does not match range {start}-{end - 1}")
+    finally:
+        os.close(fd)
+    return written
+
+def file_sha256(path: str, buffer_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(buffer_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,204 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Future
+import heapq
+import itertools
+import mmap
+import os
+import re
+import threading
+import time
+import zipfile
+
+from services import metrics
+
+# Lower value runs first
+PRIORITIES = {'interactive': 0, 'normal': 1, 'batch': 2}
+
+# Rough seconds of work per unit, used only to order and classify jobs
+PAGE_COST = 0.05
+IMAGE_COST = 1.0
+MEGABYTE_COST = 0.1
+
+PDF_PAGE = re.compile(rb'/Type\s*/Page\b')
+PDF_IMAGE = re.compile(rb'/Subtype\s*/Image\b')
+
+QUEUE_WAIT = metrics.REGISTRY.histogram(
+    'parse_queue_wait_seconds', 'Time parse jobs spent queued', ('priority',)
+)
+
+def estimate_cost(filepath: str) -> Dict[str, Any]:
+    """Estimate the work in a document from its structure, without parsing it
+
+    PDFs are scanned for page and image objects; DOCX archives for media
+    entries and body size. Files whose objects are hidden in compressed
+    streams fall back to an estimate from their size.
+    """
+    size = os.path.getsize(filepath)
+    pages, images = 0, 0
+    try:
+        if filepath.lower().endswith('.pdf') and size:
+            with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                pages = sum(1 for _ in PDF_PAGE.finditer(data))
+                images = sum(1 for _ in PDF_IMAGE.finditer(data))
+        elif filepath.lower().endswith('.docx'):
+            with zipfile.ZipFile(filepath) as archive:
+                infos = archive.infolist()
+                images = sum(1 for info in infos if info.filename.startswith('word/media/'))
+                body = sum(info.file_size for info in infos if info.filename == 'word/document.xml')
+                pages = max(1, body // 20000)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        pass
+    if not pages:
+        pages = max(1, size // (100 * 1024))
+    cost = pages * PAGE_COST + images * IMAGE_COST + size / 1024 ** 2 * MEGABYTE_COST
+    return {'pages': pages, 'images': images, 'bytes': size, 'cost': round(cost, 3)}
+
+class Job:
+    def __init__(self, fn: Callable, args: tuple, cost: float, priority: str, tenant: str,
+                 large: bool, tag: float):
+        self.fn = fn
+        self.args = args
+        self.cost = cost
+        self.priority = priority
+        self.tenant = tenant
+        self.large = large
+        self.tag = tag
+        self.future: Future = Future()
+        self.submitted = time.monotonic()
+
+class FairScheduler:
+    """Priority and per-tenant fair-share scheduling on a fixed worker pool
+
+    Jobs run in priority-class order. Within a class, tenants share
+    workers in proportion to their weight. Each job gets a virtual finish
+    tag: the later of the class clock and the tenant's last tag, plus the
+    job's estimated cost over the tenant's weight. Jobs run in tag order
+    and the class clock moves to the tag of the job last started, so a
+    tenant with a long queue of expensive jobs does not delay another
+    tenant's next job (self-clocked fair queuing). A tenant's last tag is
+    forgotten once the clock passes it, since it no longer affects the
+    next tag, so client-supplied tenant names do not pile up.
+
+    Jobs costing more than ``small_cost`` are large. At most
+    ``workers - reserved_small`` large jobs run at once, so small jobs
+    always have a free worker and bypass a backlog of big ones.
+    """
+
+    def __init__(self, workers: int = 4, reserved_small: int = 1, small_cost: float = 5.0,
+                 tenant_weights: Optional[Dict[str, float]] = None):
+        self.workers = workers
+        self.reserved_small = min(reserved_small, workers - 1)
+        self.small_cost = small_cost
+        self.tenant_weights = tenant_weights or {}
+        self._heap: List[Tuple[int, float, int, Job]] = []
+        self._sequence = itertools.count()
+        self._clock = {priority: 0.0 for priority in PRIORITIES}
+        self._tenant_tags: Dict[Tuple[str, str], float] = {}
+        self._running = 0
+        self._running_large = 0
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._shutdown = False
+
+    def submit(self, fn: Callable, *args, cost: float = 1.0, priority: str = 'normal',
+               tenant: str = 'default') -> Future:
+        """Queue ``fn(*args)`` and return a Future for its result"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('Scheduler is shut down')
+            if not self._threads:
+                self._start()
+            key = (priority, tenant)
+            start = max(self._clock[priority], self._tenant_tags.get(key, 0.0))
+            tag = start + cost / self.tenant_weights.get(tenant, 1.0)
+            self._tenant_tags[key] = tag
+            job = Job(fn, args, cost, priority, tenant, cost > self.small_cost, tag)
+            heapq.heappush(self._heap, (PRIORITIES[priority], tag, next(self._sequence), job))
+            self._condition.notify()
+        return job.future
+
+    def _start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'parse-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _pop_runnable(self) -> Optional[Job]:
+        """Pop the first job in order that may start now; caller holds the lock"""
+        large_allowed = self._running_large < self.workers - self.reserved_small
+        skipped = []
+        job = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if entry[3].large and not large_allowed:
+                skipped.append(entry)
+                continue
+            job = entry[3]
+            break
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return job
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = self._pop_runnable()
+                while job is None:
+                    if self._shutdown and not self._heap:
+                        return
+                    self._condition.wait()
+                    job = self._pop_runnable()
+                self._running += 1
+                self._running_large += job.large
+                clock = self._clock[job.priority] = max(self._clock[job.priority], job.tag)
+                for key in [key for key, tag in self._tenant_tags.items()
+                            if key[0] == job.priority and tag <= clock]:
+                    del self._tenant_tags[key]
+
+            QUEUE_WAIT.observe(time.monotonic() - job.submitted, job.priority)
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        job.future.set_result(job.fn(*job.args))
+                    except BaseException as e:
+                        job.future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    self._running_large -= job.large
+                    self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            queued: Dict[str, Dict[str, int]] = {}
+            for _, _, _, job in self._heap:
+                tenants = queued.setdefault(job.priority, {})
+                tenants[job.tenant] = tenants.get(job.tenant, 0) + 1
+            return {
+                'workers': self.workers,
+                'reserved_small': self.reserved_small,
+                'small_cost': self.small_cost,
+                'running': self._running,
+                'running_large': self._running_large,
+                'queued': queued
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs; workers exit once the queue drains"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """Parse ``tenant=weight,...`` as used by ``TENANT_WEIGHTS``"""
+    weights = {}
+    for part in value.split(','):
+        tenant, _, weight = part.partition('=')
+        if tenant.strip() and weight:
+            weights[tenant.strip()] = float(weight)
+    return weights
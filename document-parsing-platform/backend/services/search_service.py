@@ -0,0 +1,249 @@
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+import html
+import logging
+import os
+import re
+import threading
+
+from storage.sqlite_backend import SQLiteBackend
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS pages (
+        rowid INTEGER PRIMARY KEY,
+        document_id INTEGER NOT NULL,
+        page_number INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        text TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_pages_document ON pages (document_id)',
+    # External-content FTS5 index: text lives once, in ``pages``
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+        text,
+        content='pages',
+        content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+        INSERT INTO pages_fts (rowid, text) VALUES (new.rowid, new.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+        INSERT INTO pages_fts (pages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    END
+    '''
+)
+
+# Private-use characters bracket matches in raw snippets, so highlighting
+# survives HTML escaping of the document text around it
+MATCH_START = '\ue000'
+MATCH_END = '\ue001'
+
+TERM_SPLIT = re.compile(r'[\s"\'()^:+\-,.;!?]+')
+
+def search_terms(text: str) -> List[Tuple[str, bool]]:
+    """Split free text into (term, is prefix) pairs; ``term*`` is a prefix"""
+    terms = []
+    for term in TERM_SPLIT.split(text):
+        prefix = term.endswith('*')
+        term = term.strip('*')
+        if term:
+            terms.append((term, prefix))
+    return terms
+
+def render_snippet(snippet: str) -> str:
+    """HTML-escape a raw snippet, then mark its matches with ``<mark>``
+
+    Snippets are document text, so any markup in them is shown as text
+    rather than rendered.
+    """
+    return html.escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+class SearchIndex:
+    """Page-level full-text index over parsed documents
+
+    Backed by an SQLite FTS5 file separate from the main database. The
+    file is local to the host, so it suits the SQLite backend and single
+    replica deployments; with PostgreSQL, get_search_index returns
+    PostgresSearchIndex instead so every replica sees every document.
+    Documents are (re)indexed one at a time as they finish parsing;
+    results are ranked by BM25 and carry an HTML-safe highlighted snippet.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.backend = SQLiteBackend(path)
+        self.logger = logging.getLogger(__name__)
+        db = self.backend.get_connection()
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.commit()
+
+    @staticmethod
+    def build_query(text: str) -> str:
+        """Turn free text into an FTS5 query matching all terms
+
+        Terms are quoted so user input cannot produce FTS syntax errors; a
+        trailing ``*`` on a term is kept as a prefix match.
+        """
+        return ' '.join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in search_terms(text))
+
+    def index_document(self, document_id: int, filename: str, pages: Iterable[Tuple[int, str]]) -> int:
+        """Replace the indexed pages of one document and return the page count"""
+        db = self.backend.get_connection()
+        try:
+            db.execute('DELETE FROM pages WHERE document_id = ?', (document_id,))
+            count = db.bulk_insert(
+                'pages',
+                ('document_id', 'page_number', 'filename', 'text'),
+                ((document_id, page_number, filename, text) for page_number, text in pages if text.strip())
+            )
+            db.commit()
+            return count
+        except Exception:
+            db.rollback()
+            raise
+
+    def remove_document(self, document_id: int) -> None:
+        db = self.backend.get_connection()
+        db.execute('DELETE FROM pages WHERE document_id = ?', (document_id,))
+        db.commit()
+
+    def search(self, text: str, limit: int = 20, offset: int = 0,
+               document_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search indexed pages, best matches first"""
+        query = self.build_query(text)
+        if not query:
+            return []
+        sql = '''SELECT p.document_id, p.page_number, p.filename,
+                        snippet(pages_fts, 0, ?, ?, '…', 16) AS snippet,
+                        bm25(pages_fts) AS score
+                 FROM pages_fts
+                 JOIN pages p ON p.rowid = pages_fts.rowid
+                 WHERE pages_fts MATCH ?'''
+        params: List[Any] = [MATCH_START, MATCH_END, query]
+        if document_id is not None:
+            sql += ' AND p.document_id = ?'
+            params.append(document_id)
+        sql += ' ORDER BY rank LIMIT ? OFFSET ?'
+        params.extend([limit, offset])
+        rows = self.backend.get_connection().execute(sql, params).fetchall()
+        # bm25() is lower-is-better; report higher-is-better scores
+        return [dict(row, score=-row['score'], snippet=render_snippet(row['snippet'])) for row in rows]
+
+    def optimize(self) -> None:
+        """Merge FTS segments after large bulk loads"""
+        db = self.backend.get_connection()
+        db.execute("INSERT INTO pages_fts (pages_fts) VALUES ('optimize')")
+        db.commit()
+
+class PostgresSearchIndex:
+    """Full-text search over ``document_pages`` in the PostgreSQL database
+
+    Pages are already stored there by processing.save_parse_result, and a
+    GIN index on their ``simple`` tsvector (migration 9) serves the
+    queries, so indexing writes nothing and every replica searches every
+    document. Results match SearchIndex: ranked by ``ts_rank_cd``, with
+    an HTML-safe highlighted snippet.
+    """
+
+    HEADLINE_OPTIONS = (f'StartSel={MATCH_START}, StopSel={MATCH_END}, '
+                        'MaxWords=16, MinWords=8, MaxFragments=1, FragmentDelimiter=…')
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def build_query(text: str) -> str:
+        """Turn free text into a to_tsquery expression matching all terms
+
+        Terms are quoted lexemes, so user input cannot produce tsquery
+        syntax errors; ``:*`` keeps a trailing ``*`` as a prefix match.
+        """
+        quoted = []
+        for term, prefix in search_terms(text):
+            lexeme = "'" + term.replace('\\', '\\\\').replace("'", "''") + "'"
+            quoted.append(f'{lexeme}:*' if prefix else lexeme)
+        return ' & '.join(quoted)
+
+    def index_document(self, document_id: int, filename: str, pages: Iterable[Tuple[int, str]]) -> int:
+        """Nothing to write: the pages are indexed where they are stored"""
+        return sum(1 for _, text in pages if text.strip())
+
+    def remove_document(self, document_id: int) -> None:
+        pass
+
+    def search(self, text: str, limit: int = 20, offset: int = 0,
+               document_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search stored pages, best matches first"""
+        from models import get_db
+
+        query = self.build_query(text)
+        if not query:
+            return []
+        # Rank and page first, so headlines are built for returned rows only
+        inner = '''SELECT p.document_id, p.page_number, p.text,
+                          ts_rank_cd(to_tsvector('simple', p.text), q.query) AS score, q.query
+                   FROM document_pages p, to_tsquery('simple', ?) AS q(query)
+                   WHERE to_tsvector('simple', p.text) @@ q.query'''
+        params: List[Any] = [self.HEADLINE_OPTIONS, query]
+        if document_id is not None:
+            inner += ' AND p.document_id = ?'
+            params.append(document_id)
+        inner += ' ORDER BY score DESC, p.document_id, p.page_number LIMIT ? OFFSET ?'
+        params.extend([limit, offset])
+        rows = get_db().execute(
+            f'''SELECT r.document_id, r.page_number, d.filename,
+                       ts_headline('simple', r.text, r.query, ?) AS snippet, r.score
+                FROM ({inner}) r
+                JOIN documents d ON d.id = r.document_id
+                ORDER BY r.score DESC, r.document_id, r.page_number''',
+            params
+        ).fetchall()
+        return [dict(row, score=float(row['score']), snippet=render_snippet(row['snippet'])) for row in rows]
+
+    def optimize(self) -> None:
+        pass
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_search_index():
+    """Get the process-wide search index
+
+    PostgresSearchIndex when the PostgreSQL backend is in use (see
+    models.get_backend), otherwise an FTS5 SearchIndex at
+    ``SEARCH_INDEX_PATH``.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            from models import get_backend
+
+            if get_backend().dialect == 'postgresql':
+                _index = PostgresSearchIndex()
+            else:
+                _index = SearchIndex(os.getenv('SEARCH_INDEX_PATH', 'search_index.db'))
+        return _index
+
+# Rebuild the index from stored pages
+if __name__ == '__main__':
+    from models import get_db
+
+    index = get_search_index()
+    db = get_db()
+    documents = db.execute('SELECT id, filename FROM documents').fetchall()
+    for document in documents:
+        pages = db.execute(
+            'SELECT page_number, text FROM document_pages WHERE document_id = ? ORDER BY page_number',
+            (document['id'],)
+        ).fetchall()
+        index.index_document(document['id'], document['filename'],
+                             ((page['page_number'], page['text']) for page in pages))
+    index.optimize()
+    print(f"Indexed {len(documents)} documents")
@@ -0,0 +1,171 @@
+from typing import Dict, Any, Optional, List, MutableMapping
+import asyncio
+import hashlib
+import logging
+import os
+
+from services.async_llm_service import AsyncLLMServiceManager
+from services.chunking import split_into_chunks
+from services.rate_limiter import estimate_tokens
+
+MAP_PROMPT = (
+    "Summarize the following excerpt of a document. Keep names, dates, amounts "
+    "and other key facts.\n\n{text}\n\nSummary:"
+)
+
+REDUCE_PROMPT = (
+    "The following are summaries of consecutive parts of one document. Combine "
+    "them into a single coherent summary, keeping the key facts.\n\n{text}\n\nSummary:"
+)
+
+class DocumentSummarizer:
+    """Map-reduce summarization of parsed documents
+
+    The parse result is packed into chunks that fit the model context
+    (``context_tokens`` minus the prompt template and ``max_output_tokens``).
+    Map prompts run concurrently, spread round-robin over ``providers``;
+    summaries are then reduced in groups that fit the same budget, level by
+    level, until one remains.
+
+    Every map and reduce output is stored in ``store`` under a hash of its
+    prompt, so re-summarizing a document where only some pages changed only
+    pays for the changed chunks and the reduce groups above them. Pass a
+    persistent mapping to keep results across runs.
+    """
+
+    def __init__(self, manager: AsyncLLMServiceManager, providers: Optional[List[str]] = None,
+                 context_tokens: int = 4096, max_output_tokens: int = 512,
+                 temperature: float = 0.0, map_prompt: str = MAP_PROMPT,
+                 reduce_prompt: str = REDUCE_PROMPT,
+                 store: Optional[MutableMapping[str, str]] = None):
+        self.manager = manager
+        self.providers = providers or [manager.default_provider]
+        self.context_tokens = context_tokens
+        self.max_output_tokens = max_output_tokens
+        self.temperature = temperature
+        self.map_prompt = map_prompt
+        self.reduce_prompt = reduce_prompt
+        self.store = store if store is not None else {}
+        self.logger = logging.getLogger(__name__)
+
+    def _input_budget(self, template: str) -> int:
+        budget = self.context_tokens - self.max_output_tokens - estimate_tokens(template)
+        if budget <= 0:
+            raise ValueError("context_tokens too small for the prompt template and max_output_tokens")
+        return budget
+
+    def _store_key(self, prompt: str) -> str:
+        models = ','.join(sorted(
+            f"{p}:{self.manager.services[p].config['model_name']}" for p in self.providers
+        ))
+        payload = f"{models}|{self.temperature}|{self.max_output_tokens}|{prompt}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def _run_stage(self, prompts: List[str], stage: str, accounting: Dict[str, Any]) -> List[str]:
+        """Run prompts concurrently, reusing stored outputs"""
+        outputs: List[Optional[str]] = [None] * len(prompts)
+        pending = []
+        for i, prompt in enumerate(prompts):
+            key = self._store_key(prompt)
+            if key in self.store:
+                outputs[i] = self.store[key]
+                accounting[stage]['reused'] += 1
+            else:
+                pending.append((i, key, prompt))
+
+        results = await asyncio.gather(*[
+            self.manager.generate(
+                prompt,
+                provider=self.providers[n % len(self.providers)],
+                temperature=self.temperature,
+                max_tokens=self.max_output_tokens
+            )
+            for n, (_, _, prompt) in enumerate(pending)
+        ], return_exceptions=True)
+
+        errors = [r for r in results if isinstance(r, Exception)]
+        for (i, key, prompt), output in zip(pending, results):
+            if isinstance(output, Exception):
+                continue
+            # Stored even when siblings fail, so a retry only redoes the failures
+            self.store[key] = output
+            outputs[i] = output
+            accounting[stage]['calls'] += 1
+            accounting[stage]['prompt_tokens'] += estimate_tokens(prompt)
+            accounting[stage]['completion_tokens'] += estimate_tokens(output)
+        if errors:
+            raise errors[0]
+        return outputs
+
+    def _group(self, summaries: List[str], budget: int) -> List[List[str]]:
+        """Pack consecutive summaries into groups that fit the reduce budget"""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for summary in summaries:
+            tokens = estimate_tokens(summary)
+            if current and current_tokens + tokens > budget:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        # Always make progress, even if two summaries barely overflow the budget
+        if len(groups) == len(summaries) and len(summaries) > 1:
+            groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+        return groups
+
+    async def summarize(self, parse_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize a parser result
+
+        Returns the summary together with chunk page ranges, the number of
+        reduce levels and per-stage token accounting (estimated tokens for
+        calls made, plus the count of outputs reused from the store).
+        """
+        accounting = {
+            stage: {'calls': 0, 'reused': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+            for stage in ('map', 'reduce')
+        }
+        chunks = split_into_chunks(parse_result, self._input_budget(self.map_prompt))
+        if not chunks:
+            return {'summary': '', 'chunks': [], 'levels': 0, 'tokens': accounting}
+
+        summaries = await self._run_stage(
+            [self.map_prompt.format(text=chunk['text']) for chunk in chunks], 'map', accounting
+        )
+
+        reduce_budget = self._input_budget(self.reduce_prompt)
+        levels = 0
+        while len(summaries) > 1:
+            levels += 1
+            groups = self._group(summaries, reduce_budget)
+            summaries = await self._run_stage(
+                [self.reduce_prompt.format(text='\n\n'.join(group)) for group in groups],
+                'reduce', accounting
+            )
+            self.logger.info(f"Reduce level {levels}: {len(groups)} groups")
+
+        return {
+            'summary': summaries[0],
+            'chunks': [{'index': c['index'], 'pages': c['pages'], 'tokens': c['tokens']} for c in chunks],
+            'levels': levels,
+            'tokens': accounting
+        }
+
+# Example usage
+if __name__ == '__main__':
+    from parsers.pdf_parser import PDFParser
+
+    async def main():
+        async with AsyncLLMServiceManager() as manager:
+            manager.add_provider("ollama", {
+                "model_name": os.getenv("OLLAMA_MODEL", "llama2"),
+                "max_concurrency": 4
+            })
+            summarizer = DocumentSummarizer(manager)
+            result = await summarizer.summarize(PDFParser().parse('sample.pdf'))
+            print(result['summary'])
+            print(result['tokens'])
+
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Process warm-up and startup timing
+
+Parser modules pull in OpenCV, NumPy, PIL and the Tesseract bindings, and
+OCR language discovery shells out to ``tesseract --list-langs``. Left to
+the first parse request, a fresh worker pays for both. ``preload()`` does
+the work up front; under gunicorn with ``preload_app`` (gunicorn.conf.py)
+it runs once in the master, and forked workers share the loaded modules
+copy-on-write.
+
+This module imports nothing heavy itself, so light endpoints such as
+``/status`` can report startup timings without loading the parsers.
+"""
+from typing import Any, Dict, Optional
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_started = time.perf_counter()
+_marks: Dict[str, float] = {}
+_stages: Dict[str, float] = {}
+_preloaded_by: Optional[int] = None
+_lock = threading.Lock()
+
+def mark(name: str) -> None:
+    """Record that a startup milestone was reached (first time only)"""
+    with _lock:
+        _marks.setdefault(name, time.perf_counter() - _started)
+
+def preload() -> Dict[str, float]:
+    """Import the parsers and discover OCR languages in this process
+
+    Safe to call more than once; later calls return the first timings.
+    Failures are logged, not raised: a worker can still load what it needs
+    on demand.
+    """
+    global _preloaded_by
+    with _lock:
+        if _preloaded_by is not None:
+            return dict(_stages)
+        _preloaded_by = os.getpid()
+
+    for stage, load in (('parsers', _load_parsers), ('ocr_languages', _load_ocr_languages)):
+        started = time.perf_counter()
+        try:
+            load()
+        except Exception as e:
+            logger.warning(f"Warm-up stage {stage} failed: {str(e)}")
+        with _lock:
+            _stages[stage] = time.perf_counter() - started
+    mark('preloaded')
+    logger.info(f"Preloaded parsers in {sum(_stages.values()):.2f}s")
+    return dict(_stages)
+
+def _load_parsers() -> None:
+    from parsers import registry
+    from processing import configure_tesseract
+    configure_tesseract()
+    registry.preload()
+
+def _load_ocr_languages() -> None:
+    from parsers.ocr_processor import available_languages
+    available_languages()
+
+def report() -> Dict[str, Any]:
+    """Startup timings for this process, in seconds since warm-up began
+
+    ``preloaded_in_parent`` is true for a forked worker that inherited a
+    preload done by the gunicorn master.
+    """
+    with _lock:
+        return {
+            'pid': os.getpid(),
+            'preloaded': _preloaded_by is not None,
+            'preloaded_in_parent': _preloaded_by is not None and _preloaded_by != os.getpid(),
+            'stages': {name: round(seconds, 3) for name, seconds in _stages.items()},
+            'marks': {name: round(seconds, 3) for name, seconds in _marks.items()}
+        }
@@ -0,0 +1,97 @@
+from typing import Any, Iterable, List, Optional, Sequence
+from abc import ABC, abstractmethod
+import logging
+
+from storage.migrations import MIGRATIONS
+
+class StorageBackend(ABC):
+    """Abstract base class for database backends
+
+    Connections handed out by a backend share one interface regardless of
+    driver: ``execute``/``executemany`` take ``?`` placeholders and return
+    cursors whose rows support ``row['column']`` and ``dict(row)``, plus
+    ``insert`` (returns the new id), ``bulk_insert``, ``commit``,
+    ``rollback`` and ``in_transaction``.
+    """
+
+    dialect: str
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    @abstractmethod
+    def get_connection(self) -> Any:
+        """Get the calling thread's connection, acquiring one if needed"""
+        pass
+
+    @abstractmethod
+    def release_connection(self, exception: Optional[BaseException] = None) -> None:
+        """Release the calling thread's connection at the end of a unit of work"""
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Close every connection owned by this process"""
+        pass
+
+    def lock_migrations(self, db: Any) -> None:
+        """Open a transaction on ``db`` that other processes' migrations wait behind
+
+        The lock is held until the transaction commits or rolls back.
+        """
+        pass
+
+    def migrate(self) -> List[int]:
+        """Apply pending schema migrations and return the versions applied
+
+        Each migration runs with its version row in one transaction taken
+        under ``lock_migrations``: a failure leaves neither the statements
+        nor the row behind, and workers starting together apply each
+        migration once. Versions are re-read under the lock, so a worker
+        that waited skips what the other applied.
+        """
+        db = self.get_connection()
+        try:
+            self.lock_migrations(db)
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            db.commit()
+            applied = {row['version'] for row in db.execute('SELECT version FROM schema_migrations').fetchall()}
+            db.commit()
+
+            newly_applied = []
+            for version, name, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                self.lock_migrations(db)
+                if db.execute('SELECT 1 FROM schema_migrations WHERE version = ?', (version,)).fetchone():
+                    db.commit()
+                    continue
+                for statement in statements[self.dialect]:
+                    db.execute_raw(statement)
+                db.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)', (version, name))
+                db.commit()
+                newly_applied.append(version)
+                self.logger.info(f"Applied migration {version}: {name}")
+            return newly_applied
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            self.release_connection()
+
+def chunked(rows: Iterable[Sequence[Any]], size: int) -> Iterable[List[Sequence[Any]]]:
+    """Yield lists of at most ``size`` rows"""
+    batch: List[Sequence[Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
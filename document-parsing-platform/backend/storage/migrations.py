@@ -0,0 +1,374 @@
+"""Ordered schema migrations as (version, name, {dialect: [statements]})
+
+Migrations are applied once each, in order, and recorded in
+``schema_migrations``. Never edit an applied migration; append a new one.
+"""
+
+_SQLITE_VERSION_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version
+    AFTER {event} ON {table}
+    BEGIN
+        UPDATE change_counter SET version = version + 1 WHERE name = 'documents';
+    END
+    '''
+    for table in ('documents', 'llm_config')
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+# documents columns returned by GET /api/documents (see app.DOCUMENT_FIELDS);
+# only changes to these bump the listing version from migration 8 on
+_LISTED_DOCUMENT_COLUMNS = ('filename', 'filepath', 'status', 'llm_config_id', 'created_at', 'duplicate_of')
+
+_POSTGRES_VERSION_TRIGGERS = [
+    '''
+    CREATE OR REPLACE FUNCTION bump_documents_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE change_counter SET version = version + 1 WHERE name = 'documents';
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    '''
+] + [
+    statement
+    for table in ('documents', 'llm_config')
+    for statement in (
+        f'DROP TRIGGER IF EXISTS {table}_version ON {table}',
+        f'''
+        CREATE TRIGGER {table}_version
+        AFTER INSERT OR UPDATE OR DELETE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_documents_version()
+        '''
+    )
+]
+
+MIGRATIONS = [
+    (1, 'initial schema', {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS llm_config (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model_name TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                max_tokens INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                filepath TEXT NOT NULL,
+                status TEXT NOT NULL,
+                llm_config_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (llm_config_id) REFERENCES llm_config(id)
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS change_counter (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+            ''',
+            "INSERT OR IGNORE INTO change_counter (name, version) VALUES ('documents', 0)",
+            *_SQLITE_VERSION_TRIGGERS,
+            'CREATE INDEX IF NOT EXISTS idx_llm_config_created_at ON llm_config (created_at)',
+            'CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents (created_at, id)',
+            'CREATE INDEX IF NOT EXISTS idx_documents_status ON documents (status)'
+        ],
+        'postgresql': [
+            '''
+            CREATE TABLE IF NOT EXISTS llm_config (
+                id SERIAL PRIMARY KEY,
+                model_name TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                max_tokens INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS documents (
+                id SERIAL PRIMARY KEY,
+                filename TEXT NOT NULL,
+                filepath TEXT NOT NULL,
+                status TEXT NOT NULL,
+                llm_config_id INTEGER REFERENCES llm_config(id),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS change_counter (
+                name TEXT PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+            ''',
+            "INSERT INTO change_counter (name, version) VALUES ('documents', 0) ON CONFLICT DO NOTHING",
+            *_POSTGRES_VERSION_TRIGGERS,
+            'CREATE INDEX IF NOT EXISTS idx_llm_config_created_at ON llm_config (created_at)',
+            'CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents (created_at, id)',
+            'CREATE INDEX IF NOT EXISTS idx_documents_status ON documents (status)'
+        ]
+    }),
+    (2, 'per-page results and chunks', {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS document_pages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                page_number INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                UNIQUE (document_id, page_number)
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS document_chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                chunk_index INTEGER NOT NULL,
+                page_start INTEGER,
+                page_end INTEGER,
+                text TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                UNIQUE (document_id, chunk_index)
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_document_chunks_hash ON document_chunks (content_hash)'
+        ],
+        'postgresql': [
+            '''
+            CREATE TABLE IF NOT EXISTS document_pages (
+                id BIGSERIAL PRIMARY KEY,
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                page_number INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                UNIQUE (document_id, page_number)
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS document_chunks (
+                id BIGSERIAL PRIMARY KEY,
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                chunk_index INTEGER NOT NULL,
+                page_start INTEGER,
+                page_end INTEGER,
+                text TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                UNIQUE (document_id, chunk_index)
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_document_chunks_hash ON document_chunks (content_hash)'
+        ]
+    }),
+    (3, 'directory ingestion progress', {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS ingest_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                document_id INTEGER REFERENCES documents(id),
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_ingest_files_status ON ingest_files (status)'
+        ],
+        'postgresql': [
+            '''
+            CREATE TABLE IF NOT EXISTS ingest_files (
+                id SERIAL PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                size BIGINT NOT NULL,
+                mtime_ns BIGINT NOT NULL,
+                document_id INTEGER REFERENCES documents(id),
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_ingest_files_status ON ingest_files (status)'
+        ]
+    }),
+    (4, 'upload batches', {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS batches (
+                id TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            'ALTER TABLE documents ADD COLUMN batch_id TEXT REFERENCES batches(id)',
+            'CREATE INDEX IF NOT EXISTS idx_documents_batch ON documents (batch_id)'
+        ],
+        'postgresql': [
+            '''
+            CREATE TABLE IF NOT EXISTS batches (
+                id TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            'ALTER TABLE documents ADD COLUMN IF NOT EXISTS batch_id TEXT REFERENCES batches(id)',
+            'CREATE INDEX IF NOT EXISTS idx_documents_batch ON documents (batch_id)'
+        ]
+    }),
+    (5, 'resumable upload sessions', {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                document_id INTEGER REFERENCES documents(id),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS upload_ranges (
+                session_id TEXT NOT NULL REFERENCES upload_sessions(id) ON DELETE CASCADE,
+                range_start INTEGER NOT NULL,
+                range_end INTEGER NOT NULL,
+                PRIMARY KEY (session_id, range_start, range_end)
+            )
+            '''
+        ],
+        'postgresql': [
+            '''
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size BIGINT NOT NULL,
+                sha256 TEXT,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                document_id INTEGER REFERENCES documents(id),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS upload_ranges (
+                session_id TEXT NOT NULL REFERENCES upload_sessions(id) ON DELETE CASCADE,
+                range_start BIGINT NOT NULL,
+                range_end BIGINT NOT NULL,
+                PRIMARY KEY (session_id, range_start, range_end)
+            )
+            '''
+        ]
+    }),
+    (6, 'near-duplicate signatures', {
+        'sqlite': [
+            'ALTER TABLE documents ADD COLUMN duplicate_of INTEGER REFERENCES documents(id)',
+            'ALTER TABLE documents ADD COLUMN duplicate_similarity REAL',
+            '''
+            CREATE TABLE IF NOT EXISTS document_signatures (
+                document_id INTEGER PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+                signature BLOB NOT NULL,
+                shingles INTEGER NOT NULL
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS document_lsh_bands (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                PRIMARY KEY (band, bucket, document_id)
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_document_lsh_bands_document ON document_lsh_bands (document_id)'
+        ],
+        'postgresql': [
+            'ALTER TABLE documents ADD COLUMN IF NOT EXISTS duplicate_of INTEGER REFERENCES documents(id)',
+            'ALTER TABLE documents ADD COLUMN IF NOT EXISTS duplicate_similarity REAL',
+            '''
+            CREATE TABLE IF NOT EXISTS document_signatures (
+                document_id INTEGER PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+                signature BYTEA NOT NULL,
+                shingles INTEGER NOT NULL
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS document_lsh_bands (
+                band SMALLINT NOT NULL,
+                bucket BIGINT NOT NULL,
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                PRIMARY KEY (band, bucket, document_id)
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_document_lsh_bands_document ON document_lsh_bands (document_id)'
+        ]
+    }),
+    # The listing only shows llm_config.model_name, and new configs have no
+    # documents yet, so only renames and deletes bump the documents counter
+    (7, 'narrow llm_config version triggers', {
+        'sqlite': [
+            'DROP TRIGGER IF EXISTS llm_config_insert_version',
+            'DROP TRIGGER IF EXISTS llm_config_update_version',
+            '''
+            CREATE TRIGGER IF NOT EXISTS llm_config_update_version
+            AFTER UPDATE OF model_name ON llm_config
+            BEGIN
+                UPDATE change_counter SET version = version + 1 WHERE name = 'documents';
+            END
+            '''
+        ],
+        'postgresql': [
+            'DROP TRIGGER IF EXISTS llm_config_version ON llm_config',
+            '''
+            CREATE TRIGGER llm_config_version
+            AFTER UPDATE OF model_name OR DELETE ON llm_config
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_documents_version()
+            '''
+        ]
+    }),
+    # Updates that leave every listed column as it was (dedup resets,
+    # repeated status writes) no longer touch the shared counter row
+    (8, 'documents version trigger on listed columns only', {
+        'sqlite': [
+            'DROP TRIGGER IF EXISTS documents_update_version',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS documents_update_version
+            AFTER UPDATE ON documents
+            WHEN {' OR '.join(f'OLD.{column} IS NOT NEW.{column}' for column in _LISTED_DOCUMENT_COLUMNS)}
+            BEGIN
+                UPDATE change_counter SET version = version + 1 WHERE name = 'documents';
+            END
+            '''
+        ],
+        'postgresql': [
+            'DROP TRIGGER IF EXISTS documents_version ON documents',
+            '''
+            CREATE TRIGGER documents_version
+            AFTER INSERT OR DELETE ON documents
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_documents_version()
+            ''',
+            # WHEN may compare OLD and NEW only in row-level triggers
+            f'''
+            CREATE TRIGGER documents_update_version
+            AFTER UPDATE ON documents
+            FOR EACH ROW
+            WHEN ({' OR '.join(f'OLD.{column} IS DISTINCT FROM NEW.{column}' for column in _LISTED_DOCUMENT_COLUMNS)})
+            EXECUTE FUNCTION bump_documents_version()
+            '''
+        ]
+    }),
+    # PostgreSQL searches document_pages in place (services.search_service);
+    # SQLite deployments keep the separate FTS5 index file
+    (9, 'full-text index on document pages', {
+        'sqlite': [],
+        'postgresql': [
+            '''
+            CREATE INDEX IF NOT EXISTS idx_document_pages_fts
+            ON document_pages USING GIN (to_tsvector('simple', text))
+            '''
+        ]
+    })
+]
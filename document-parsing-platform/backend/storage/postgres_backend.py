@@ -0,0 +1,151 @@
+from typing import Any, Iterable, Optional, Sequence
+import os
+import re
+import threading
+
+import psycopg2
+from psycopg2 import extensions, extras, pool
+
+from storage.base import StorageBackend, chunked
+
+# Single-quoted literals and double-quoted identifiers, with doubled quotes inside
+QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+# Key for pg_advisory_xact_lock while migrating, shared by every process
+MIGRATION_LOCK_ID = 4301
+
+def translate_placeholders(sql: str) -> str:
+    """Convert ``?`` placeholders to psycopg2's ``%s`` style
+
+    A ``?`` inside a quoted literal or identifier is left alone. ``%`` is
+    escaped everywhere, since psycopg2 formats the whole statement.
+    """
+    parts = QUOTED.split(sql)
+    return ''.join(
+        part.replace('%', '%%') if index % 2 else part.replace('%', '%%').replace('?', '%s')
+        for index, part in enumerate(parts)
+    )
+
+class PostgresConnection:
+    """psycopg2 connection exposing the sqlite3-style storage interface"""
+
+    def __init__(self, conn: 'extensions.connection'):
+        self.conn = conn
+
+    def _cursor(self) -> 'extras.RealDictCursor':
+        return self.conn.cursor(cursor_factory=extras.RealDictCursor)
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> 'extras.RealDictCursor':
+        cursor = self._cursor()
+        cursor.execute(translate_placeholders(sql), tuple(params))
+        return cursor
+
+    def execute_raw(self, sql: str) -> 'extras.RealDictCursor':
+        cursor = self._cursor()
+        cursor.execute(sql)
+        return cursor
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> 'extras.RealDictCursor':
+        cursor = self._cursor()
+        cursor.executemany(translate_placeholders(sql), [tuple(row) for row in rows])
+        return cursor
+
+    def insert(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run an INSERT and return the new row id"""
+        return self.execute(f"{sql} RETURNING id", params).fetchone()['id']
+
+    def bulk_insert(self, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+                    batch_size: int = 500) -> int:
+        """Insert many rows with multi-row VALUES statements"""
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        count = 0
+        cursor = self.conn.cursor()
+        for batch in chunked(rows, batch_size):
+            extras.execute_values(cursor, sql, batch, page_size=batch_size)
+            count += len(batch)
+        return count
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def rollback(self) -> None:
+        self.conn.rollback()
+
+class PostgresBackend(StorageBackend):
+    """PostgreSQL database behind a bounded, thread-safe connection pool
+
+    Each thread holds at most one pooled connection between
+    ``get_connection`` and ``release_connection``. When all ``max_connections``
+    are checked out, callers wait up to ``acquire_timeout`` seconds instead
+    of failing immediately. Pools are per process, so forked workers never
+    share sockets with the master.
+    """
+
+    dialect = 'postgresql'
+
+    def __init__(self, dsn: str, min_connections: int = 1, max_connections: int = 10,
+                 acquire_timeout: float = 30):
+        super().__init__()
+        self.dsn = dsn
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.acquire_timeout = acquire_timeout
+        self._pool: Optional[pool.ThreadedConnectionPool] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_pool(self) -> pool.ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = pool.ThreadedConnectionPool(self.min_connections, self.max_connections, self.dsn)
+                self._slots = threading.BoundedSemaphore(self.max_connections)
+                self._pid = os.getpid()
+                self._local = threading.local()
+            return self._pool
+
+    def get_connection(self) -> PostgresConnection:
+        db: Optional[PostgresConnection] = getattr(self._local, 'db', None)
+        if db is not None and self._pid == os.getpid():
+            return db
+        connection_pool = self._get_pool()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No database connection available within {self.acquire_timeout}s")
+        try:
+            db = PostgresConnection(connection_pool.getconn())
+        except Exception:
+            self._slots.release()
+            raise
+        self._local.db = db
+        return db
+
+    def release_connection(self, exception: Optional[BaseException] = None) -> None:
+        """Roll back uncommitted work and return the connection to the pool"""
+        db: Optional[PostgresConnection] = getattr(self._local, 'db', None)
+        if db is None or self._pid != os.getpid():
+            return
+        self._local.db = None
+        broken = db.conn.closed or exception is not None
+        try:
+            if not db.conn.closed and db.in_transaction:
+                db.rollback()
+        except psycopg2.Error:
+            broken = True
+        self._pool.putconn(db.conn, close=broken)
+        self._slots.release()
+
+    def lock_migrations(self, db: PostgresConnection) -> None:
+        """Take a transaction-scoped advisory lock; DDL is transactional here"""
+        db.execute('SELECT pg_advisory_xact_lock(?)', (MIGRATION_LOCK_ID,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+            self._local = threading.local()
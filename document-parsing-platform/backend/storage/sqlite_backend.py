@@ -0,0 +1,105 @@
+from typing import Any, Iterable, List, Optional, Sequence
+import os
+import sqlite3
+import threading
+
+from storage.base import StorageBackend, chunked
+
+# Applied to every connection. WAL lets readers proceed while a writer
+# commits, so gunicorn workers no longer serialize on the database file.
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA temp_store=MEMORY'
+)
+
+class SQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection with the shared storage helpers"""
+
+    def execute_raw(self, sql: str) -> sqlite3.Cursor:
+        return self.execute(sql)
+
+    def insert(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run an INSERT and return the new row id"""
+        return self.execute(sql, params).lastrowid
+
+    def bulk_insert(self, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+                    batch_size: int = 500) -> int:
+        """Insert many rows in batches within the current transaction"""
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' for _ in columns)})")
+        count = 0
+        for batch in chunked(rows, batch_size):
+            self.executemany(sql, batch)
+            count += len(batch)
+        return count
+
+class SQLiteBackend(StorageBackend):
+    """SQLite database with one reused connection per thread"""
+
+    dialect = 'sqlite'
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> SQLiteConnection:
+        db = sqlite3.connect(self.path, timeout=5, factory=SQLiteConnection)
+        db.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            db.execute(pragma)
+        return db
+
+    def get_connection(self) -> SQLiteConnection:
+        """Get this thread's connection
+
+        Connections are opened once per thread and reused. The owning
+        process id is checked so a worker forked from a process that
+        already held a connection opens its own.
+        """
+        db: Optional[SQLiteConnection] = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = self._connect()
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def lock_migrations(self, db: SQLiteConnection) -> None:
+        """Start a write transaction; other writers wait up to busy_timeout"""
+        db.execute('BEGIN IMMEDIATE')
+
+    def migrate(self) -> List[int]:
+        """Apply pending migrations with explicit transaction control
+
+        In autocommit mode (``isolation_level=None``) sqlite3 opens no
+        transactions of its own, so each migration's DDL and version row
+        commit together under ``BEGIN IMMEDIATE`` and nothing else.
+        """
+        db = self.get_connection()
+        isolation_level = db.isolation_level
+        db.isolation_level = None
+        try:
+            return super().migrate()
+        finally:
+            db.isolation_level = isolation_level
+
+    def release_connection(self, exception: Optional[BaseException] = None) -> None:
+        """Roll back uncommitted work; close the connection after a failure"""
+        db: Optional[SQLiteConnection] = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            return
+        if db.in_transaction:
+            db.rollback()
+        if exception is not None:
+            db.close()
+            self._local.db = None
+
+    def close(self) -> None:
+        db: Optional[SQLiteConnection] = getattr(self._local, 'db', None)
+        if db is not None and self._local.pid == os.getpid():
+            db.close()
+        self._local.db = None
@@ -0,0 +1,40 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+def corrupt_zip() -> bytes:
+    """A zip whose second member's deflate stream is damaged"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('good.txt', 'first document ' * 200)
+        archive.writestr('bad.txt', 'second document ' * 2000)
+    data = bytearray(buffer.getvalue())
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as archive:
+        info = archive.getinfo('bad.txt')
+    # Local header is 30 bytes plus the name and extra field
+    start = info.header_offset + 30 + len(info.filename.encode()) + len(info.extra)
+    for offset in range(start + 2, start + 12):
+        data[offset] ^= 0xFF
+    return bytes(data)
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('uploads')
+    import models
+    monkeypatch.setattr(models, '_backend', None)
+    models.init_db()
+    import app as app_module
+    yield app_module.app.test_client(), {'Authorization': f"Bearer {app_module.app.config['API_BEARER_TOKEN']}"}
+    models.get_backend().close()
+
+def test_corrupt_archive_member_is_rejected_and_cleaned_up(client):
+    client, headers = client
+    response = client.post('/api/upload/bulk', headers=headers,
+                           data={'files': (io.BytesIO(corrupt_zip()), 'batch.zip')})
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid archive')
+    assert os.listdir('uploads') == []
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.chdir(tmp_path)
+    import models
+    monkeypatch.setattr(models, '_backend', None)
+    models.init_db()
+    yield models.get_db()
+    models.close_db()
+    models.get_backend().close()
+
+def test_mislabelled_file_gets_no_document_row(db, tmp_path):
+    from services.ingest_watcher import UNSUPPORTED_CONTENT, DirectoryWatcher
+
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    path = inbox / 'report.pdf'
+    path.write_text('<html><body>not a pdf</body></html>')
+    stat = os.stat(path)
+
+    watcher = DirectoryWatcher([str(inbox)])
+    try:
+        assert watcher._enqueue([(str(path), stat.st_size, stat.st_mtime_ns)])
+    finally:
+        watcher.stop()
+        watcher._executor.shutdown(wait=True)
+
+    assert db.execute('SELECT COUNT(*) AS n FROM documents').fetchone()['n'] == 0
+    row = db.execute('SELECT status, error, document_id FROM ingest_files').fetchone()
+    assert (row['status'], row['error'], row['document_id']) == ('failed', UNSUPPORTED_CONTENT, None)
+    assert watcher._known[str(path)] == (stat.st_size, stat.st_mtime_ns)
+
+def test_process_document_marks_unparseable_file_failed(db, tmp_path):
+    from processing import process_document
+
+    path = tmp_path / 'report.pdf'
+    path.write_text('<html>not a pdf</html>')
+    document_id = db.insert('INSERT INTO documents (filename, filepath, status) VALUES (?, ?, ?)',
+                            ('report.pdf', str(path), 'queued'))
+    db.commit()
+
+    with pytest.raises(ValueError):
+        process_document(document_id, str(path))
+    assert db.execute('SELECT status FROM documents WHERE id = ?', (document_id,)).fetchone()['status'] == 'failed'
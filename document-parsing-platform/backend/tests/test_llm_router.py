@@ -0,0 +1,49 @@
+import pytest
+
+from services import llm_router
+from services.llm_router import LatencyAwareRouter
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_router.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_failing_provider_recovers_after_cooldown(clock):
+    router = LatencyAwareRouter(cooldown_seconds=30)
+    router.record('ollama', 2.0, True)
+    for _ in range(10):
+        router.record('google', 0.1, False)
+    assert not router.is_healthy('google')
+    assert router.rank(['google', 'ollama']) == ['ollama', 'google']
+
+    clock[0] += 31
+    # Half-open: the window is cleared so the next call probes the provider
+    assert router.is_healthy('google')
+    assert router.rank(['google', 'ollama']) == ['google', 'ollama']
+
+    router.record('google', 0.1, True)
+    assert router.is_healthy('google')
+    assert router.rank(['google', 'ollama']) == ['google', 'ollama']
+
+def test_failed_probe_starts_new_cooldown(clock):
+    router = LatencyAwareRouter(cooldown_seconds=30)
+    for _ in range(3):
+        router.record('google', 0.1, False)
+    clock[0] += 31
+    assert router.is_healthy('google')
+
+    router.record('google', 0.1, False)
+    assert not router.is_healthy('google')
+    clock[0] += 29
+    assert not router.is_healthy('google')
+    clock[0] += 2
+    assert router.is_healthy('google')
+
+def test_error_rate_alone_triggers_cooldown(clock):
+    router = LatencyAwareRouter(failure_threshold=100, max_error_rate=0.5, cooldown_seconds=30)
+    for ok in (True, False, False):
+        router.record('google', 0.1, ok)
+    assert not router.is_healthy('google')
+    clock[0] += 31
+    assert router.is_healthy('google')
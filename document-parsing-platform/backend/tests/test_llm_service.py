@@ -0,0 +1,55 @@
+import io
+import json
+
+import requests
+
+from services.llm_service import OllamaService
+from services.rate_limiter import estimate_tokens
+
+def make_response(status: int, body: bytes = b'', headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.raw = io.BytesIO(body)
+    response.headers.update(headers or {})
+    return response
+
+class RecordingLimiter:
+    def __init__(self):
+        self.calls = []
+
+    def acquire(self, tokens=0):
+        self.calls.append(('acquire', tokens))
+        return 0.0
+
+    def on_rate_limited(self, retry_after=None):
+        self.calls.append(('rate_limited', retry_after))
+
+    def on_success(self):
+        self.calls.append(('success',))
+
+def ollama_with(responses):
+    service = OllamaService({'model_name': 'llama3'})
+    service.rate_limiter = RecordingLimiter()
+    queue = list(responses)
+    service.session.post = lambda *args, **kwargs: queue.pop(0)
+    return service
+
+def test_ollama_stream_reports_429_and_retries():
+    body = b'\n'.join(json.dumps(chunk).encode() for chunk in
+                      ({'response': 'Hel'}, {'response': 'lo', 'done': True}))
+    service = ollama_with([make_response(429, headers={'Retry-After': '2'}), make_response(200, body)])
+
+    assert service.generate('hi', max_tokens=100) == 'Hello'
+    calls = service.rate_limiter.calls
+    assert ('rate_limited', 2.0) in calls
+    assert calls[-1] == ('success',)
+    # Prompt plus output budget, as Google AI reserves
+    assert calls[0] == ('acquire', estimate_tokens('hi') + 100)
+
+def test_ollama_embed_reports_429_on_last_attempt():
+    service = ollama_with([make_response(429, headers={'Retry-After': '5'})] * 3)
+    try:
+        service.embed('text')
+    except requests.HTTPError:
+        pass
+    assert service.rate_limiter.calls.count(('rate_limited', 5.0)) == 3
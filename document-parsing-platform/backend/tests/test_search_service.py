@@ -0,0 +1,16 @@
+from services.search_service import PostgresSearchIndex, SearchIndex
+
+def test_snippet_escapes_document_markup(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.db'))
+    index.index_document(1, 'a.txt', [(1, 'see <img src=x onerror=alert(1)> invoice total & tax')])
+
+    [result] = index.search('invoice')
+    assert '<img' not in result['snippet']
+    assert '&lt;img src=x onerror=alert(1)&gt;' in result['snippet']
+    assert '<mark>invoice</mark>' in result['snippet']
+    assert '&amp; tax' in result['snippet']
+
+def test_postgres_query_quotes_terms():
+    assert PostgresSearchIndex.build_query('inv* total') == "'inv':* & 'total'"
+    assert PostgresSearchIndex.build_query('a\\b &|!') == "'a\\\\b' & '&|'"
+    assert PostgresSearchIndex.build_query('  ') == ''